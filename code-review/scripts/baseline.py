@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Baselines of accepted issues, so CI only reports new ones.
+
+An issue's fingerprint hashes its rule name, its path relative to the
+baseline file and its code line with whitespace collapsed. Line numbers
+are left out so the fingerprint survives code moving up or down. The
+baseline stores a count per fingerprint: if a file had two identical
+accepted findings and gains a third, the third is reported.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+
+BASELINE_VERSION = 1
+
+
+def _normalize_code(code):
+    return ' '.join(code.split())
+
+
+def fingerprint(issue, base_dir):
+    """Return the fingerprint of an issue dict."""
+    path = os.path.relpath(os.path.abspath(issue['file']), base_dir).replace(os.sep, '/')
+    key = '\0'.join((issue['name'], path, _normalize_code(issue['code'])))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+class Baseline:
+    """Fingerprint counts of accepted issues, stored as JSON at ``path``."""
+
+    def __init__(self, path, counts=None):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.counts = Counter(counts or {})
+        self.suppressed = 0
+
+    @classmethod
+    def load(cls, path):
+        """Read a baseline file, raising ValueError if it is not one."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a JSON object, got {type(data).__name__}")
+        if data.get('version') != BASELINE_VERSION:
+            raise ValueError(f"{path}: unsupported baseline version {data.get('version')}")
+        counts = data.get('fingerprints')
+        if not isinstance(counts, dict) or not all(
+                isinstance(count, int) and not isinstance(count, bool) and count > 0
+                for count in counts.values()):
+            raise ValueError(f"{path}: 'fingerprints' must map fingerprints to positive counts")
+        return cls(path, counts)
+
+    def add(self, issues):
+        """Accept ``issues`` into the baseline."""
+        for issue in issues:
+            self.counts[fingerprint(issue, self.base_dir)] += 1
+
+    def filter(self, issues):
+        """Return the issues not covered by the baseline.
+
+        Each accepted fingerprint absorbs as many issues as it was recorded
+        for. Counts are consumed, so call this once per run.
+        """
+        new = []
+        for issue in issues:
+            key = fingerprint(issue, self.base_dir)
+            if self.counts[key] > 0:
+                self.counts[key] -= 1
+                self.suppressed += 1
+            else:
+                new.append(issue)
+        return new
+
+    def save(self):
+        data = {'version': BASELINE_VERSION, 'fingerprints': dict(sorted(self.counts.items()))}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.write('\n')
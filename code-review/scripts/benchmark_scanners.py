@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark the code-review scanners on a reproducible synthetic Java corpus.
+
+Generates a corpus (ordinary classes plus very long lines, one huge
+generated file and deeply nested methods), times check_file,
+check_complexity and scan_directory, measures the cost of every rule, and
+prints the results as JSON so runs can be compared between commits.
+
+Usage:
+    python benchmark_scanners.py --size small
+    python benchmark_scanners.py --size medium --jobs 4 -o bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import check_style
+import find_memory_leaks
+from java_lexer import read_source
+from rule_engine import RuleSet
+
+SIZES = {
+    'small': {'files': 200, 'huge_mb': 1, 'long_lines': 5, 'nesting': 8},
+    'medium': {'files': 2000, 'huge_mb': 8, 'long_lines': 20, 'nesting': 12},
+    'large': {'files': 20000, 'huge_mb': 32, 'long_lines': 50, 'nesting': 16},
+}
+
+CLEAN_STATEMENTS = [
+    'int total = computeTotal(items, discount);',
+    'List<Order> orders = orderRepository.findByUserId(userId);',
+    'if (orders.isEmpty()) {',
+    '}',
+    'for (Order order : orders) {',
+    'result.add(mapper.toDto(order));',
+    'logger.info("Processed order {}", order.getId());',
+    'return Collections.unmodifiableList(result);',
+    '// Keep the original ordering of the input',
+    '/* Validate the request before touching the database */',
+    'Objects.requireNonNull(request, "request");',
+    'String name = user.getName().trim();',
+]
+
+# Lines that trigger at least one rule, mixed in at a low rate
+FLAGGED_STATEMENTS = [
+    'System.out.println("debug " + value);',
+    'e.printStackTrace();',
+    'String sql = "SELECT * FROM user WHERE id = " + id;',
+    'log.info("user " + name);',
+    'private String password = "changeit";',
+    'if (count > 100) { return 42; }',
+    'InputStream in = new FileInputStream(path);',
+    'ExecutorService pool = Executors.newFixedThreadPool(4);',
+    'private static final ThreadLocal<Context> CONTEXT = new ThreadLocal<>();',
+    '// TODO clean this up',
+]
+
+
+def _method(rng, name, statements, flagged_rate):
+    body = []
+    for _ in range(statements):
+        pool = FLAGGED_STATEMENTS if rng.random() < flagged_rate else CLEAN_STATEMENTS
+        body.append('        ' + rng.choice(pool))
+    return [f'    public List<OrderDto> {name}(Request request) {{'] + body + ['    }', '']
+
+
+def _nested_method(depth):
+    lines = ['    public void deeplyNested(int value) {']
+    for level in range(depth):
+        lines.append('    ' * (level + 2) + f'if (value > {level}) {{')
+    lines.append('    ' * (depth + 2) + 'value--;')
+    for level in reversed(range(depth)):
+        lines.append('    ' * (level + 2) + '}')
+    lines.append('    }')
+    return lines
+
+
+def _java_class(rng, package, name, methods, flagged_rate=0.05, extra=()):
+    lines = [f'package {package};', '', 'import java.util.*;', '', f'public class {name} {{', '']
+    for index in range(methods):
+        lines.extend(_method(rng, f'process{index}', rng.randint(5, 40), flagged_rate))
+    lines.extend(extra)
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(root, size, seed=0):
+    """Write a synthetic corpus under ``root`` and return its file count and bytes."""
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    root = Path(root)
+    total_bytes = 0
+    count = 0
+
+    def write(relpath, text):
+        nonlocal total_bytes, count
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = text.encode('utf-8')
+        path.write_bytes(data)
+        total_bytes += len(data)
+        count += 1
+
+    for index in range(spec['files']):
+        package = f'com.example.module{index % 50}'
+        name = f'Service{index}'
+        extra = _nested_method(spec['nesting']) if index % 100 == 0 else ()
+        write(f'src/{package.replace(".", "/")}/{name}.java',
+              _java_class(rng, package, name, rng.randint(2, 12), extra=extra))
+
+    # Minified / generated code: single lines tens of kilobytes long
+    for index in range(spec['long_lines']):
+        terms = ' + '.join(f'"part{i}" + value{i}' for i in range(rng.randint(2000, 4000)))
+        write(f'src/com/example/generated/Long{index}.java',
+              f'package com.example.generated;\n\npublic class Long{index} {{\n'
+              f'    public String build() {{ return {terms}; }}\n}}\n')
+
+    # One huge generated source file
+    target = spec['huge_mb'] << 20
+    methods = []
+    written = 0
+    index = 0
+    while written < target:
+        method = '\n'.join(_method(rng, f'generated{index}', 20, 0.01))
+        methods.append(method)
+        written += len(method)
+        index += 1
+    write('src/com/example/generated/Huge.java',
+          'package com.example.generated;\n\npublic class Huge {\n' + '\n'.join(methods) + '\n}\n')
+
+    return count, total_bytes
+
+
+def _throughput(seconds, files, size):
+    return {
+        'seconds': round(seconds, 4),
+        'files_per_s': round(files / seconds, 2) if seconds else None,
+        'mb_per_s': round(size / (1 << 20) / seconds, 2) if seconds else None,
+    }
+
+
+def _time_per_file(function, files):
+    start = time.perf_counter()
+    for filepath in files:
+        function(filepath)
+    return time.perf_counter() - start
+
+
+def rule_costs(files):
+    """Profile every PATTERNS rule through the rule engine.
+
+    Each tool's rules run as in a scan, prefilter, guard and exclusion
+    included, on a RuleSet of their own so the module's shared RULES are
+    left unprofiled. Views are built before the clock starts (see
+    ``RuleSet.run_rule``), so lexing is not charged to any rule.
+    """
+    sources = [read_source(f) for f in files]
+    costs = []
+    for tool, module in (('check_style', check_style), ('find_memory_leaks', find_memory_leaks)):
+        rule_set = RuleSet(module.PATTERNS, module.RULES.metadata)
+        profile = rule_set.enable_profiling()
+        for filepath, source in zip(files, sources):
+            rule_set.scan_source(filepath, source)
+        for row in profile.rows(tool):
+            row['seconds'] = round(row['seconds'], 4)
+            costs.append(row)
+    costs.sort(key=lambda cost: cost['seconds'], reverse=True)
+    return costs
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmark(corpus, jobs=1):
+    """Run all measurements on an existing corpus directory."""
+    files = sorted(str(p) for p in Path(corpus).rglob('*.java'))
+    size = sum(os.path.getsize(f) for f in files)
+
+    results = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'corpus': {'files': len(files), 'bytes': size},
+        'jobs': jobs,
+    }
+    results['check_style.check_file'] = _throughput(
+        _time_per_file(check_style.check_file, files), len(files), size)
+    results['check_style.check_complexity'] = _throughput(
+        _time_per_file(check_style.check_complexity, files), len(files), size)
+    results['find_memory_leaks.check_file'] = _throughput(
+        _time_per_file(find_memory_leaks.check_file, files), len(files), size)
+
+    for name, module in (('check_style', check_style), ('find_memory_leaks', find_memory_leaks)):
+        start = time.perf_counter()
+        module.scan_directory(corpus, jobs)
+        results[f'{name}.scan_directory'] = _throughput(
+            time.perf_counter() - start, len(files), size)
+
+    results['rules'] = rule_costs(files)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small',
+                        help='corpus size preset (default: small)')
+    parser.add_argument('--seed', type=int, default=0, help='corpus random seed (default: 0)')
+    parser.add_argument('--corpus', help='generate into (or reuse) this directory instead of a temp dir')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes for the scan_directory runs (default: 1)')
+    parser.add_argument('-o', '--output', help='write the JSON results to a file')
+    args = parser.parse_args()
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix='code-review-bench-')
+    try:
+        if not any(Path(corpus).rglob('*.java')):
+            print(f"Generating {args.size} corpus in {corpus}...", file=sys.stderr)
+            generate_corpus(corpus, args.size, args.seed)
+        results = run_benchmark(corpus, args.jobs)
+        results['size'] = args.size
+        results['seed'] = args.seed
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,22 +3,28 @@
 Check Java code style issues based on Alibaba Java Coding Guidelines.
 """
 
-import os
-import re
-from pathlib import Path
+import sys
+
+from java_lexer import read_source
+from method_index import FUNCTION_KINDS, IndexBuilder
+from rule_engine import RuleSet, scan_windows
+from scan_cache import CACHE_DIR
+from scan_runner import ScanTool
 
 # Patterns to detect style issues
 PATTERNS = [
     {
         'name': 'Magic Number',
         'pattern': r'(return|if|while|for|==|!=|<|>|<=|>=)\s+[\d]+[^\d;]',
-        'exclusion': r'(//|\*)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'Magic number without constant definition',
     },
     {
         'name': 'String concatenation in log',
-        'pattern': r'(log\.(info|debug|warn|error|trace)\s*\(\s*"[^"]*\s*\+\s*',
+        'pattern': r'log\.(info|debug|warn|error|trace)\s*\(\s*"[^"]*"\s*\+\s*',
+        'view': 'code',
         'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'String concatenation in log call - use parameterized logging',
@@ -26,6 +32,7 @@ PATTERNS = [
     {
         'name': 'Broad exception catch',
         'pattern': r'catch\s*\(\s*Exception\s+\w+\s*\)',
+        'view': 'masked',
         'exclusion': None,
         'severity': 'HIGH',
         'description': 'Catching broad Exception - catch specific exceptions',
@@ -33,83 +40,99 @@ PATTERNS = [
     {
         'name': 'Print stack trace',
         'pattern': r'\.printStackTrace\(\)',
-        'exclusion': r'//',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'HIGH',
         'description': 'Using printStackTrace() - use logger',
     },
     {
         'name': 'Empty catch block',
         'pattern': r'catch\s*\([^)]*\)\s*\{\s*\}',
-        'exclusion': r'//',
+        'view': 'masked',
+        'multiline': True,
+        # A catch whose body is only a comment explaining why the exception
+        # is ignored is not empty
+        'exclusion': r'\S',
+        'exclusion_view': 'comments',
         'severity': 'HIGH',
         'description': 'Empty catch block - log or handle exception',
     },
     {
         'name': 'Return null in catch',
         'pattern': r'catch\s*\([^)]*\)\s*\{[^}]*return\s+null',
-        'exclusion': r'//',
+        'view': 'masked',
+        'multiline': True,
+        'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'Returning null in catch block - throw exception or return default',
     },
     {
         'name': 'Hardcoded password',
         'pattern': r'(password|pwd|secret)\s*=\s*"[^"]+"',
-        'exclusion': r'(//|// TODO|FIXME)',
+        'view': 'code',
+        'exclusion': None,
         'severity': 'CRITICAL',
         'description': 'Hardcoded password or secret',
     },
     {
         'name': 'System.out.println',
         'pattern': r'System\.out\.println\(',
-        'exclusion': r'(//|// TODO|FIXME)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'Using System.out.println - use logger',
     },
     {
         'name': 'System.err.println',
         'pattern': r'System\.err\.println\(',
-        'exclusion': r'(//|// TODO|FIXME)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'Using System.err.println - use logger',
     },
     {
         'name': 'String comparison with ==',
         'pattern': r'(String\s+\w+)\s*==\s*',
-        'exclusion': r'(//|// TODO|FIXME)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'String comparison with == - use equals()',
     },
-    {
-        'name': 'Long method (potential)',
-        'pattern': r'public\s+(?!class|interface|enum)[^{]+\{.*\{.*\{.*\{',
-        'exclusion': None,
-        'severity': 'LOW',
-        'description': 'Method with deep nesting - consider refactoring',
-    },
     {
         'name': 'TODO without owner',
         'pattern': r'TODO(?!:)',
+        'view': 'comments',
         'exclusion': r'TODO:\s*\w+:',
         'severity': 'LOW',
         'description': 'TODO without owner and date',
     },
     {
         'name': 'SQL injection risk (string concat)',
-        'pattern': r'(SELECT|INSERT|UPDATE|DELETE)\s+[^;]*\s*\+\s*\w+',
-        'exclusion': r'(//|\*)',
+        # A single \s: with \s+ before [^;]* a long run of blanks could be
+        # split between the two repeats in every possible way
+        'pattern': r'(SELECT|INSERT|UPDATE|DELETE)\s[^;]*\+\s*\w',
+        'view': 'code',
+        'exclusion': None,
         'severity': 'CRITICAL',
         'description': 'SQL query with string concatenation - use parameterized queries',
     },
     {
         'name': 'Empty line count',
         'pattern': r'\n\s*\n\s*\n',
+        'view': 'bytes',
+        'multiline': True,
         'exclusion': None,
         'severity': 'LOW',
         'description': 'Multiple empty lines - remove extra blank lines',
     },
     {
         'name': 'Trailing whitespace',
-        'pattern': r'[ \t]+\n',
+        # The lookbehind starts a match only at the first blank of a run,
+        # instead of retrying (and backtracking) from every indentation blank
+        'pattern': r'(?<![ \t])[ \t]+\n',
+        'view': 'bytes',
+        'multiline': True,
+        'literals': [' \n', '\t\n'],
         'exclusion': None,
         'severity': 'LOW',
         'description': 'Trailing whitespace - remove spaces at end of line',
@@ -117,179 +140,178 @@ PATTERNS = [
     {
         'name': 'Star import',
         'pattern': r'^import\s+[\w.]+\.(\*|\*)\s*;',
+        'view': 'masked',
         'exclusion': None,
         'severity': 'MEDIUM',
         'description': 'Star import - import specific classes',
     },
 ]
 
+RULES = RuleSet(PATTERNS)
+
+# Methods above these limits are reported by the structural rules
+COMPLEXITY_THRESHOLD = 10
+MAX_NESTING_DEPTH = 3
+MAX_METHOD_LENGTH = 50
+
+# Rules evaluated on the method index rather than by pattern
+STRUCTURE_RULES = [
+    {
+        'name': 'High Cyclomatic Complexity',
+        'severity': 'MEDIUM',
+        'description': f'Method cyclomatic complexity above {COMPLEXITY_THRESHOLD}',
+    },
+    {
+        'name': 'Long method (potential)',
+        'severity': 'LOW',
+        'description': 'Method with deep nesting - consider refactoring',
+    },
+    {
+        'name': 'Method too long',
+        'severity': 'LOW',
+        'description': f'Method longer than {MAX_METHOD_LENGTH} lines',
+    },
+]
+
+TOOL_NAME = 'check_style'
+REPORT_TITLE = 'STYLE CHECK RESULTS'
+EMPTY_MESSAGE = '✅ No style issues found!'
+CACHE_KEY = (PATTERNS, STRUCTURE_RULES, COMPLEXITY_THRESHOLD, MAX_NESTING_DEPTH, MAX_METHOD_LENGTH)
+
+
+def check_source(filepath, source):
+    """Check a lexed Java file (a JavaSource) for style issues."""
+    return RULES.scan_source(filepath, source)
+
 
 def check_file(filepath):
     """Check a single Java file for style issues."""
-    issues = []
+    return scan_windows(filepath, (RULES.stream,))
+
+
+# Measure, threshold and message of each structure rule
+STRUCTURE_MEASURES = {
+    'High Cyclomatic Complexity': (
+        lambda method: method.complexity, COMPLEXITY_THRESHOLD,
+        'Method has complexity {} (recommended: < {})'),
+    'Long method (potential)': (
+        lambda method: method.max_nesting, MAX_NESTING_DEPTH,
+        'Method nests blocks {} levels deep (recommended: <= {}) - consider refactoring'),
+    'Method too long': (
+        lambda method: method.length, MAX_METHOD_LENGTH,
+        'Method is {} lines long (recommended: < {})'),
+}
+
+
+class ComplexityStream:
+    """Complexity, nesting and length checks fed one window of a file at a time.
+
+    Methods are checked as soon as their bodies close and then dropped, so
+    only the open scopes and the issues found are kept between windows.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.builder = IndexBuilder()
+        self.codes = {}
+        self.issues = {rule['name']: [] for rule in STRUCTURE_RULES}
+
+    def _remember_code(self, scope, first_line, lines):
+        if id(scope) not in self.codes and first_line <= scope.start_line < first_line + len(lines):
+            self.codes[id(scope)] = lines[scope.start_line - first_line].strip()[:80]
+
+    def _check(self, methods):
+        for method in methods:
+            code = self.codes.pop(id(method), '')
+            for rule in STRUCTURE_RULES:
+                measure, threshold, message = STRUCTURE_MEASURES[rule['name']]
+                value = measure(method)
+                if value > threshold:
+                    self.issues[rule['name']].append({
+                        'line': method.start_line,
+                        'end_line': method.end_line,
+                        'file': self.filepath,
+                        'severity': rule['severity'],
+                        'name': rule['name'],
+                        'description': message.format(value, threshold),
+                        'code': code,
+                    })
+
+    def feed(self, first_line, source, final=True):
+        masked = source.view_text('masked')
+        self.builder.feed(masked if final else masked + '\n')
+        lines = source.lines
+        for scope in self.builder.stack:
+            if scope.kind in FUNCTION_KINDS:
+                self._remember_code(scope, first_line, lines)
+        methods = self.builder.take_methods()
+        for method in methods:
+            self._remember_code(method, first_line, lines)
+        self._check(methods)
+
+    def finish(self):
+        self.builder.finish()
+        self._check(self.builder.take_methods())
+        issues = []
+        for rule in STRUCTURE_RULES:
+            issues.extend(sorted(self.issues[rule['name']], key=lambda issue: issue['line']))
+        return issues
 
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            lines = content.split('\n')
-
-            for pattern_def in PATTERNS:
-                pattern = pattern_def['pattern']
-                exclusion = pattern_def.get('exclusion', '')
-
-                for line_num, line in enumerate(lines, 1):
-                    if re.search(pattern, line):
-                        # Check for exclusion
-                        if exclusion and re.search(exclusion, line):
-                            continue
-
-                        issues.append({
-                            'line': line_num,
-                            'file': filepath,
-                            'severity': pattern_def['severity'],
-                            'name': pattern_def['name'],
-                            'description': pattern_def['description'],
-                            'code': line.strip(),
-                        })
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}")
 
-    return issues
+def analyze_complexity(filepath, source):
+    """Check method complexity, nesting and length in a lexed Java file.
+
+    All three rules read one structural index of the file's methods and
+    lambdas (see method_index), built from the masked view so braces and
+    keywords inside comments and string literals are ignored.
+    """
+    stream = ComplexityStream(filepath)
+    stream.feed(1, source)
+    return stream.finish()
 
 
 def check_complexity(filepath):
     """Check cyclomatic complexity of methods."""
     issues = []
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            lines = content.split('\n')
-
-            in_method = False
-            method_start = 0
-            brace_count = 0
-            complexity = 1
-
-            for line_num, line in enumerate(lines, 1):
-                stripped = line.strip()
-
-                # Detect method start
-                if re.match(r'(public|private|protected|static|final)?\s*(\w+<[^>]*>)?\s+\w+\s*\([^)]*\)\s*(throws\s+[\w\s,]+)?\s*\{', stripped):
-                    if not in_method:
-                        in_method = True
-                        method_start = line_num
-                        brace_count = 1
-                        complexity = 1
-                    continue
-
-                if in_method:
-                    # Count braces
-                    brace_count += stripped.count('{')
-                    brace_count -= stripped.count('}')
-
-                    # Count complexity points
-                    if re.search(r'\b(if|else|case|default|for|while|catch|switch)\b', stripped):
-                        complexity += 1
-
-                    # Method end
-                    if brace_count == 0:
-                        in_method = False
-                        if complexity > 10:
-                            issues.append({
-                                'line': method_start,
-                                'file': filepath,
-                                'severity': 'MEDIUM',
-                                'name': 'High Cyclomatic Complexity',
-                                'description': f'Method has complexity {complexity} (recommended: < 10)',
-                                'code': lines[method_start - 1].strip()[:80],
-                            })
-                        complexity = 1
-
+        issues = analyze_complexity(filepath, read_source(filepath))
     except Exception as e:
-        print(f"Error analyzing complexity for {filepath}: {e}")
+        print(f"Error analyzing complexity for {filepath}: {e}", file=sys.stderr)
 
     return issues
 
 
-def scan_directory(directory):
-    """Scan all Java files in directory recursively."""
-    issues = []
-    java_files = list(Path(directory).rglob('*.java'))
+def scan_file(filepath, streams=()):
+    """Run the style and complexity checks (and extra ``streams``) on a file, reading it once."""
+    return scan_windows(filepath, (RULES.stream, ComplexityStream) + tuple(streams))
 
-    if not java_files:
-        print(f"No Java files found in {directory}")
-        return issues
 
-    print(f"Scanning {len(java_files)} Java files...")
+TOOL = ScanTool(TOOL_NAME, REPORT_TITLE, EMPTY_MESSAGE, scan_file, PATTERNS + STRUCTURE_RULES, CACHE_KEY,
+                {TOOL_NAME: RULES})
 
-    for filepath in java_files:
-        file_issues = check_file(str(filepath))
-        complexity_issues = check_complexity(str(filepath))
-        issues.extend(file_issues)
-        issues.extend(complexity_issues)
 
-    return issues
+def open_cache(cache_dir=CACHE_DIR):
+    """Open the incremental scan cache for this rule set."""
+    return TOOL.open_cache(cache_dir)
 
 
-def print_issues(issues):
-    """Print found issues in a readable format."""
-    if not issues:
-        print("\n✅ No style issues found!")
-        return
+def iter_scan(target, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+    """Yield the issues of each Java file under ``target`` as it is scanned."""
+    return TOOL.iter_scan(target, jobs, cache, since, excludes, gitignore)
 
-    # Sort by severity
-    severity_order = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
-    issues.sort(key=lambda x: severity_order.get(x['severity'], 4))
 
-    # Count by severity
-    severity_counts = {}
-    for issue in issues:
-        severity_counts[issue['severity']] = severity_counts.get(issue['severity'], 0) + 1
-
-    print("\n" + "=" * 80)
-    print(f"STYLE CHECK RESULTS - {len(issues)} issues found")
-    print("=" * 80)
-
-    for severity in ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']:
-        count = severity_counts.get(severity, 0)
-        if count > 0:
-            print(f"\n[{severity}]: {count} issue(s)")
+def scan_directory(directory, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+    """Scan all Java files in directory recursively."""
+    return TOOL.scan_directory(directory, jobs, cache, since, excludes, gitignore)
 
-    print("\n" + "-" * 80)
-    for issue in issues:
-        print(f"\n[{issue['severity']}] {issue['name']}")
-        print(f"  File: {issue['file']}:{issue['line']}")
-        print(f"  Description: {issue['description']}")
-        if 'code' in issue and issue['code']:
-            print(f"  Code: {issue['code'][:80]}...")
 
-    print("\n" + "=" * 80)
+def print_issues(issues):
+    """Print found issues in a readable format."""
+    TOOL.print_issues(issues)
 
 
 def main():
-    import sys
-
-    if len(sys.argv) < 2:
-        print("Usage: python check_style.py <directory|file>")
-        print("Example: python check_style.py src/main/java")
-        sys.exit(1)
-
-    target = sys.argv[1]
-    issues = []
-
-    if os.path.isfile(target):
-        print(f"Scanning file: {target}")
-        style_issues = check_file(target)
-        complexity_issues = check_complexity(target)
-        issues.extend(style_issues)
-        issues.extend(complexity_issues)
-    elif os.path.isdir(target):
-        issues = scan_directory(target)
-    else:
-        print(f"Error: {target} is not a valid file or directory")
-        sys.exit(1)
-
-    print_issues(issues)
+    TOOL.main(__doc__)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Run the style, complexity and memory leak checks in one pass.
+
+Each Java file is read and lexed once, window by window for very large
+files, and handed to every selected check, producing a single merged
+report. Rule packs given with ``--rules`` run in the same pass.
+"""
+
+from functools import partial
+
+import check_style
+import find_memory_leaks
+from rule_engine import scan_windows
+from scan_runner import ScanTool
+
+# Checks: name -> factory(filepath) of a stream that is fed each window
+# of the file and returns its issues from finish()
+CHECKS = {
+    'style': check_style.RULES.stream,
+    'complexity': check_style.ComplexityStream,
+    'memory': find_memory_leaks.RULES.stream,
+}
+
+REPORT_TITLE = 'CODE REVIEW RESULTS'
+EMPTY_MESSAGE = '✅ No code review issues found!'
+
+
+def scan_file(filepath, checks=tuple(CHECKS), streams=()):
+    """Run the selected checks (and extra ``streams``) on a single file, reading it once."""
+    return scan_windows(filepath, [CHECKS[check] for check in checks] + list(streams))
+
+
+def make_tool(checks=tuple(CHECKS)):
+    """Build the ScanTool for a selection of checks."""
+    rules = []
+    if 'style' in checks:
+        rules.extend(check_style.PATTERNS)
+    if 'complexity' in checks:
+        rules.extend(check_style.STRUCTURE_RULES)
+    if 'memory' in checks:
+        rules.extend(find_memory_leaks.PATTERNS)
+    cache_key = (
+        checks,
+        check_style.CACHE_KEY if {'style', 'complexity'} & set(checks) else None,
+        find_memory_leaks.CACHE_KEY if 'memory' in checks else None,
+    )
+    rule_sets = {}
+    if 'style' in checks:
+        rule_sets[check_style.TOOL_NAME] = check_style.RULES
+    if 'memory' in checks:
+        rule_sets[find_memory_leaks.TOOL_NAME] = find_memory_leaks.RULES
+    cleanup_rules = find_memory_leaks.CLEANUP_RULES if 'memory' in checks else None
+    return ScanTool(f"code_review:{'+'.join(checks)}", REPORT_TITLE, EMPTY_MESSAGE,
+                    partial(scan_file, checks=checks), rules, cache_key, rule_sets, cleanup_rules)
+
+
+def parse_checks(value):
+    checks = tuple(check.strip() for check in value.split(',') if check.strip())
+    unknown = [check for check in checks if check not in CHECKS]
+    if unknown:
+        raise ValueError(f"unknown check(s): {', '.join(unknown)}")
+    if not checks:
+        raise ValueError("no checks selected")
+    return checks
+
+
+def main():
+    tool = make_tool()
+    parser = tool.build_parser(__doc__)
+    parser.add_argument('--checks', default=','.join(CHECKS),
+                        help=f"comma-separated checks to run (default: {','.join(CHECKS)})")
+    args = parser.parse_args()
+
+    try:
+        checks = parse_checks(args.checks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    make_tool(checks).run(args)
+
+
+if __name__ == '__main__':
+    main()
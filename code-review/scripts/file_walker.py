@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Streaming discovery of the Java files to scan.
+
+``FileWalker`` walks a directory with ``os.scandir``, prunes ignored
+directories before descending into them and yields paths as it finds
+them, so scanning starts on the first file instead of after a full
+``rglob``. A path is ignored if it matches, in increasing priority:
+
+- DEFAULT_EXCLUDES (VCS metadata, build output, generated sources),
+- the ``.gitignore`` files of the git work tree, from the repository root
+  down to the directory being walked (``!`` negation, ``/``-anchored and
+  directory-only patterns and ``**`` are supported),
+- the ``--exclude`` globs, written like ``.gitignore`` patterns relative to
+  the scanned directory.
+
+The last matching pattern wins, as in git. Paths are yielded in sorted
+path order. ``stats`` walks the same files with their size and mtime,
+taken from the ``os.scandir`` entries, for cheap change polling.
+"""
+
+import os
+import re
+
+from scan_cache import CACHE_DIR
+
+DEFAULT_EXCLUDES = (
+    '.git/', '.hg/', '.svn/', 'target/', 'build/', 'generated-sources/',
+    'node_modules/', CACHE_DIR + '/',
+)
+
+GITIGNORE = '.gitignore'
+
+
+def translate_pattern(pattern):
+    """Compile a gitignore pattern (without ``!`` or a trailing ``/``).
+
+    The regex matches paths relative to the directory the pattern belongs
+    to; patterns without a slash match a name at any depth.
+    """
+    anchored = '/' in pattern
+    pattern = pattern[1:] if pattern.startswith('/') else pattern
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif char == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif char == '?':
+            parts.append('[^/]')
+            i += 1
+        elif char == '[' and pattern.find(']', i + 2) != -1:
+            end = pattern.find(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif char == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(prefix + ''.join(parts))
+
+
+def parse_patterns(lines):
+    """Parse gitignore lines into ``(regex, negate, directory_only)`` rules."""
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((translate_pattern(line), negate, directory_only))
+    return rules
+
+
+def _read_gitignore(directory):
+    try:
+        with open(os.path.join(directory, GITIGNORE), encoding='utf-8', errors='replace') as f:
+            return parse_patterns(f)
+    except OSError:
+        return []
+
+
+def _sort_key(entry_name, is_dir):
+    # Sorting "name/" for directories makes a depth-first walk produce the
+    # same order as sorting the full path strings
+    return entry_name + '/' if is_dir else entry_name
+
+
+class FileWalker:
+    """Lazily yield the files under ``root`` with ``suffix`` that are not ignored."""
+
+    def __init__(self, root, excludes=(), gitignore=True, suffix='.java'):
+        self.root = os.path.normpath(root)
+        self.suffix = suffix
+        self.gitignore = gitignore
+        self._root_abs = os.path.abspath(root)
+        # (base directory, rules) in increasing priority
+        self._base_layers = [(self._root_abs, parse_patterns(DEFAULT_EXCLUDES))]
+        if gitignore:
+            for directory in self._ancestors():
+                rules = _read_gitignore(directory)
+                if rules:
+                    self._base_layers.append((directory, rules))
+        self._exclude_layer = (self._root_abs, parse_patterns(excludes))
+        self._gitignores = {}
+
+    def _ancestors(self):
+        """Directories above ``root`` up to its git work tree root, outermost first."""
+        ancestors = []
+        directory = self._root_abs
+        while not os.path.exists(os.path.join(directory, '.git')):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # Not inside a git work tree: only the walked tree's own files apply
+                return []
+            directory = parent
+            ancestors.append(directory)
+        return list(reversed(ancestors))
+
+    def _layers_for(self, directory):
+        """Ignore layers in effect for entries of ``directory`` (absolute)."""
+        layers = list(self._base_layers)
+        if self.gitignore:
+            relative = os.path.relpath(directory, self._root_abs)
+            current = self._root_abs
+            parts = [] if relative == '.' else relative.split(os.sep)
+            for part in [None] + parts:
+                if part is not None:
+                    current = os.path.join(current, part)
+                if current not in self._gitignores:
+                    self._gitignores[current] = _read_gitignore(current)
+                if self._gitignores[current]:
+                    layers.append((current, self._gitignores[current]))
+        layers.append(self._exclude_layer)
+        return layers
+
+    @staticmethod
+    def _ignored(layers, path, is_dir):
+        ignored = False
+        for base, rules in layers:
+            if not path.startswith(base + os.sep):
+                continue
+            relative = path[len(base) + 1:].replace(os.sep, '/')
+            for regex, negate, directory_only in rules:
+                if (is_dir or not directory_only) and regex.fullmatch(relative):
+                    ignored = not negate
+        return ignored
+
+    def is_excluded(self, path):
+        """Whether a file (e.g. one reported by git) would be skipped by the walk."""
+        path = os.path.abspath(path)
+        if not path.startswith(self._root_abs + os.sep):
+            return False
+        directory = self._root_abs
+        for part in path[len(self._root_abs) + 1:].split(os.sep)[:-1]:
+            directory = os.path.join(directory, part)
+            if self._ignored(self._layers_for(os.path.dirname(directory)), directory, True):
+                return True
+        return self._ignored(self._layers_for(os.path.dirname(path)), path, False)
+
+    def __iter__(self):
+        if os.path.isfile(self.root):
+            yield self.root
+            return
+        for path, _entry in self._walk(self.root, self._root_abs):
+            yield path
+
+    def stats(self):
+        """Yield ``(path, size, mtime_ns)`` for the files ``__iter__`` yields."""
+        if os.path.isfile(self.root):
+            try:
+                stat = os.stat(self.root)
+            except OSError:
+                return
+            yield self.root, stat.st_size, stat.st_mtime_ns
+            return
+        for path, entry in self._walk(self.root, self._root_abs):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime_ns
+
+    def _walk(self, directory, directory_abs):
+        try:
+            with os.scandir(directory) as scan:
+                entries = [(entry.name, entry.is_dir(follow_symlinks=False), entry.is_file(), entry)
+                           for entry in scan]
+        except OSError:
+            return
+        layers = self._layers_for(directory_abs)
+        entries.sort(key=lambda entry: _sort_key(entry[0], entry[1]))
+        for name, is_dir, is_file, entry in entries:
+            path = name if directory == os.curdir else os.path.join(directory, name)
+            path_abs = os.path.join(directory_abs, name)
+            if is_dir:
+                if not self._ignored(layers, path_abs, True):
+                    yield from self._walk(path, path_abs)
+            elif is_file and name.endswith(self.suffix) and not self._ignored(layers, path_abs, False):
+                yield path, entry
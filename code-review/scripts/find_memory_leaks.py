@@ -2,17 +2,23 @@
 """
 Find potential memory leaks in Java code.
 Scans for common patterns that lead to memory leaks.
+
+ThreadLocal and ExecutorService hits are checked against the repository's
+symbol index (see symbol_index): a field or variable that is removed or
+shut down anywhere it can be reached from is not reported.
 """
 
-import os
-import re
-from pathlib import Path
+
+from rule_engine import RuleSet, scan_windows
+from scan_cache import CACHE_DIR
+from scan_runner import ScanTool
 
 # Patterns to detect memory leaks
 PATTERNS = [
     {
         'name': 'Unclosed InputStream',
         'pattern': r'(InputStream|FileInputStream|BufferedInputStream)\s+\w+\s*=\s*new\s+',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*',
         'severity': 'CRITICAL',
         'description': 'InputStream not wrapped in try-with-resources',
@@ -20,6 +26,7 @@ PATTERNS = [
     {
         'name': 'Unclosed OutputStream',
         'pattern': r'(OutputStream|FileOutputStream|BufferedOutputStream)\s+\w+\s*=\s*new\s+',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*',
         'severity': 'CRITICAL',
         'description': 'OutputStream not wrapped in try-with-resources',
@@ -27,27 +34,31 @@ PATTERNS = [
     {
         'name': 'Unclosed Reader/Writer',
         'pattern': r'(BufferedReader|BufferedWriter|FileReader|FileWriter)\s+\w+\s*=\s*new\s+',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*',
         'severity': 'CRITICAL',
         'description': 'Reader/Writer not wrapped in try-with-resources',
     },
     {
         'name': 'Unclosed Connection',
-        'pattern': r'Connection\s+\w+\s*=\s*[^;]*getConnection\(\)',
+        'pattern': r'Connection\s+\w+\s*=[^;]*getConnection\(\)',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*Connection',
         'severity': 'CRITICAL',
         'description': 'JDBC Connection not wrapped in try-with-resources',
     },
     {
         'name': 'Unclosed Statement',
-        'pattern': r'(Statement|PreparedStatement)\s+\w+\s*=\s*[^;]*create',
+        'pattern': r'(Statement|PreparedStatement)\s+\w+\s*=[^;]*create',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*(Statement|PreparedStatement)',
         'severity': 'CRITICAL',
         'description': 'JDBC Statement not wrapped in try-with-resources',
     },
     {
         'name': 'Unclosed ResultSet',
-        'pattern': r'ResultSet\s+\w+\s*=\s*[^;]*execute',
+        'pattern': r'ResultSet\s+\w+\s*=[^;]*execute',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*ResultSet',
         'severity': 'CRITICAL',
         'description': 'JDBC ResultSet not wrapped in try-with-resources',
@@ -55,6 +66,7 @@ PATTERNS = [
     {
         'name': 'Static Collection',
         'pattern': r'(private|public|protected)\s+static\s+(Map|List|Set|Collection)\s+',
+        'view': 'masked',
         'exclusion': r'(final|MAX_SIZE|MAX_COUNT)',
         'severity': 'HIGH',
         'description': 'Static collection may grow indefinitely',
@@ -62,6 +74,7 @@ PATTERNS = [
     {
         'name': 'Unclosed Socket',
         'pattern': r'Socket\s+\w+\s*=\s*new\s+',
+        'view': 'masked',
         'exclusion': r'try\s*\(\s*Socket',
         'severity': 'CRITICAL',
         'description': 'Socket not wrapped in try-with-resources',
@@ -69,133 +82,85 @@ PATTERNS = [
     {
         'name': 'ThreadLocal without remove',
         'pattern': r'ThreadLocal<',
-        'exclusion': r'remove\(\)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'HIGH',
         'description': 'ThreadLocal may not be cleaned up',
     },
     {
         'name': 'ExecutorService without shutdown',
         'pattern': r'ExecutorService\s+\w+\s*=\s*',
-        'exclusion': r'shutdown\(\)',
+        'view': 'masked',
+        'exclusion': None,
         'severity': 'HIGH',
         'description': 'ExecutorService may not have shutdown logic',
     },
     {
         'name': 'String concatenation in loop',
         'pattern': r'(for|while)\s*\([^)]*\)\s*\{[^}]*\+\s*=.*\+',
+        'view': 'masked',
         'exclusion': r'StringBuilder|StringBuffer',
         'severity': 'MEDIUM',
         'description': 'String concatenation in loop - use StringBuilder',
     },
 ]
 
+RULES = RuleSet(PATTERNS)
+
+# Rules whose hits are dropped when the symbol index finds the declared
+# field or variable cleaned up: rule name -> declared types
+CLEANUP_RULES = {
+    'ThreadLocal without remove': ('ThreadLocal', 'InheritableThreadLocal'),
+    'ExecutorService without shutdown': ('ExecutorService', 'ScheduledExecutorService'),
+}
+
+TOOL_NAME = 'find_memory_leaks'
+REPORT_TITLE = 'MEMORY LEAK DETECTION RESULTS'
+EMPTY_MESSAGE = '✅ No memory leak issues found!'
+CACHE_KEY = (PATTERNS,)
+
+
+def check_source(filepath, source):
+    """Check a lexed Java file (a JavaSource) for memory leak patterns."""
+    return RULES.scan_source(filepath, source)
+
 
 def check_file(filepath):
     """Check a single Java file for memory leak patterns."""
-    issues = []
-
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            lines = content.split('\n')
-
-            for pattern_def in PATTERNS:
-                pattern = pattern_def['pattern']
-                exclusion = pattern_def.get('exclusion', '')
-
-                for line_num, line in enumerate(lines, 1):
-                    if re.search(pattern, line):
-                        # Check for exclusion
-                        if exclusion and re.search(exclusion, line):
-                            continue
-
-                        issues.append({
-                            'line': line_num,
-                            'file': filepath,
-                            'severity': pattern_def['severity'],
-                            'name': pattern_def['name'],
-                            'description': pattern_def['description'],
-                            'code': line.strip(),
-                        })
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}")
-
-    return issues
-
-
-def scan_directory(directory):
-    """Scan all Java files in directory recursively."""
-    issues = []
-    java_files = list(Path(directory).rglob('*.java'))
+    return scan_windows(filepath, (RULES.stream,))
 
-    if not java_files:
-        print(f"No Java files found in {directory}")
-        return issues
 
-    print(f"Scanning {len(java_files)} Java files...")
+def scan_file(filepath, streams=()):
+    """Run the memory leak checks (and extra ``streams``) on a single file."""
+    return scan_windows(filepath, (RULES.stream,) + tuple(streams))
 
-    for filepath in java_files:
-        file_issues = check_file(str(filepath))
-        issues.extend(file_issues)
 
-    return issues
+TOOL = ScanTool(TOOL_NAME, REPORT_TITLE, EMPTY_MESSAGE, scan_file, PATTERNS, CACHE_KEY,
+                {TOOL_NAME: RULES}, CLEANUP_RULES)
 
 
-def print_issues(issues):
-    """Print found issues in a readable format."""
-    if not issues:
-        print("\n✅ No memory leak issues found!")
-        return
+def open_cache(cache_dir=CACHE_DIR):
+    """Open the incremental scan cache for this rule set."""
+    return TOOL.open_cache(cache_dir)
 
-    # Sort by severity
-    severity_order = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
-    issues.sort(key=lambda x: severity_order.get(x['severity'], 4))
 
-    # Count by severity
-    severity_counts = {}
-    for issue in issues:
-        severity_counts[issue['severity']] = severity_counts.get(issue['severity'], 0) + 1
+def iter_scan(target, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+    """Yield the issues of each Java file under ``target`` as it is scanned."""
+    return TOOL.iter_scan(target, jobs, cache, since, excludes, gitignore)
 
-    print("\n" + "=" * 80)
-    print(f"MEMORY LEAK DETECTION RESULTS - {len(issues)} issues found")
-    print("=" * 80)
 
-    for severity in ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']:
-        count = severity_counts.get(severity, 0)
-        if count > 0:
-            print(f"\n[{severity}]: {count} issue(s)")
+def scan_directory(directory, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+    """Scan all Java files in directory recursively."""
+    return TOOL.scan_directory(directory, jobs, cache, since, excludes, gitignore)
 
-    print("\n" + "-" * 80)
-    for issue in issues:
-        print(f"\n[{issue['severity']}] {issue['name']}")
-        print(f"  File: {issue['file']}:{issue['line']}")
-        print(f"  Description: {issue['description']}")
-        print(f"  Code: {issue['code'][:80]}...")
 
-    print("\n" + "=" * 80)
+def print_issues(issues):
+    """Print found issues in a readable format."""
+    TOOL.print_issues(issues)
 
 
 def main():
-    import sys
-
-    if len(sys.argv) < 2:
-        print("Usage: python find_memory_leaks.py <directory|file>")
-        print("Example: python find_memory_leaks.py src/main/java")
-        sys.exit(1)
-
-    target = sys.argv[1]
-    issues = []
-
-    if os.path.isfile(target):
-        print(f"Scanning file: {target}")
-        issues = check_file(target)
-    elif os.path.isdir(target):
-        issues = scan_directory(target)
-    else:
-        print(f"Error: {target} is not a valid file or directory")
-        sys.exit(1)
-
-    print_issues(issues)
+    TOOL.main(__doc__)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Git helpers for reviewing only what changed on a branch.
+
+Asks git which .java files differ from a ref and which line ranges were
+added or modified, so the scanners can skip untouched files and report
+only issues inside changed hunks.
+"""
+
+import os
+import re
+import subprocess
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def _git(cwd, *args):
+    result = subprocess.run(
+        ['git', '-c', 'core.quotepath=off', *args], cwd=cwd, capture_output=True, text=True,
+        encoding='utf-8', errors='replace',
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def _display_path(toplevel, relpath, absolute):
+    path = os.path.join(toplevel, relpath)
+    return path if absolute else os.path.relpath(path)
+
+
+def changed_lines(ref, target):
+    """Map each changed .java file under ``target`` to its changed line ranges.
+
+    Ranges are inclusive ``(start, end)`` pairs in the working-tree version
+    of the file, covering everything changed since ``ref`` (committed or
+    not). Untracked files count as changed in full, represented by the
+    range ``(1, None)``. Paths are returned in the same absolute or relative
+    form as ``target``.
+    """
+    cwd = target if os.path.isdir(target) else os.path.dirname(target) or '.'
+    toplevel = _git(cwd, 'rev-parse', '--show-toplevel').strip()
+    pathspec = os.path.abspath(target)
+    absolute = os.path.isabs(target)
+
+    changes = {}
+    current = None
+    diff = _git(toplevel, 'diff', '--unified=0', '--no-color', '--no-ext-diff',
+                '--diff-filter=AMR', ref, '--', pathspec)
+    for line in diff.splitlines():
+        if line.startswith('+++ '):
+            name = line[4:]
+            current = None
+            if name.startswith('b/') and name.endswith('.java'):
+                current = _display_path(toplevel, name[2:], absolute)
+                changes[current] = []
+        elif current is not None and line.startswith('@@'):
+            match = HUNK_HEADER.match(line)
+            if match:
+                start = int(match.group(1))
+                count = int(match.group(2)) if match.group(2) is not None else 1
+                if count:
+                    changes[current].append((start, start + count - 1))
+
+    untracked = _git(toplevel, 'ls-files', '--others', '--exclude-standard', '--', pathspec)
+    for name in untracked.splitlines():
+        if name.endswith('.java'):
+            changes[_display_path(toplevel, name, absolute)] = [(1, None)]
+
+    # Files whose hunks only deleted lines have nothing left to report
+    return {path: ranges for path, ranges in changes.items() if ranges}
+
+
+def _overlaps(start, end, ranges):
+    for range_start, range_end in ranges:
+        if start <= (range_end if range_end is not None else start) and end >= range_start:
+            return True
+    return False
+
+
+def filter_issues(issues, ranges):
+    """Keep only issues that touch one of the changed line ranges.
+
+    Issues spanning several lines (e.g. a whole method for complexity
+    checks) carry an ``end_line`` and are kept if any part is changed.
+    """
+    return [
+        issue for issue in issues
+        if _overlaps(issue['line'], issue.get('end_line', issue['line']), ranges)
+    ]
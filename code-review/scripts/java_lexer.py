@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Lightweight Java lexer for the code-review scanners.
+
+Finds comments and string/char literals in one linear pass and derives
+views of the source in which the other parts are blanked out. Blanking
+replaces every character except newlines with a space, so each view has the
+same length and line layout as the original text: offsets and line numbers
+are shared by all views and no separate line map is needed.
+
+Files are read as bytes, once. The text is only decoded when a view other
+than ``bytes`` is needed: UTF-8 is tried first, then GB18030 (a superset
+of GBK, common in legacy Chinese code bases). Rules on the ``bytes`` view
+match ASCII patterns against the undecoded file.
+
+Files larger than STREAM_THRESHOLD are not read whole: ``iter_windows``
+reads them CHUNK_SIZE characters at a time and cuts the text into windows
+of whole lines at points no comment or literal spans, so each window lexes
+exactly as it would as part of the whole file. Text that is read is lexed
+once, and a block comment or text block too long for one window is cut at
+a line break and continued in the next.
+"""
+
+import codecs
+import os
+import re
+from bisect import bisect_right
+
+TOKEN = re.compile(r'''
+    (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*.*?(?:\*/|\Z))
+  | (?P<text_block>"""(?:\\.|[^\\])*?(?:"""|\\?\Z))
+  | (?P<string>"(?:\\.|[^"\\\n])*"?)
+  | (?P<char>'(?:\\.|[^'\\\n])*'?)
+''', re.DOTALL | re.VERBOSE)
+
+# The rest of a block comment or text block begun in an earlier window
+CONTINUATIONS = {
+    'block_comment': re.compile(r'.*?(?:\*/|\Z)', re.DOTALL),
+    'text_block': re.compile(r'(?:\\.|[^\\])*?(?:"""|\\?\Z)', re.DOTALL),
+}
+
+NOT_NEWLINE = re.compile(r'[^\n]')
+NEWLINE = re.compile(r'\n')
+BYTES_NEWLINE = re.compile(rb'\n')
+
+COMMENT_KINDS = ('line_comment', 'block_comment')
+
+# Closing delimiters of the tokens that can span lines
+MULTILINE_TOKEN_ENDS = {'block_comment': '*/', 'text_block': '"""'}
+
+# Files above STREAM_THRESHOLD bytes are scanned in windows of about
+# CHUNK_SIZE characters, so memory stays bounded by the chunk size
+STREAM_THRESHOLD = 32 << 20
+CHUNK_SIZE = 4 << 20
+
+# Views a rule can be evaluated against; ``bytes`` is the undecoded file
+BYTES_VIEW = 'bytes'
+VIEWS = ('raw', 'code', 'masked', 'comments', BYTES_VIEW)
+
+# Tried in order when decoding; the last one never fails
+ENCODINGS = ('utf-8', 'gb18030')
+
+
+def _normalize_newlines(text):
+    """Turn CRLF and lone CR line ends into LF, as text-mode reads do."""
+    if '\r' in text:
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def decode(data, final=True):
+    """Decode ``data`` (bytes) with the first of ENCODINGS that fits.
+
+    Returns ``(encoding, text, decoder)``. The data is decoded once per
+    encoding tried and the successful result is kept. With ``final=False``
+    the data may end in the middle of a character, and ``decoder``, the
+    incremental decoder that decoded it, continues the stream (replacing
+    undecodable bytes from then on).
+    """
+    if data.isascii():
+        return 'utf-8', data.decode('ascii'), codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for encoding in ENCODINGS:
+        last = encoding == ENCODINGS[-1]
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace' if last else 'strict')
+        try:
+            text = decoder.decode(data, final)
+        except UnicodeDecodeError:
+            continue
+        decoder.errors = 'replace'
+        return encoding, text, decoder
+
+
+def blank(text):
+    """Replace everything but newlines with spaces."""
+    if '\n' not in text:
+        return ' ' * len(text)
+    return NOT_NEWLINE.sub(' ', text)
+
+
+def _blank_literal(token, continued=False):
+    """Blank a literal's contents but keep its delimiters.
+
+    A ``continued`` token is the rest of a text block begun in an earlier
+    window, without the opening delimiter.
+    """
+    if continued:
+        if token.endswith('"""'):
+            return blank(token[:-3]) + '"""'
+        return blank(token)
+    delimiter = 3 if token.startswith('"""') else 1
+    if len(token) >= 2 * delimiter and token.endswith(token[:delimiter]):
+        return token[:delimiter] + blank(token[delimiter:-delimiter]) + token[-delimiter:]
+    return token[:delimiter] + blank(token[delimiter:])
+
+
+def tokenize(text, open_kind=None, start=0):
+    """Return ``(kind, start, end)`` for every comment and literal in ``text``.
+
+    Unterminated block comments and text blocks run to the end of the text;
+    unterminated string and char literals end at the line break. With
+    ``open_kind`` the text starts inside a token of that kind (see
+    CONTINUATIONS), which becomes the first token. Lexing starts at offset
+    ``start``.
+    """
+    tokens = []
+    if open_kind is not None and start == 0:
+        start = CONTINUATIONS[open_kind].match(text).end()
+        tokens.append((open_kind, 0, start))
+    tokens.extend((m.lastgroup, m.start(), m.end()) for m in TOKEN.finditer(text, start))
+    return tokens
+
+
+def build_view(text, tokens, view, open_kind=None):
+    """Build one of the blanked views of ``text``.
+
+    ``code`` blanks comments, ``masked`` also blanks literal contents, and
+    ``comments`` keeps only the comments. ``open_kind`` is that of
+    ``tokenize``.
+    """
+    if view == 'raw':
+        return text
+
+    pieces = []
+    position = 0
+    for kind, start, end in tokens:
+        gap = text[position:start]
+        pieces.append(blank(gap) if view == 'comments' else gap)
+        token = text[start:end]
+        if kind in COMMENT_KINDS:
+            pieces.append(token if view == 'comments' else blank(token))
+        elif view == 'code':
+            pieces.append(token)
+        elif view == 'masked':
+            pieces.append(_blank_literal(token, open_kind is not None and start == 0))
+        else:
+            pieces.append(blank(token))
+        position = end
+    tail = text[position:]
+    pieces.append(blank(tail) if view == 'comments' else tail)
+    return ''.join(pieces)
+
+
+class JavaSource:
+    """A Java file's bytes or text plus lazily built, line-aligned views.
+
+    ``view_text(name)`` and ``view_lines(name)`` return the text and the
+    ``split('\\n')`` lines of the named view; the lexer runs at most once
+    per file and each view is built at most once. The ``bytes`` view is the
+    file as read and the others are decoded from it on first use (or the
+    other way round when the source is built from text). ``line_number``
+    maps an offset in any view back to its 1-based line; line breaks are
+    the same in every view and encoding. ``open_kind`` is set on a window
+    that starts inside a block comment or text block (see ``tokenize``).
+    """
+
+    def __init__(self, text=None, tokens=None, data=None, encoding=None, open_kind=None):
+        self._text = text
+        self._data = data
+        self._encoding = encoding
+        self._tokens = tokens
+        self.open_kind = open_kind
+        self._texts = {}
+        self._lines = {}
+        self._newlines = {}
+
+    @classmethod
+    def from_views(cls, texts, encoding=None):
+        """Wrap already built views (which must include ``raw``)."""
+        source = cls(texts['raw'], data=texts.get(BYTES_VIEW), encoding=encoding)
+        source._texts.update(texts)
+        return source
+
+    def _decode(self):
+        # Finding the encoding decodes the data, so the text is kept
+        self._encoding, text, _decoder = decode(self._data)
+        if self._text is None:
+            self._text = text
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            if self._data is None:
+                self._encoding = 'utf-8'
+            else:
+                self._decode()
+        return self._encoding
+
+    @property
+    def text(self):
+        if self._text is None:
+            if self._encoding is None:
+                self._decode()
+            else:
+                self._text = self._data.decode(self._encoding, errors='replace')
+        return self._text
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._text.encode(self.encoding, errors='replace')
+        return self._data
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = tokenize(self.text, self.open_kind)
+        return self._tokens
+
+    def view_text(self, view):
+        if view not in self._texts:
+            if view == 'raw':
+                self._texts[view] = self.text
+            elif view == BYTES_VIEW:
+                self._texts[view] = self.data
+            else:
+                self._texts[view] = build_view(self.text, self.tokens, view, self.open_kind)
+        return self._texts[view]
+
+    def view_lines(self, view):
+        if view not in self._lines:
+            newline = b'\n' if view == BYTES_VIEW else '\n'
+            self._lines[view] = self.view_text(view).split(newline)
+        return self._lines[view]
+
+    @property
+    def lines(self):
+        return self.view_lines('raw')
+
+    def line(self, line_num):
+        """Return the text of one raw line, decoding only that line if needed."""
+        if self._text is None:
+            data = self.view_lines(BYTES_VIEW)[line_num - 1]
+            return data.decode(self.encoding, errors='replace')
+        return self.lines[line_num - 1]
+
+    def line_count(self):
+        if self._text is None:
+            return len(self.view_lines(BYTES_VIEW))
+        return len(self.lines)
+
+    def _newline_offsets(self, view):
+        # Offsets of line breaks in text views, or in the bytes view
+        key = BYTES_VIEW if view == BYTES_VIEW else 'raw'
+        if key not in self._newlines:
+            if key == BYTES_VIEW:
+                self._newlines[key] = [m.start() for m in BYTES_NEWLINE.finditer(self.data)]
+            else:
+                self._newlines[key] = [m.start() for m in NEWLINE.finditer(self.text)]
+        return self._newlines[key]
+
+    def line_number(self, offset, view='raw'):
+        """Return the line containing ``offset`` of ``view``, via bisect on newline offsets."""
+        return bisect_right(self._newline_offsets(view), offset - 1) + 1
+
+    def line_offset(self, line_num, view='raw'):
+        """Return the offset at which a 1-based line starts in ``view``."""
+        if line_num <= 1:
+            return 0
+        return self._newline_offsets(view)[line_num - 2] + 1
+
+
+def read_source(filepath):
+    """Read a Java file's bytes, once, and wrap them; see ``decode``."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return JavaSource(data=data)
+
+
+def _is_open(buffer, kind, start, end):
+    """Whether a token was cut off by the end of ``buffer``."""
+    closing = MULTILINE_TOKEN_ENDS.get(kind)
+    if closing is None or end != len(buffer):
+        return False
+    return end - start < 2 * len(closing) or not buffer.endswith(closing)
+
+
+def _tokens_before(tokens, offset):
+    """Number of (ordered) tokens that start before ``offset``."""
+    low, high = 0, len(tokens)
+    while low < high:
+        middle = (low + high) // 2
+        if tokens[middle][1] < offset:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def safe_cut(buffer, tokens):
+    """Return the offset just after the last line break no token spans.
+
+    Returns 0 when there is none, e.g. when one block comment covers the
+    whole buffer.
+    """
+    cut = buffer.rfind('\n') + 1
+    if cut == 0:
+        return 0
+    # Tokens are ordered and do not overlap, so only the last few before
+    # the candidate cut can reach past it
+    index = _tokens_before(tokens, cut)
+    while index > 0:
+        index -= 1
+        kind, start, end = tokens[index]
+        if start >= cut:
+            continue
+        if end < cut or (end == cut and not _is_open(buffer, kind, start, end)):
+            break
+        cut = buffer.rfind('\n', 0, start) + 1
+        if cut == 0:
+            break
+    return cut
+
+
+def _forced_cut(buffer, tokens):
+    """Return ``(cut, index)`` at the last line break, inside ``tokens[index]``.
+
+    Used when no line break is safe to cut at: the token spanning the last
+    one must be a block comment or text block, which the next window then
+    continues. Returns ``(0, None)`` if there is no such line break.
+    """
+    cut = buffer.rfind('\n') + 1
+    index = _tokens_before(tokens, cut) - 1
+    if cut == 0 or index < 0:
+        return 0, None
+    kind, _start, end = tokens[index]
+    if kind not in MULTILINE_TOKEN_ENDS or end < cut:
+        return 0, None
+    return cut, index
+
+
+def _read_text_chunks(f, chunk_size):
+    """Yield ``(encoding, text)`` for consecutive chunks of a binary file.
+
+    ASCII reads the same in every encoding, so the encoding is chosen on
+    the first chunk with a non-ASCII byte and its decoder is kept for the
+    rest of the file.
+    """
+    encoding = None
+    decoder = None
+    pending_cr = ''
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        if decoder is not None:
+            text = decoder.decode(data)
+        elif data.isascii():
+            text = data.decode('ascii')
+        else:
+            encoding, text, decoder = decode(data, final=False)
+        text = pending_cr + text
+        # A CRLF may be split between two chunks
+        pending_cr = '\r' if text.endswith('\r') else ''
+        yield encoding, _normalize_newlines(text[:-1] if pending_cr else text)
+    tail = decoder.decode(b'', final=True) if decoder else ''
+    yield encoding, _normalize_newlines(pending_cr + tail)
+
+
+def iter_windows(filepath, chunk_size=None, threshold=None):
+    """Yield ``(first_line, source, final)`` for consecutive windows of a Java file.
+
+    ``source`` is a JavaSource of whole lines starting at line
+    ``first_line``. Files up to ``threshold`` bytes (default
+    STREAM_THRESHOLD) are a single window; larger ones are read
+    ``chunk_size`` (default CHUNK_SIZE) bytes at a time and decoded with
+    the encoding sniffed from the first chunk that is not plain ASCII.
+
+    Once more than twice ``chunk_size`` characters are buffered without a
+    line break to cut at, the block comment or text block spanning them is
+    cut inside, so windows stay under three times ``chunk_size``. Lines
+    are never split: a single longer line is one window.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    threshold = STREAM_THRESHOLD if threshold is None else threshold
+    if os.path.getsize(filepath) <= threshold:
+        yield 1, read_source(filepath), True
+        return
+
+    with open(filepath, 'rb') as f:
+        buffer = ''
+        tokens = []
+        # Kind of the token the buffer starts inside, after a forced cut
+        open_kind = None
+        first_line = 1
+        encoding = None
+        for encoding, chunk in _read_text_chunks(f, chunk_size):
+            if not chunk:
+                continue
+            # New text can only extend the last token or start one at the
+            # last character, so what comes before is not lexed again
+            resume = max(len(buffer) - 1, 0)
+            if tokens and tokens[-1][2] >= resume:
+                resume = tokens.pop()[1]
+            buffer += chunk
+            tokens.extend(tokenize(buffer, open_kind if resume == 0 else None, resume))
+
+            cut = safe_cut(buffer, tokens)
+            if cut:
+                index = _tokens_before(tokens, cut)
+                window_tokens = tokens[:index]
+                rest = []
+                next_kind = None
+            elif len(buffer) > 2 * chunk_size:
+                cut, index = _forced_cut(buffer, tokens)
+                if not cut:
+                    continue
+                kind, start, end = tokens[index]
+                window_tokens = tokens[:index] + [(kind, start, cut - 1)]
+                rest = [(kind, 0, end - cut)]
+                next_kind = kind
+                index += 1
+            else:
+                continue
+            # The line break at the cut separates two windows
+            piece = buffer[:cut - 1]
+            yield first_line, JavaSource(piece, window_tokens, encoding=encoding,
+                                         open_kind=open_kind), False
+            first_line += piece.count('\n') + 1
+            rest.extend((kind, start - cut, end - cut) for kind, start, end in tokens[index:])
+            buffer = buffer[cut:]
+            tokens = rest
+            open_kind = next_kind
+        yield first_line, JavaSource(buffer, tokens, encoding=encoding, open_kind=open_kind), True
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Structural index of the classes and methods in a Java file.
+
+One pass over the masked view (comments and literals blanked by
+``java_lexer``) tracks braces and the header text before each ``{`` to
+find class, method, constructor and lambda bodies. Each body records its
+start and end lines, nesting and decision-point count, so complexity,
+nesting and length rules read the index instead of rescanning the text.
+"""
+
+import re
+
+STRUCTURE_TOKEN = re.compile(r'''
+    \n | [{};] | && | \|\|
+  | \?(?!\s*(?:extends\b|super\b|[>,)]))
+  | \b(?:if|for|while|case|catch)\b
+''', re.VERBOSE)
+
+CLASS_HEADER = re.compile(r'\b(class|interface|enum|record)\s+(\w+)')
+ANONYMOUS_CLASS_HEADER = re.compile(r'\bnew\s+[\w.]+\s*(?:<[^;]*>)?\s*\([^;]*\)\s*$')
+METHOD_HEADER = re.compile(
+    r'(\w+)\s*\((?:[^()]|\([^()]*\))*\)\s*(?:throws\s+[\w.\s,<>]+)?$'
+)
+NOT_METHOD_NAMES = frozenset((
+    'if', 'for', 'while', 'switch', 'catch', 'synchronized', 'try', 'return',
+    'new', 'else', 'do', 'finally',
+))
+
+# Header text kept from before a chunk boundary; longer headers are not
+# declarations we need to recognise
+MAX_HEADER_LENGTH = 4096
+
+FUNCTION_KINDS = ('method', 'lambda')
+
+
+class Scope:
+    """A brace-delimited body: a class, a method or lambda, or a plain block."""
+
+    __slots__ = ('kind', 'name', 'start_line', 'end_line', 'depth', 'nesting',
+                 'max_nesting', 'decisions', 'function')
+
+    def __init__(self, kind, name, start_line, depth, nesting, function):
+        self.kind = kind
+        self.name = name
+        self.start_line = start_line
+        self.end_line = None
+        self.depth = depth
+        self.nesting = nesting
+        self.max_nesting = 0
+        self.decisions = 0
+        self.function = function
+
+    @property
+    def complexity(self):
+        return self.decisions + 1
+
+    @property
+    def length(self):
+        return self.end_line - self.start_line + 1
+
+
+class MethodIndex:
+    """Classes and methods of one file, in the order their bodies close.
+
+    Lambda bodies are indexed as methods of kind ``lambda``; their decision
+    points count toward the lambda, not the enclosing method.
+    """
+
+    def __init__(self):
+        self.classes = []
+        self.methods = []
+
+
+class IndexBuilder:
+    """Incremental builder: ``feed`` masked text in order, then ``finish``."""
+
+    def __init__(self):
+        self.index = MethodIndex()
+        self.stack = []
+        self.line = 1
+        self.header = ''
+        self.header_line = 1
+
+    def _classify(self, header):
+        """Return ``(kind, name, name_offset)`` for the block a header opens."""
+        parent = self.stack[-1] if self.stack else None
+        stripped = header.rstrip()
+
+        match = CLASS_HEADER.search(stripped)
+        if match:
+            return 'class', match.group(2), match.start(2)
+        if ANONYMOUS_CLASS_HEADER.search(stripped):
+            return 'class', '<anonymous>', len(header) - len(header.lstrip())
+        if stripped.endswith('->') and not re.search(r'\b(case|default)\b', stripped):
+            return 'lambda', '<lambda>', len(header) - len(header.lstrip())
+        if parent is not None and parent.kind == 'class':
+            match = METHOD_HEADER.search(stripped)
+            if match and match.group(1) not in NOT_METHOD_NAMES:
+                return 'method', match.group(1), match.start(1)
+        return 'block', None, None
+
+    def _open(self, header):
+        kind, name, name_offset = self._classify(header)
+        parent = self.stack[-1] if self.stack else None
+        start_line = self.line
+        if name_offset is not None:
+            start_line = self.header_line + header.count('\n', 0, name_offset)
+
+        if kind == 'block':
+            function = parent.function if parent is not None else None
+            nesting = parent.nesting + 1 if parent is not None and parent.kind != 'class' else 0
+            if function is not None:
+                function.max_nesting = max(function.max_nesting, nesting)
+        else:
+            function = None
+            nesting = 0
+        depth = len(self.stack)
+        scope = Scope(kind, name, start_line, depth, nesting, function)
+        if kind in FUNCTION_KINDS:
+            scope.function = scope
+        self.stack.append(scope)
+
+    def _close(self):
+        if not self.stack:
+            return
+        scope = self.stack.pop()
+        scope.end_line = self.line
+        if scope.kind == 'class':
+            self.index.classes.append(scope)
+        elif scope.kind in FUNCTION_KINDS:
+            self.index.methods.append(scope)
+
+    def feed(self, text):
+        """Consume the next piece of the masked view."""
+        header_start = 0
+        for token in STRUCTURE_TOKEN.finditer(text):
+            value = token.group()
+            if value == '\n':
+                self.line += 1
+            elif value in '{};':
+                header = self.header + text[header_start:token.start()]
+                if value == '{':
+                    self._open(header)
+                elif value == '}':
+                    self._close()
+                self.header = ''
+                self.header_line = self.line
+                header_start = token.end()
+            else:
+                function = self.stack[-1].function if self.stack else None
+                if function is not None:
+                    function.decisions += 1
+        self.header = (self.header + text[header_start:])[-MAX_HEADER_LENGTH:]
+
+    def take_methods(self):
+        """Return the methods closed so far and forget them (and the classes).
+
+        Lets a caller that streams a large file keep memory bounded by the
+        open scopes rather than by the number of methods.
+        """
+        methods = self.index.methods
+        self.index.methods = []
+        self.index.classes = []
+        return methods
+
+    def finish(self):
+        """Close anything left open (unbalanced input) and return the index."""
+        while self.stack:
+            self._close()
+        return self.index
+
+
+def build_index(source):
+    """Build the MethodIndex of a JavaSource."""
+    builder = IndexBuilder()
+    builder.feed(source.view_text('masked'))
+    return builder.finish()
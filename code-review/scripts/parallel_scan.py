@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Process-pool helpers shared by the code-review scanners.
+
+Rule evaluation is CPU-bound regex work, so files are fanned out to worker
+processes rather than threads.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+
+# Files per task sent to a worker, and tasks kept in flight per worker. The
+# input is consumed lazily, so at most CHUNK_SIZE * MAX_PENDING * jobs paths
+# and results are held at once however many files there are.
+CHUNK_SIZE = 16
+MAX_PENDING = 4
+
+
+def default_jobs():
+    """Number of worker processes to use when --jobs is not given."""
+    return os.cpu_count() or 1
+
+
+def _run_chunk(worker, chunk):
+    return [worker(filepath) for filepath in chunk]
+
+
+def _chunks(files, size):
+    files = iter(files)
+    while True:
+        chunk = list(islice(files, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_files(worker, files, jobs=None):
+    """Apply ``worker`` to every file and yield results in input order.
+
+    ``files`` may be any iterable, including a generator that is still
+    discovering files; it is read only as fast as the workers keep up.
+    ``worker`` must be a module-level function so it can be pickled. With a
+    single job, or a single file, everything runs in this process.
+    """
+    jobs = jobs or default_jobs()
+    files = iter(files)
+    head = list(islice(files, 2))
+    if jobs <= 1 or len(head) <= 1:
+        for filepath in head:
+            yield worker(filepath)
+        for filepath in files:
+            yield worker(filepath)
+        return
+
+    chunks = _chunks(chain(head, files), CHUNK_SIZE)
+    run_chunk = partial(_run_chunk, worker)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(run_chunk, chunk))
+            if len(pending) >= jobs * MAX_PENDING:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Streaming issue reporters for the code-review scanners.
+
+Issues are handed to a reporter file by file as scanning finishes. Only the
+per-severity counters are kept in memory; the text report's severity sort
+spills to temporary files once it grows past a fixed number of issues.
+"""
+
+import heapq
+import json
+import os
+import tempfile
+from pathlib import Path
+
+SEVERITIES = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+SEVERITY_ORDER = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+# Issues held in memory before a sorted run is written to disk
+SORT_RUN_SIZE = 50000
+
+SARIF_LEVELS = {'CRITICAL': 'error', 'HIGH': 'error', 'MEDIUM': 'warning', 'LOW': 'note'}
+
+
+def severity_rank(issue):
+    return SEVERITY_ORDER.get(issue['severity'], len(SEVERITIES))
+
+
+class ExternalSorter:
+    """Stable severity sort whose memory use is bounded by ``run_size``.
+
+    Issues are buffered and written out as sorted runs of JSON lines;
+    iterating merges the runs with the remaining buffer.
+    """
+
+    def __init__(self, run_size=SORT_RUN_SIZE):
+        self.run_size = run_size
+        self.buffer = []
+        self.runs = []
+        self.seq = 0
+
+    def add(self, issue):
+        self.buffer.append((severity_rank(issue), self.seq, issue))
+        self.seq += 1
+        if len(self.buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort(key=lambda entry: entry[:2])
+        run = tempfile.TemporaryFile('w+', encoding='utf-8')
+        for rank, seq, issue in self.buffer:
+            run.write(json.dumps([rank, seq, issue]) + '\n')
+        run.seek(0)
+        self.runs.append(run)
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(run):
+        for line in run:
+            yield tuple(json.loads(line))
+
+    def __iter__(self):
+        self.buffer.sort(key=lambda entry: entry[:2])
+        streams = [self._read_run(run) for run in self.runs] + [iter(self.buffer)]
+        for _, _, issue in heapq.merge(*streams, key=lambda entry: entry[:2]):
+            yield issue
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.buffer = []
+
+
+class Reporter:
+    """Base reporter: counts issues by severity and forwards them to ``emit``.
+
+    With ``sort`` set, issues go through an :class:`ExternalSorter` and are
+    emitted in severity order when the reporter is closed.
+    """
+
+    def __init__(self, stream, sort=False):
+        self.stream = stream
+        self.counts = {}
+        self.total = 0
+        self.sorter = ExternalSorter() if sort else None
+
+    def add(self, issues):
+        for issue in issues:
+            self.counts[issue['severity']] = self.counts.get(issue['severity'], 0) + 1
+            self.total += 1
+            if self.sorter is not None:
+                self.sorter.add(issue)
+            else:
+                self.emit(issue)
+
+    def emit(self, issue):
+        raise NotImplementedError
+
+    def flush_sorted(self):
+        if self.sorter is not None:
+            for issue in self.sorter:
+                self.emit(issue)
+            self.sorter.close()
+
+    def close(self):
+        self.flush_sorted()
+        self.stream.flush()
+
+
+class JsonlReporter(Reporter):
+    """One JSON object per issue, written as soon as the issue arrives."""
+
+    def emit(self, issue):
+        self.stream.write(json.dumps(issue, ensure_ascii=False) + '\n')
+
+
+class SarifReporter(Reporter):
+    """SARIF 2.1.0 log whose results array is written incrementally."""
+
+    def __init__(self, stream, tool_name, rules, sort=False):
+        super().__init__(stream, sort)
+        self.first = True
+        driver = {
+            'name': tool_name,
+            'rules': [
+                {
+                    'id': rule['name'],
+                    'shortDescription': {'text': rule['description']},
+                    'defaultConfiguration': {'level': SARIF_LEVELS.get(rule['severity'], 'note')},
+                }
+                for rule in rules
+            ],
+        }
+        header = json.dumps({
+            '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+            'version': '2.1.0',
+            'runs': [{'tool': {'driver': driver}, 'results': []}],
+        }, ensure_ascii=False)
+        # Everything up to the opening bracket of the results array
+        self.stream.write(header[:-len(']}]}')])
+
+    def emit(self, issue):
+        path = issue['file']
+        uri = Path(path).as_uri() if os.path.isabs(path) else Path(path).as_posix()
+        result = {
+            'ruleId': issue['name'],
+            'level': SARIF_LEVELS.get(issue['severity'], 'note'),
+            'message': {'text': issue['description']},
+            'locations': [{
+                'physicalLocation': {
+                    'artifactLocation': {'uri': uri},
+                    'region': {'startLine': issue['line']},
+                },
+            }],
+            'properties': {'severity': issue['severity'], 'code': issue.get('code', '')},
+        }
+        self.stream.write(('' if self.first else ',') + '\n' + json.dumps(result, ensure_ascii=False))
+        self.first = False
+
+    def close(self):
+        self.flush_sorted()
+        self.stream.write('\n]}]}\n')
+        self.stream.flush()
+
+
+class TextReporter(Reporter):
+    """Human-readable report, always sorted by severity.
+
+    The summary header needs the final counts, so issues are held in the
+    external sorter until :meth:`close`.
+    """
+
+    def __init__(self, stream, title, empty_message):
+        super().__init__(stream, sort=True)
+        self.title = title
+        self.empty_message = empty_message
+
+    def emit(self, issue):
+        print(f"\n[{issue['severity']}] {issue['name']}", file=self.stream)
+        print(f"  File: {issue['file']}:{issue['line']}", file=self.stream)
+        print(f"  Description: {issue['description']}", file=self.stream)
+        if 'code' in issue and issue['code']:
+            print(f"  Code: {issue['code'][:80]}...", file=self.stream)
+
+    def close(self):
+        if not self.total:
+            print(f"\n{self.empty_message}", file=self.stream)
+            self.sorter.close()
+            self.stream.flush()
+            return
+
+        print("\n" + "=" * 80, file=self.stream)
+        print(f"{self.title} - {self.total} issues found", file=self.stream)
+        print("=" * 80, file=self.stream)
+
+        for severity in SEVERITIES:
+            count = self.counts.get(severity, 0)
+            if count > 0:
+                print(f"\n[{severity}]: {count} issue(s)", file=self.stream)
+
+        print("\n" + "-" * 80, file=self.stream)
+        self.flush_sorted()
+        print("\n" + "=" * 80, file=self.stream)
+        self.stream.flush()
+
+
+def make_reporter(fmt, stream, tool_name, title, empty_message, rules, sort=False):
+    """Create the reporter for an output format: text, jsonl or sarif."""
+    if fmt == 'jsonl':
+        return JsonlReporter(stream, sort)
+    if fmt == 'sarif':
+        return SarifReporter(stream, tool_name, rules, sort)
+    return TextReporter(stream, title, empty_message)
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Shared rule engine for the code-review scanners.
+
+Loads a PATTERNS list once, rejecting patterns that ``rule_validator``
+finds can backtrack catastrophically. Each regex is compiled the first
+time its rule runs, and the validation results and prefilter literals of
+a rule set can be saved and passed back in (see ``rule_pack``), so
+loading hundreds of rules costs no regex parsing at all.
+
+Most rules require some literal text (``printStackTrace``,
+``ThreadLocal<``, ``catch``), so before any regex runs the engine looks
+those literals up in the whole view with ``str.find`` and only tests the
+regex on the lines that contain one; files and lines without them cost
+no regex work. The literals are extracted from the pattern automatically,
+or given explicitly with a ``literals`` list (an empty list disables the
+prefilter for that rule). A line rule without literals is not run once
+per line either: its pattern is searched over the whole view in one
+C-level pass (see ``line_searchable``) and only the lines where that
+search stops are tested individually.
+
+Each rule runs against one view of the file produced by ``java_lexer``,
+chosen with the rule's ``view`` key:
+
+- ``raw``: the text as written (the default)
+- ``code``: comments blanked, string literals kept
+- ``masked``: comments and literal contents blanked
+- ``comments``: everything except comments blanked
+- ``bytes``: the file as read, undecoded; the pattern, exclusion and
+  literals must be ASCII and are matched as bytes, so a rule that only
+  looks at whitespace or punctuation never pays for decoding or lexing
+
+Rules are matched line by line unless they set ``multiline: True``; those
+run once over the whole view text, so patterns containing ``\\n`` or
+spanning several lines can match. Their hits are mapped back to lines with
+``JavaSource.line_number`` and their exclusion is tested on the matched
+text.
+
+The exclusion is normally tested against the rule's own view; a rule can
+name another one with ``exclusion_view``. All text views share offsets, so
+the exclusion then sees the same line (or the same span of a multi-line
+match) in that view: e.g. a catch found in ``masked`` code whose body holds
+a comment is rejected by an exclusion of ``\\S`` on the ``comments`` view.
+"""
+
+import re
+import sys
+import time
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from java_lexer import BYTES_VIEW, VIEWS, JavaSource, iter_windows
+from rule_validator import ATOMIC_GROUP, REPEATS, validate_pattern
+from scan_cache import ScanFailed
+
+# Shorter required literals occur on too many lines to be worth a prefilter
+MIN_LITERAL_LENGTH = 3
+
+# Runtime guard: line rules skip lines longer than MAX_LINE_LENGTH (or
+# RISKY_LINE_LENGTH for rules the validator warned about), and a rule stops
+# checking a file once it has used RULE_STEP_BUDGET steps on it. A line rule
+# is charged the length of each line it tests plus one, squared for rules
+# the validator warned about (their cost can grow with the square of the
+# line); a multi-line rule is charged the length of the text it searches.
+# The budget counts input rather than time, so what is checked never
+# depends on machine load or the number of jobs. Skipped lines are
+# reported as GUARD_RULE issues.
+MAX_LINE_LENGTH = 20000
+RISKY_LINE_LENGTH = 2000
+RULE_STEP_BUDGET = 1 << 28
+BUDGET_EXCEEDED = f'step budget of {RULE_STEP_BUDGET} per file exceeded, later lines not checked'
+
+# Lines of each view held back between windows of a large file, so
+# multi-line rules can match across a window boundary
+MULTILINE_OVERLAP = 200
+
+GUARD_RULE = {
+    'name': 'Skipped by rule guard',
+    'severity': 'LOW',
+    'description': 'Some rules did not check this line (too long or over the step budget)',
+}
+
+
+def _literal_score(literals):
+    # Prefer the longest shortest-literal, then the fewest alternatives
+    return min(len(literal) for literal in literals), -len(literals)
+
+
+def _sequence_literals(items):
+    """Best set of literals one of which every match of ``items`` contains."""
+    best = None
+    run = []
+
+    def consider(candidate):
+        nonlocal best
+        if candidate and (best is None or _literal_score(candidate) > _literal_score(best)):
+            best = candidate
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        consider({''.join(run)} if run else None)
+        run = []
+        if op is sre_parse.SUBPATTERN:
+            _group, add_flags, _del_flags, sub = av
+            if not add_flags & re.IGNORECASE:
+                consider(_sequence_literals(sub))
+        elif ATOMIC_GROUP is not None and op is ATOMIC_GROUP:
+            consider(_sequence_literals(av))
+        elif op is sre_parse.BRANCH:
+            alternatives = [_sequence_literals(branch) for branch in av[1]]
+            if all(alternatives):
+                consider(set().union(*alternatives))
+        elif op in REPEATS:
+            low, _high, sub = av
+            if low >= 1:
+                consider(_sequence_literals(sub))
+    consider({''.join(run)} if run else None)
+    return best
+
+
+def required_literals(pattern):
+    """Return literals of which every match of ``pattern`` contains at least one.
+
+    The pattern is parsed with the ``re`` module's own parser and the most
+    selective required literal (or set of alternatives) is kept. Returns
+    None when nothing of at least MIN_LITERAL_LENGTH characters is
+    required, e.g. for ``\\d{3,}`` or case-insensitive patterns.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    literals = _sequence_literals(parsed)
+    if not literals or _literal_score(literals)[0] < MIN_LITERAL_LENGTH:
+        return None
+    # A line containing "FileInputStream" also contains "InputStream"
+    return tuple(sorted(
+        literal for literal in literals
+        if not any(other != literal and other in literal for other in literals)
+    ))
+
+
+def _parsed_items(items):
+    """Every item of a parsed pattern, including those of nested sub-patterns."""
+    for op, av in items:
+        yield op, av
+        for value in av if isinstance(av, (tuple, list)) else (av,):
+            for sub in value if isinstance(value, list) else (value,):
+                if isinstance(sub, sre_parse.SubPattern):
+                    yield from _parsed_items(sub)
+
+
+def line_searchable(pattern):
+    """Whether searching a whole view finds every line on which ``pattern`` matches.
+
+    A match within one line consumes only that line, so searching the view
+    (compiled with ``re.MULTILINE``, so ``^`` and ``$`` still match at line
+    breaks) from the start of that line succeeds as well. That only fails
+    for items that look past the line or cannot give back what they
+    consumed: ``\\A``, ``\\Z``, lookarounds, atomic groups and possessive
+    repeats.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return False
+    for op, av in _parsed_items(parsed):
+        if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT) or op is ATOMIC_GROUP:
+            return False
+        if op in REPEATS and op not in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            return False
+        if op is sre_parse.AT and av in (sre_parse.AT_BEGINNING_STRING, sre_parse.AT_END_STRING):
+            return False
+    return True
+
+
+def _for_view(text, view):
+    """Encode a pattern or literal for the ``bytes`` view, leave it as is otherwise."""
+    if view != BYTES_VIEW:
+        return text
+    try:
+        return text.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError(f"Non-ASCII text in a bytes-view rule: {text!r}") from None
+
+
+def rule_literals(pattern_def):
+    """Prefilter literals of a rule: its ``literals`` key, or derived from the pattern."""
+    if 'literals' in pattern_def:
+        return tuple(pattern_def['literals']) or None
+    return required_literals(pattern_def['pattern'])
+
+
+class _PatternRule:
+    """Settings shared by line and multi-line rules; the regexes compile on first use."""
+
+    def __init__(self, index, pattern_def, literals, risky=False, searchable=False):
+        self.index = index
+        self.view = pattern_def.get('view', 'raw')
+        self.pattern = _for_view(pattern_def['pattern'], self.view)
+        self.exclusion_view = pattern_def.get('exclusion_view', self.view)
+        exclusion = pattern_def.get('exclusion')
+        self.exclusion_pattern = _for_view(exclusion, self.exclusion_view) if exclusion else None
+        self.literals = (None if literals is None
+                         else tuple(_for_view(literal, self.view) for literal in literals))
+        self.risky = risky
+        self.max_length = RISKY_LINE_LENGTH if risky else MAX_LINE_LENGTH
+        self.searchable = searchable
+        self._compiled = None
+        self._exclusion = None
+        self._view_search = None
+
+    def _compile(self):
+        self._compiled = re.compile(self.pattern)
+        if self.exclusion_pattern:
+            self._exclusion = re.compile(self.exclusion_pattern)
+        if self.searchable:
+            self._view_search = re.compile(self.pattern, re.MULTILINE)
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compile()
+        return self._compiled
+
+    @property
+    def exclusion(self):
+        if self._compiled is None:
+            self._compile()
+        return self._exclusion
+
+    @property
+    def view_search(self):
+        """The pattern compiled with ``re.MULTILINE``, for searchable rules."""
+        if self._compiled is None:
+            self._compile()
+        return self._view_search
+
+
+def candidate_lines(text, literals, source, view='raw'):
+    """Return the sorted line numbers of ``text`` containing any of ``literals``.
+
+    Each literal is located with ``str.find`` (or ``bytes.find``) over the
+    whole view, so a file (or a line) that contains none of them costs one
+    C-level scan and no regex work at all.
+    """
+    newline = b'\n' if view == BYTES_VIEW else '\n'
+    found = set()
+    for literal in literals:
+        offset = text.find(literal)
+        while offset != -1:
+            found.add(source.line_number(offset, view))
+            line_end = text.find(newline, offset)
+            if line_end == -1:
+                break
+            offset = text.find(literal, line_end + 1)
+    return sorted(found)
+
+
+class LineRule(_PatternRule):
+    """A rule evaluated line by line, only on lines containing its literals.
+
+    A rule without literals whose pattern is ``line_searchable`` first
+    searches the whole view, and only the lines where a search stopped are
+    tested. Views with lines over the length cap, or too long for the step
+    budget left, are tested line by line so that what the guard skips does
+    not change.
+    """
+
+    def _search_lines(self, text):
+        """Line numbers on which a search of the whole view ``text`` finds a match.
+
+        After each match the search restarts at the next line, so a match
+        spanning a line break cannot hide a match on a later line.
+        """
+        newline = b'\n' if isinstance(text, bytes) else '\n'
+        search = self.view_search.search
+        found = []
+        line_num = 1
+        line_start = 0
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            line_num += text.count(newline, line_start, start)
+            found.append(line_num)
+            line_end = text.find(newline, start)
+            if line_end == -1:
+                break
+            line_num += 1
+            line_start = line_end + 1
+            match = search(text, line_start)
+        return found
+
+    def scan(self, source, budget=RULE_STEP_BUDGET):
+        """Return ``(line_numbers, lines_tested, matches, excluded, skipped, steps)`` for a JavaSource.
+
+        ``skipped`` lists ``(line_number, reason)`` for lines the guard did
+        not let the rule check; ``budget`` is the number of steps left for
+        this file and ``steps`` the number charged (see RULE_STEP_BUDGET).
+        """
+        lines = source.view_lines(self.view)
+        prepaid = False
+        if self.literals is None and self.searchable:
+            text = source.view_text(self.view)
+            # Testing every line would cost len(line) + 1 each
+            prepaid = (len(text) + 1 <= budget
+                       and max(map(len, lines), default=0) <= self.max_length)
+        if prepaid:
+            numbered = [(line_num, lines[line_num - 1]) for line_num in self._search_lines(text)]
+        elif self.literals is None:
+            numbered = enumerate(lines, 1)
+        else:
+            numbered = [
+                (line_num, lines[line_num - 1])
+                for line_num in candidate_lines(source.view_text(self.view), self.literals,
+                                                source, self.view)
+            ]
+        line_nums = []
+        skipped = []
+        tested = matches = excluded = steps = 0
+        compiled, exclusion = self.compiled, self.exclusion
+        exclusion_lines = source.view_lines(self.exclusion_view) if exclusion else None
+        risky = self.risky
+        if prepaid:
+            steps = len(text) + 1
+        for line_num, line in numbered:
+            if not prepaid:
+                if len(line) > self.max_length:
+                    skipped.append((line_num, f'line longer than {self.max_length} characters'))
+                    continue
+                cost = (len(line) + 1) ** 2 if risky else len(line) + 1
+                if steps + cost > budget:
+                    skipped.append((line_num, BUDGET_EXCEEDED))
+                    break
+                steps += cost
+            tested += 1
+            if compiled.search(line):
+                matches += 1
+                if exclusion and exclusion.search(exclusion_lines[line_num - 1]):
+                    excluded += 1
+                    continue
+                line_nums.append(line_num)
+        return line_nums, tested, matches, excluded, skipped, steps
+
+
+class MultilineRule(_PatternRule):
+    """A rule evaluated against a whole view buffer rather than per line."""
+
+    def scan(self, source, budget=RULE_STEP_BUDGET):
+        """Return ``(line_numbers, lines_tested, matches, excluded, skipped, steps)`` for a JavaSource.
+
+        The whole view is searched or, if its length exceeds the ``budget``
+        left, skipped from its first line; a single pathological match is
+        the validator's job.
+        """
+        text = source.view_text(self.view)
+        if self.literals is not None and not any(literal in text for literal in self.literals):
+            return [], 0, 0, 0, [], 0
+        if len(text) > budget:
+            return [], 0, 0, 0, [(1, BUDGET_EXCEEDED)], 0
+        line_nums = []
+        matches = excluded = 0
+        exclusion = self.exclusion
+        exclusion_text = source.view_text(self.exclusion_view) if exclusion else None
+        for found in self.compiled.finditer(text):
+            matches += 1
+            if exclusion and exclusion.search(exclusion_text[found.start():found.end()]):
+                excluded += 1
+                continue
+            # A match that begins with a line break is attributed to the
+            # line after it (e.g. the first of several blank lines)
+            offset = found.start()
+            if text[offset:offset + 1] in ('\n', b'\n') and found.end() > offset + 1:
+                offset += 1
+            line_num = source.line_number(offset, self.view)
+            if not line_nums or line_nums[-1] != line_num:
+                line_nums.append(line_num)
+        return line_nums, source.line_count(), matches, excluded, [], len(text)
+
+
+class RuleProfile:
+    """Per-rule cost and hit counters collected while profiling.
+
+    For every rule: cumulative time (prefilter, regex and exclusion), lines
+    the regex was tested on, matches, matches rejected by the exclusion and
+    lines skipped by the runtime guard.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.stats = [
+            {'seconds': 0.0, 'lines': 0, 'matches': 0, 'excluded': 0, 'skipped': 0}
+            for _ in patterns
+        ]
+
+    def record(self, index, seconds, lines, matches, excluded, skipped):
+        stats = self.stats[index]
+        stats['seconds'] += seconds
+        stats['lines'] += lines
+        stats['matches'] += matches
+        stats['excluded'] += excluded
+        stats['skipped'] += skipped
+
+    def rows(self, tool):
+        """Return one dict per rule, tagged with the tool it belongs to."""
+        return [
+            {'tool': tool, 'rule': pattern_def['name'], **stats}
+            for pattern_def, stats in zip(self.patterns, self.stats)
+        ]
+
+
+def format_profile(rows):
+    """Render profile rows as a table ranked by cumulative time."""
+    rows = sorted(rows, key=lambda row: row['seconds'], reverse=True)
+    total = sum(row['seconds'] for row in rows) or 1.0
+    width = max([len(row['rule']) for row in rows] + [4])
+    lines = [
+        f"{'Rule':<{width}}  {'Tool':<18} {'Time ms':>10} {'Share':>6} "
+        f"{'Lines':>10} {'Matches':>8} {'Excluded':>8} {'Skipped':>8} {'Hit rate':>8}",
+        '-' * (width + 87),
+    ]
+    for row in rows:
+        hit_rate = row['matches'] / row['lines'] if row['lines'] else 0.0
+        lines.append(
+            f"{row['rule']:<{width}}  {row['tool']:<18} {row['seconds'] * 1000:>10.1f} "
+            f"{row['seconds'] / total:>6.1%} {row['lines']:>10} {row['matches']:>8} "
+            f"{row['excluded']:>8} {row['skipped']:>8} {hit_rate:>8.2%}"
+        )
+    return '\n'.join(lines)
+
+
+class RuleStream:
+    """Evaluation of a RuleSet over consecutive windows of one file.
+
+    ``feed`` takes each window (see ``java_lexer.iter_windows``) and only
+    line numbers and code of hits are kept. Multi-line rules see the last
+    MULTILINE_OVERLAP lines of the previous window again: matches starting
+    in those lines are held back and reported with the next window, so a
+    match that crosses a boundary is found as long as it spans fewer lines
+    than the overlap.
+    """
+
+    def __init__(self, rule_set, filepath):
+        self.rule_set = rule_set
+        self.filepath = filepath
+        self.hits = [[] for _ in rule_set.patterns]
+        # Steps left of each rule's per-file budget, and the rules that ran out
+        self.budgets = [RULE_STEP_BUDGET] * len(rule_set.patterns)
+        self.exhausted = set()
+        # (line, reason) -> (code, names of the rules the guard skipped there)
+        self.guarded = {}
+        # (first line, first line to report, {view: text}) of the lines
+        # held back for multi-line rules
+        self.tail = None
+
+    def _record(self, rule, source, first_line, line_nums, skipped, low=1, limit=None):
+        for line_num in line_nums:
+            if low <= line_num and (limit is None or line_num < limit):
+                self.hits[rule.index].append((first_line + line_num - 1, source.line(line_num).strip()))
+        for line_num, reason in skipped:
+            # A multi-line rule skips a window from its first line, which
+            # may be one of the lines held back from the previous window
+            line_num = max(line_num, low)
+            if limit is None or line_num < limit:
+                key = (first_line + line_num - 1, reason)
+                code, names = self.guarded.setdefault(key, (source.line(line_num).strip(), []))
+                names.append(self.rule_set.patterns[rule.index]['name'])
+
+    def _run(self, rule, source):
+        """Run a rule on one window within what is left of its step budget."""
+        if rule.index in self.exhausted:
+            # Already reported as skipped when the budget ran out
+            return [], []
+        line_nums, skipped, steps = self.rule_set.run_rule(rule, source, self.budgets[rule.index])
+        self.budgets[rule.index] -= steps
+        if skipped and skipped[-1][1] == BUDGET_EXCEEDED:
+            self.exhausted.add(rule.index)
+        return line_nums, skipped
+
+    def feed(self, first_line, source, final=True):
+        """Evaluate the rules on the window ``source`` starting at ``first_line``."""
+        multiline = []
+        for rule in self.rule_set.rules:
+            if isinstance(rule, MultilineRule):
+                multiline.append(rule)
+            else:
+                self._record(rule, source, first_line, *self._run(rule, source))
+        if multiline:
+            self._feed_multiline(multiline, first_line, source, final)
+
+    def _feed_multiline(self, rules, first_line, source, final):
+        low = 1
+        if self.tail is not None:
+            first_line, low, tail_texts = self.tail
+            source = JavaSource.from_views({
+                view: tail_texts[view] + (b'\n' if view == BYTES_VIEW else '\n') + source.view_text(view)
+                for view in tail_texts
+            }, encoding=source.encoding)
+        line_count = source.line_count()
+        limit = None if final else max(low, line_count - MULTILINE_OVERLAP + 1)
+        for rule in rules:
+            self._record(rule, source, first_line, *self._run(rule, source),
+                         low=low, limit=limit)
+        if not final:
+            # Keep the line before the held-back ones as context: a match
+            # attributed to a line can start with the previous line break
+            tail_line = max(1, limit - 1)
+            # The tail may start inside a comment, so it cannot be lexed
+            # again: every view the rules read is carried over
+            views = ({'raw'} | {rule.view for rule in rules}
+                     | {rule.exclusion_view for rule in rules if rule.exclusion_pattern})
+            self.tail = (first_line + tail_line - 1, limit - tail_line + 1, {
+                view: source.view_text(view)[source.line_offset(tail_line, view):]
+                for view in views
+            })
+
+    def finish(self):
+        """Return the issues found in all windows."""
+        issues = []
+        for pattern_def, rule_hits in zip(self.rule_set.patterns, self.hits):
+            for line_num, code in rule_hits:
+                issues.append({
+                    'line': line_num,
+                    'file': self.filepath,
+                    'severity': pattern_def['severity'],
+                    'name': pattern_def['name'],
+                    'description': pattern_def['description'],
+                    'code': code,
+                })
+
+        for (line_num, reason), (code, names) in sorted(self.guarded.items()):
+            issues.append({
+                'line': line_num,
+                'file': self.filepath,
+                'severity': GUARD_RULE['severity'],
+                'name': GUARD_RULE['name'],
+                'description': f"Not checked by {', '.join(names)}: {reason}",
+                'code': code[:200] + '...' if len(code) > 200 else code,
+            })
+        return issues
+
+
+def analyze_rule(pattern_def):
+    """Validate a rule and derive its prefilter literals.
+
+    Returns the JSON-serialisable metadata ``RuleSet`` needs,
+    ``{'warnings': [...], 'literals': [...] or None, 'searchable': bool}``,
+    and raises ValueError if the pattern or exclusion does not compile or
+    the validator rejects the pattern. ``searchable`` is only set for line
+    rules without literals, which are the ones that search the whole view
+    (see LineRule).
+    """
+    try:
+        errors, warnings = validate_pattern(pattern_def['pattern'])
+        if pattern_def.get('exclusion'):
+            re.compile(pattern_def['exclusion'])
+    except re.error as e:
+        raise ValueError(f"Rule '{pattern_def['name']}': invalid regex: {e}") from None
+    if errors:
+        raise ValueError(f"Rule '{pattern_def['name']}': {'; '.join(errors)}")
+    literals = rule_literals(pattern_def)
+    searchable = (literals is None and not warnings and not pattern_def.get('multiline')
+                  and line_searchable(pattern_def['pattern']))
+    return {'warnings': warnings, 'literals': list(literals) if literals is not None else None,
+            'searchable': searchable}
+
+
+class RuleSet:
+    """A list of pattern rules, each compiled on first use.
+
+    Raises ValueError for unknown views, for a bytes view paired with a
+    text view, and for patterns the validator rejects. ``warnings`` lists
+    ``(rule name, message)`` for rules that load but run with the tighter
+    line-length cap. ``metadata`` holds the result of ``analyze_rule`` for
+    every rule; passing a saved copy back in skips validation and literal
+    extraction.
+    """
+
+    def __init__(self, patterns, metadata=None):
+        self.patterns = patterns
+        self.profile = None
+        views = {p.get(key) for p in patterns for key in ('view', 'exclusion_view')}
+        unknown = views - set(VIEWS) - {None}
+        if unknown:
+            raise ValueError(f"Unknown rule view(s): {', '.join(sorted(unknown))}")
+        for pattern_def in patterns:
+            view = pattern_def.get('view', 'raw')
+            if (view == BYTES_VIEW) != (pattern_def.get('exclusion_view', view) == BYTES_VIEW):
+                # Byte offsets differ from text offsets outside ASCII
+                raise ValueError(f"Rule '{pattern_def['name']}': the bytes view cannot be "
+                                 "combined with a text view")
+
+        self.metadata = metadata or [analyze_rule(pattern_def) for pattern_def in patterns]
+        self.warnings = []
+        self.rules = []
+        for index, (pattern_def, meta) in enumerate(zip(patterns, self.metadata)):
+            warnings = meta['warnings']
+            self.warnings.extend((pattern_def['name'], warning) for warning in warnings)
+            rule_class = MultilineRule if pattern_def.get('multiline') else LineRule
+            try:
+                rule = rule_class(index, pattern_def, meta['literals'], risky=bool(warnings),
+                                  searchable=meta['searchable'])
+            except ValueError as e:
+                raise ValueError(f"Rule '{pattern_def['name']}': {e}") from None
+            self.rules.append(rule)
+
+    def scan_source(self, filepath, source):
+        """Evaluate every rule against a :class:`JavaSource` and return issues.
+
+        Issues are grouped by rule in PATTERNS order and by line number
+        within each rule. The reported code is always the raw line.
+        """
+        stream = self.stream(filepath)
+        stream.feed(1, source)
+        return stream.finish()
+
+    def stream(self, filepath):
+        """Return a RuleStream for evaluating a file window by window."""
+        return RuleStream(self, filepath)
+
+    def run_rule(self, rule, source, budget=RULE_STEP_BUDGET):
+        """Run one rule on a JavaSource, return ``(line_numbers, skipped, steps)``."""
+        if self.profile is None:
+            line_nums, _tested, _matches, _excluded, skipped, steps = rule.scan(source, budget)
+            return line_nums, skipped, steps
+        # Build the view and the line map first so lexing is not charged to
+        # whichever rule happens to need them first
+        source.view_lines(rule.view)
+        source.line_number(0, rule.view)
+        start = time.perf_counter()
+        line_nums, tested, matches, excluded, skipped, steps = rule.scan(source, budget)
+        self.profile.record(rule.index, time.perf_counter() - start,
+                            tested, matches, excluded, len(skipped))
+        return line_nums, skipped, steps
+
+    def enable_profiling(self):
+        """Record a RuleProfile of every scan from now on."""
+        self.profile = RuleProfile(self.patterns)
+        return self.profile
+
+    def scan_text(self, filepath, text):
+        """Evaluate every rule against the contents of a Java file."""
+        return self.scan_source(filepath, JavaSource(text))
+
+
+def scan_windows(filepath, stream_factories):
+    """Scan a file window by window and return the issues of every stream.
+
+    Each factory is called with ``filepath`` and returns an object with
+    ``feed(first_line, source, final)`` and ``finish()``, such as
+    ``RuleSet.stream``. The file is read once, in windows, so a huge
+    generated file never sits in memory whole. A file that cannot be
+    read is reported on stderr and yields an empty ScanFailed list.
+    """
+    streams = [factory(filepath) for factory in stream_factories]
+    try:
+        for first_line, source, final in iter_windows(filepath):
+            for stream in streams:
+                stream.feed(first_line, source, final)
+    except Exception as e:
+        print(f"Error reading {filepath}: {e}", file=sys.stderr)
+        return ScanFailed()
+
+    issues = []
+    for stream in streams:
+        issues.extend(stream.finish())
+    return issues
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Declarative rule packs for the code-review scanners.
+
+A rule pack is a YAML or JSON file holding rules in the same shape as the
+scanners' PATTERNS lists, e.g. a team's subset of the Alibaba guidelines::
+
+    name: team-concurrency
+    description: Concurrency rules from the Alibaba Java Coding Guidelines
+    rules:
+      - name: Executors factory method
+        pattern: 'Executors\\.new\\w*ThreadPool\\('
+        view: masked
+        severity: HIGH
+        description: Create thread pools with ThreadPoolExecutor
+
+``view``, ``exclusion``, ``exclusion_view``, ``multiline`` and
+``literals`` are optional, as for built-in rules. YAML packs need PyYAML;
+JSON packs only need the standard library.
+
+Validating a pattern and extracting its prefilter literals both parse the
+regex, which dominates start-up for large packs. The results depend only
+on the pack and the scanner code, so they are stored under
+``.code-review-cache/rules/`` keyed by a hash of both; later runs load
+them without parsing a single pattern, and each regex is compiled the
+first time its rule runs.
+"""
+
+import hashlib
+import json
+import os
+
+try:
+    import yaml
+except ImportError:  # PyYAML is only needed for YAML packs
+    yaml = None
+
+from report import SEVERITIES
+from rule_engine import RuleSet
+from scan_cache import CACHE_DIR, ensure_cache_dir, rules_fingerprint
+
+PACK_CACHE_DIR = 'rules'
+PACK_CACHE_VERSION = 2
+
+REQUIRED_KEYS = ('name', 'pattern', 'severity', 'description')
+OPTIONAL_KEYS = ('view', 'exclusion', 'exclusion_view', 'multiline', 'literals')
+# Optional keys that hold a string when set
+STRING_KEYS = ('view', 'exclusion', 'exclusion_view')
+
+# Decoding and parsing errors of malformed pack files (UnicodeDecodeError
+# and json.JSONDecodeError are ValueErrors)
+PARSE_ERRORS = (ValueError,) if yaml is None else (ValueError, yaml.YAMLError)
+
+# Packs already loaded in this process, by (path, cache_dir)
+_LOADED = {}
+
+
+class RulePack:
+    """The rules of one pack file and their RuleSet.
+
+    ``digest`` hashes the file contents, so scan results cached with one
+    version of a pack are not reused with another.
+    """
+
+    def __init__(self, path, name, description, patterns, digest, rules):
+        self.path = path
+        self.name = name
+        self.description = description
+        self.patterns = patterns
+        self.digest = digest
+        self.rules = rules
+
+
+def _parse(path, data):
+    """Parse a pack file's bytes, raising ValueError if they are not valid YAML or JSON."""
+    is_yaml = path.endswith(('.yaml', '.yml'))
+    if is_yaml and yaml is None:
+        raise ValueError(f"{path}: reading YAML rule packs needs PyYAML "
+                         "(pip install pyyaml), or convert the pack to JSON")
+    try:
+        text = data.decode('utf-8')
+        return yaml.safe_load(text) if is_yaml else json.loads(text)
+    except PARSE_ERRORS as e:
+        raise ValueError(f"{path}: not valid {'YAML' if is_yaml else 'JSON'}: {e}") from None
+
+
+def _check_patterns(path, pack):
+    """Return the pack's rule list, raising ValueError for malformed entries."""
+    if not isinstance(pack, dict) or not isinstance(pack.get('rules'), list):
+        raise ValueError(f"{path}: a rule pack must be a mapping with a 'rules' list")
+    patterns = []
+    for number, rule in enumerate(pack['rules'], 1):
+        if not isinstance(rule, dict):
+            raise ValueError(f"{path}: rule {number} is not a mapping")
+        missing = [key for key in REQUIRED_KEYS if not rule.get(key)]
+        if missing:
+            raise ValueError(f"{path}: rule {number} is missing {', '.join(missing)}")
+        if not isinstance(rule['name'], str):
+            raise ValueError(f"{path}: rule {number} has a name that is not a string")
+        not_strings = [key for key in REQUIRED_KEYS + STRING_KEYS
+                       if rule.get(key) is not None and not isinstance(rule[key], str)]
+        if not_strings:
+            raise ValueError(f"{path}: rule '{rule['name']}' has non-string "
+                             f"{', '.join(not_strings)}")
+        literals = rule.get('literals')
+        if literals is not None and not (isinstance(literals, list)
+                                         and all(isinstance(item, str) for item in literals)):
+            raise ValueError(f"{path}: rule '{rule['name']}' literals must be a list of strings")
+        unknown = set(rule) - set(REQUIRED_KEYS) - set(OPTIONAL_KEYS)
+        if unknown:
+            raise ValueError(f"{path}: rule '{rule['name']}' has unknown key(s) "
+                             f"{', '.join(sorted(unknown))}")
+        if rule['severity'] not in SEVERITIES:
+            raise ValueError(f"{path}: rule '{rule['name']}' has severity {rule['severity']!r}, "
+                             f"expected one of {', '.join(SEVERITIES)}")
+        patterns.append(rule)
+    return patterns
+
+
+def _read_metadata(cache_file, count):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != PACK_CACHE_VERSION or len(data.get('metadata', ())) != count:
+        return None
+    return data['metadata']
+
+
+def _write_metadata(cache_dir, cache_file, metadata):
+    ensure_cache_dir(cache_dir)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    # Write then rename, so parallel runs never read half a file
+    temp_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': PACK_CACHE_VERSION, 'metadata': metadata}, f)
+    os.replace(temp_file, cache_file)
+
+
+def load_pack(path, cache_dir=CACHE_DIR):
+    """Load a rule pack file, using and refreshing the metadata cache.
+
+    ``cache_dir`` None disables the on-disk cache. Packs are loaded once per
+    process. Raises ValueError for malformed packs and rejected patterns,
+    and OSError if the file cannot be read.
+    """
+    key = (os.path.abspath(path), cache_dir)
+    if key in _LOADED:
+        return _LOADED[key]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    pack = _parse(path, data)
+    patterns = _check_patterns(path, pack)
+    digest = hashlib.sha1(data).hexdigest()
+
+    metadata = None
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, PACK_CACHE_DIR, rules_fingerprint(digest) + '.json')
+        metadata = _read_metadata(cache_file, len(patterns))
+    try:
+        rules = RuleSet(patterns, metadata)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    if cache_file is not None and metadata is None:
+        try:
+            _write_metadata(cache_dir, cache_file, rules.metadata)
+        except OSError:
+            pass  # The cache only saves time
+
+    name = pack.get('name') or os.path.splitext(os.path.basename(path))[0]
+    _LOADED[key] = RulePack(path, name, pack.get('description', ''), patterns, digest, rules)
+    return _LOADED[key]
+
+
+def pack_stream(path, cache_dir, filepath):
+    """Stream factory for a pack: ``partial(pack_stream, path, cache_dir)``.
+
+    Only the path travels to worker processes, each of which loads the pack
+    (from the metadata cache) once.
+    """
+    return load_pack(path, cache_dir).rules.stream(filepath)
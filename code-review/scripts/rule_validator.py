@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Static checks for backtracking hazards in rule patterns.
+
+Python's ``re`` is a backtracking engine and cannot be interrupted, so a
+pattern that backtracks badly on one long generated line can stall a whole
+scan. ``validate_pattern`` inspects the parsed pattern when rules load:
+
+- an unbounded quantifier nested inside another with nothing to tell the
+  iterations apart (``(a+)+``, ``(?:.*x)*``) can take exponential time and
+  is an error; ``(\\w+\\.)*`` and similar are only a warning;
+- two unbounded single-character repeats next to each other whose
+  character sets overlap (``\\s+[^;]*``, ``\\w+\\d*``) can split a run of
+  the shared characters in every possible way, which takes quadratic time
+  when the rest of the pattern fails, and is an error;
+- a broad unbounded repeat (``.*``, ``[^;]*``) followed, further on, by
+  another unbounded repeat that can take over the same text (``.*\\{.*``)
+  takes polynomial time and is a warning. The rule engine runs such rules
+  with a tighter line-length cap.
+"""
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Atomic groups and possessive repeats only exist from Python 3.11 on; on
+# older versions patterns using them do not parse and these stay unused
+ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+REPEATS = tuple(op for op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+                              getattr(sre_parse, 'POSSESSIVE_REPEAT', None)) if op is not None)
+
+# Items that match no text, so repeats on either side of them are adjacent
+ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: str.isdecimal,
+    sre_parse.CATEGORY_NOT_DIGIT: lambda char: not char.isdecimal(),
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_NOT_SPACE: lambda char: not char.isspace(),
+    sre_parse.CATEGORY_WORD: lambda char: char.isalnum() or char == '_',
+    sre_parse.CATEGORY_NOT_WORD: lambda char: not (char.isalnum() or char == '_'),
+}
+
+# Characters tried when comparing two character sets: ASCII, plus non-ASCII
+# blanks, letters and digits
+PROBE_CHARS = [chr(code) for code in range(128)] + list('\x85\xa0\xe9\u2028\u3000\u4e2d\uff10')
+
+
+def _children(op, av):
+    """Sub-sequences of a parsed item."""
+    if op is sre_parse.SUBPATTERN:
+        return [av[3]]
+    if ATOMIC_GROUP is not None and op is ATOMIC_GROUP:
+        return [av]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op is sre_parse.BRANCH:
+        return av[1]
+    if op in REPEATS:
+        return [av[2]]
+    return []
+
+
+def _has_unbounded(items):
+    for op, av in items:
+        if op in REPEATS and av[1] == sre_parse.MAXREPEAT:
+            return True
+        if any(_has_unbounded(child) for child in _children(op, av)):
+            return True
+    return False
+
+
+def _nested_is_exponential(body):
+    """Whether a repeated body can split the same text in many ways.
+
+    True when nothing in the body anchors the inner repeats: it has no
+    required item besides repeats, or a wildcard-like inner repeat can also
+    match every literal that separates iterations (``(?:.*x)*``). Bodies
+    like ``(\\w+\\.)*`` are unambiguous and only get a warning.
+    """
+    while len(body) == 1 and body[0][0] is sre_parse.SUBPATTERN:
+        body = body[0][1][3]
+    repeats = [av for op, av in body if op in REPEATS and av[1] == sre_parse.MAXREPEAT]
+    required = [(op, av) for op, av in body if op not in REPEATS or av[0] > 0]
+    if not repeats or not [item for item in required if item[0] not in REPEATS]:
+        return True
+    literals = {chr(av) for op, av in body if op is sre_parse.LITERAL}
+    for _low, _high, inner in repeats:
+        exclusions = _broad_exclusions(inner)
+        if exclusions is not None and not literals & exclusions:
+            return True
+    return False
+
+
+def _broad_exclusions(items):
+    """Characters a single-character body does not match, if it matches nearly anything.
+
+    Returns None for bodies that are not a wildcard or a negated class of
+    literal characters.
+    """
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    if op is sre_parse.ANY:
+        return frozenset('\n')
+    if op is sre_parse.NOT_LITERAL:
+        return frozenset(chr(av))
+    if op is sre_parse.IN and av and av[0][0] is sre_parse.NEGATE:
+        if all(item_op is sre_parse.LITERAL for item_op, _ in av[1:]):
+            return frozenset(chr(c) for _, c in av[1:])
+    return None
+
+
+def _in_class(items, char):
+    """Whether ``char`` matches one of the items of a character class."""
+    for op, av in items:
+        if op is sre_parse.LITERAL and char == chr(av):
+            return True
+        if op is sre_parse.RANGE and av[0] <= ord(char) <= av[1]:
+            return True
+        if op is sre_parse.CATEGORY and av in CATEGORIES and CATEGORIES[av](char):
+            return True
+    return False
+
+
+def _single_chars(items):
+    """The PROBE_CHARS a single-character body matches, or None for other bodies."""
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    if op is sre_parse.LITERAL:
+        return frozenset(chr(av))
+    if op is sre_parse.NOT_LITERAL:
+        return frozenset(char for char in PROBE_CHARS if char != chr(av))
+    if op is sre_parse.ANY:
+        return frozenset(char for char in PROBE_CHARS if char != '\n')
+    if op is sre_parse.IN:
+        negate = bool(av) and av[0][0] is sre_parse.NEGATE
+        members = av[1:] if negate else av
+        return frozenset(char for char in PROBE_CHARS if _in_class(members, char) != negate)
+    return None
+
+
+def _check_sequence(items, errors, warnings):
+    # Exclusions of the last broad unbounded repeat that can still extend
+    # over the text that follows it, and whether only optional items
+    # separate it from the current position
+    broad = None
+    adjacent = False
+    literal_run = 0
+    # Characters of the unbounded single-character repeat right before the
+    # current position, if there is one
+    previous = None
+
+    for op, av in items:
+        if op in REPEATS:
+            low, high, body = av
+            if high == sre_parse.MAXREPEAT:
+                if _has_unbounded(body):
+                    if _nested_is_exponential(body):
+                        errors.append('nested unbounded quantifiers can backtrack exponentially')
+                    else:
+                        warnings.append('nested unbounded quantifiers')
+                chars = _single_chars(body)
+                if previous is not None and chars is not None and previous & chars:
+                    errors.append('adjacent unbounded repeats over the same characters '
+                                  'can backtrack quadratically')
+                previous = chars
+                body_broad = _broad_exclusions(body)
+                if broad is not None and (body_broad is not None or adjacent):
+                    warnings.append('consecutive unbounded repeats can match the same text '
+                                    '(polynomial backtracking on long lines)')
+                if body_broad is not None:
+                    broad = body_broad
+                # Still directly after the broad repeat only if nothing
+                # required has come between
+                adjacent = body_broad is not None or (adjacent and low == 0)
+            else:
+                previous = None
+                if low > 0:
+                    adjacent = False
+            literal_run = 0
+            _check_sequence(body, errors, warnings)
+            continue
+
+        if op is sre_parse.LITERAL:
+            literal_run += 1
+            # A character the broad repeat cannot cross, or a literal word,
+            # pins down where the repeat ends
+            if broad is not None and (chr(av) in broad or literal_run >= 2):
+                broad = None
+        else:
+            literal_run = 0
+        if op not in ZERO_WIDTH:
+            adjacent = False
+            previous = None
+        for child in _children(op, av):
+            _check_sequence(child, errors, warnings)
+
+
+def validate_pattern(pattern):
+    """Return ``(errors, warnings)`` describing backtracking hazards in a pattern.
+
+    Raises ``re.error`` if the pattern does not compile.
+    """
+    errors = []
+    warnings = []
+    _check_sequence(sre_parse.parse(pattern), errors, warnings)
+    return sorted(set(errors)), sorted(set(warnings))
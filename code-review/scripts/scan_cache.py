@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Persistent incremental scan cache for the code-review scanners.
+
+Issues are stored per file in a SQLite database under ``.code-review-cache/``
+and reused while the file and the rule set are unchanged.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from collections import deque
+from pathlib import Path
+
+CACHE_DIR = '.code-review-cache'
+CACHE_FILE = 'scan.sqlite'
+
+
+class ScanFailed(list):
+    """The (empty) issue list of a file that could not be read or scanned.
+
+    Scanners return it after printing the error, so the file is reported
+    as failed once and never cached as clean.
+    """
+
+
+def _file_digest(filepath):
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def rules_fingerprint(*parts):
+    """Fingerprint rule definitions together with the scanner source code.
+
+    ``parts`` are the JSON-serialisable rule settings (PATTERNS, thresholds).
+    The scanner modules next to this file are hashed in as well, so editing
+    the matching logic invalidates cached results just like editing a rule.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps(parts, sort_keys=True, default=str).encode('utf-8'))
+    for source in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(source.name.encode('utf-8'))
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def ensure_cache_dir(cache_dir):
+    """Create the cache directory, with a .gitignore so it is never committed."""
+    os.makedirs(cache_dir, exist_ok=True)
+    ignore_file = os.path.join(cache_dir, '.gitignore')
+    if not os.path.exists(ignore_file):
+        with open(ignore_file, 'w', encoding='utf-8') as f:
+            f.write('*\n')
+
+
+class ScanCache:
+    """Per-file issue cache keyed by path, size, mtime and content hash.
+
+    A file is a hit when its size and mtime match the stored row. When only
+    the stat data changed (e.g. after a checkout) the content hash decides,
+    so touching a file does not force a rescan. All rows for a tool are
+    dropped when its rule fingerprint changes.
+    """
+
+    def __init__(self, tool, fingerprint, cache_dir=CACHE_DIR):
+        self.tool = tool
+        self.cache_dir = cache_dir
+        ensure_cache_dir(cache_dir)
+        self.db = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE))
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS meta (tool TEXT PRIMARY KEY, fingerprint TEXT)'
+        )
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'tool TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT, '
+            'issues TEXT, PRIMARY KEY (tool, path))'
+        )
+        row = self.db.execute(
+            'SELECT fingerprint FROM meta WHERE tool = ?', (tool,)
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            self.db.execute('DELETE FROM files WHERE tool = ?', (tool,))
+            self.db.execute(
+                'INSERT OR REPLACE INTO meta (tool, fingerprint) VALUES (?, ?)',
+                (tool, fingerprint),
+            )
+            self.db.commit()
+        self._digests = {}
+
+    def is_fresh(self, filepath):
+        """Return True if the cached issues for a file are still valid.
+
+        A file that cannot be stat'ed or read is never fresh; the scan
+        then reports the error.
+        """
+        key = os.path.abspath(filepath)
+        row = self.db.execute(
+            'SELECT size, mtime_ns, digest FROM files WHERE tool = ? AND path = ?',
+            (self.tool, key),
+        ).fetchone()
+        if row is None:
+            return False
+
+        size, mtime_ns, digest = row
+        try:
+            stat = os.stat(filepath)
+            if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+                return True
+            current = _file_digest(filepath)
+        except OSError:
+            return False
+        self._digests[key] = current
+        if current != digest:
+            return False
+        self.db.execute(
+            'UPDATE files SET size = ?, mtime_ns = ? WHERE tool = ? AND path = ?',
+            (stat.st_size, stat.st_mtime_ns, self.tool, key),
+        )
+        return True
+
+    def load(self, filepath):
+        """Return the cached issues of a file checked with :meth:`is_fresh`."""
+        row = self.db.execute(
+            'SELECT issues FROM files WHERE tool = ? AND path = ?',
+            (self.tool, os.path.abspath(filepath)),
+        ).fetchone()
+        cached = json.loads(row[0])
+        for issue in cached:
+            issue['file'] = filepath
+        return cached
+
+    def lookup(self, filepath):
+        """Return the cached issues for a file, or None on a miss."""
+        return self.load(filepath) if self.is_fresh(filepath) else None
+
+    def store(self, filepath, issues):
+        """Record the issues found in a freshly scanned file.
+
+        Failed scans (ScanFailed), and files that vanished or became
+        unreadable since they were scanned, are not recorded.
+        """
+        key = os.path.abspath(filepath)
+        digest = self._digests.pop(key, None)
+        if isinstance(issues, ScanFailed):
+            return
+        try:
+            stat = os.stat(filepath)
+            digest = digest or _file_digest(filepath)
+        except OSError:
+            return
+        self.db.execute(
+            'INSERT OR REPLACE INTO files (tool, path, size, mtime_ns, digest, issues) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (self.tool, key, stat.st_size, stat.st_mtime_ns, digest, json.dumps(issues)),
+        )
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def scan_with_cache(files, scan_many, cache=None):
+    """Yield the issue list of each file in ``files`` order.
+
+    ``files`` may be a lazy iterable. ``scan_many`` takes an iterable of
+    paths and yields their issue lists in the same order; it is only given
+    the files the cache could not answer, as they are reached.
+    """
+    if cache is None:
+        yield from scan_many(files)
+        return
+
+    # (filepath, fresh) of files seen but not yet yielded, in order
+    pending = deque()
+
+    def stale_files():
+        for filepath in files:
+            fresh = cache.is_fresh(filepath)
+            pending.append((filepath, fresh))
+            if not fresh:
+                yield filepath
+
+    # Cached issues are loaded one file at a time so that a warm run holds
+    # no more in memory than a cold one
+    for file_issues in scan_many(stale_files()):
+        while True:
+            filepath, fresh = pending.popleft()
+            if fresh:
+                yield cache.load(filepath)
+            else:
+                cache.store(filepath, file_issues)
+                yield file_issues
+                break
+    while pending:
+        yield cache.load(pending.popleft()[0])
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Scanning pipeline and command line shared by the code-review scanners.
+
+``check_style.py``, ``find_memory_leaks.py`` and ``code_review.py`` each
+describe themselves with a :class:`ScanTool`; file discovery, parallelism,
+caching, git filtering and reporting live here once.
+"""
+
+import argparse
+import json
+import os
+import sys
+from functools import partial
+from itertools import chain, tee
+
+from baseline import Baseline
+from file_walker import FileWalker
+from git_diff import changed_lines, filter_issues
+from parallel_scan import default_jobs, map_files
+from report import TextReporter, make_reporter
+from rule_engine import GUARD_RULE, format_profile
+from rule_pack import load_pack, pack_stream
+from scan_cache import CACHE_DIR, ScanCache, rules_fingerprint, scan_with_cache
+from symbol_index import CleanupFilter, index_root
+from watch_mode import POLL_INTERVAL, Watcher, watch
+
+
+class ScanTool:
+    """One scanner: how to scan a file and how to present the results.
+
+    ``scan_file`` maps a path to its list of issues and must be picklable
+    (a module-level function or a ``functools.partial`` of one) so it can
+    run in worker processes. ``rules`` lists rule dicts for SARIF output
+    (the rule engine's guard rule is added to them) and ``cache_key`` holds
+    the settings that invalidate cached results.
+    ``rule_sets`` maps a label to each RuleSet the tool evaluates, for
+    ``--profile``. ``scan_file`` also takes a ``streams`` keyword of extra
+    stream factories, through which ``--rules`` packs are evaluated in the
+    same pass over each file. ``cleanup_rules`` maps rule names to the
+    declared types their hits refer to; those hits are checked against the
+    repository's symbol index and dropped when the symbol is cleaned up.
+    """
+
+    def __init__(self, name, title, empty_message, scan_file, rules, cache_key, rule_sets=None,
+                 cleanup_rules=None):
+        self.name = name
+        self.title = title
+        self.empty_message = empty_message
+        self.scan_file = scan_file
+        self.rules = list(rules) + [GUARD_RULE]
+        self.cache_key = cache_key
+        self.rule_sets = dict(rule_sets or {})
+        self.cleanup_rules = cleanup_rules or {}
+
+    def add_packs(self, paths, cache_dir=CACHE_DIR):
+        """Evaluate the rule packs at ``paths`` (see ``rule_pack``) as well.
+
+        Raises ValueError or OSError if a pack cannot be loaded.
+        """
+        packs = [load_pack(path, cache_dir) for path in paths]
+        if not packs:
+            return
+        self.scan_file = partial(self.scan_file, streams=tuple(
+            partial(pack_stream, pack.path, cache_dir) for pack in packs))
+        self.rules[-1:-1] = [rule for pack in packs for rule in pack.patterns]
+        self.cache_key = (self.cache_key, [pack.digest for pack in packs])
+        for pack in packs:
+            self.rule_sets[pack.name] = pack.rules
+
+    def open_cache(self, cache_dir=CACHE_DIR):
+        """Open the incremental scan cache for this tool's rule set."""
+        return ScanCache(self.name, rules_fingerprint(*self.cache_key), cache_dir)
+
+    def iter_scan(self, target, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+        """Yield the issues of each Java file under ``target`` as it is scanned.
+
+        ``target`` is a Java file or a directory walked recursively by
+        :class:`FileWalker`, which skips default excludes, ``.gitignore``d
+        paths (unless ``gitignore`` is false) and ``excludes`` globs, and
+        hands files to the scan as it finds them. Files are processed by
+        ``jobs`` worker processes (default: CPU count) and yielded in sorted
+        path order, so the result does not depend on scheduling. Files
+        unchanged since they were stored in ``cache`` are not rescanned.
+        With ``since`` (a git ref) only files changed since that ref are
+        scanned, and only issues inside the changed hunks are yielded.
+        Hits of ``cleanup_rules`` are checked against the symbol index of
+        the target's git work tree, kept next to ``cache`` (see
+        CleanupFilter; without a cache only the hit's own file is looked at).
+        """
+        walker = FileWalker(target, excludes, gitignore)
+        if since:
+            changes = changed_lines(since, target)
+            java_files = iter([f for f in sorted(changes) if not walker.is_excluded(f)])
+        else:
+            java_files = iter(walker)
+
+        first = next(java_files, None)
+        if first is None:
+            print(f"No {'changed ' if since else ''}Java files found in {target}", file=sys.stderr)
+            return
+
+        if os.path.isfile(target):
+            print(f"Scanning file: {target}", file=sys.stderr)
+        else:
+            print(f"Scanning {'changed ' if since else ''}Java files under: {target}", file=sys.stderr)
+
+        java_files = chain([first], java_files)
+        if since:
+            # Keep the paths to look up each file's changed hunks
+            java_files, paths = tee(java_files)
+
+        cleanup = None
+        if self.cleanup_rules:
+            cleanup = CleanupFilter(self.cleanup_rules, index_root(target),
+                                    cache.cache_dir if cache is not None else None,
+                                    jobs, excludes, gitignore)
+
+        def scan_many(files):
+            return map_files(self.scan_file, files, jobs)
+
+        results = scan_with_cache(java_files, scan_many, cache)
+        if since:
+            results = (filter_issues(file_issues, changes[filepath])
+                       for filepath, file_issues in zip(paths, results))
+        if cleanup is not None:
+            # After the hunk filter, so hits outside changed lines cost no lookup
+            results = (cleanup.filter(file_issues) for file_issues in results)
+        try:
+            yield from results
+        finally:
+            if cleanup is not None:
+                cleanup.close()
+
+    def scan_directory(self, directory, jobs=None, cache=None, since=None, excludes=(), gitignore=True):
+        """Scan all Java files in directory recursively and return the issues."""
+        issues = []
+        for file_issues in self.iter_scan(directory, jobs, cache, since, excludes, gitignore):
+            issues.extend(file_issues)
+        return issues
+
+    def print_issues(self, issues):
+        """Print found issues in a readable format."""
+        reporter = TextReporter(sys.stdout, self.title, self.empty_message)
+        reporter.add(issues)
+        reporter.close()
+
+    def build_parser(self, description):
+        parser = argparse.ArgumentParser(description=description.strip())
+        parser.add_argument('target', help='Java file or directory to scan')
+        parser.add_argument('-j', '--jobs', type=int, default=default_jobs(),
+                            help='worker processes for directory scans (default: CPU count)')
+        parser.add_argument('--cache-dir', default=CACHE_DIR,
+                            help=f'incremental scan cache location (default: {CACHE_DIR})')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='rescan every file and leave the cache untouched')
+        parser.add_argument('--since', metavar='REF',
+                            help='only scan files changed since a git ref and report issues in changed lines')
+        parser.add_argument('--rules', action='append', default=[], metavar='PACK',
+                            help='also run the rules of a YAML/JSON rule pack (repeatable)')
+        parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                            help='skip paths matching a .gitignore-style glob (repeatable)')
+        parser.add_argument('--no-gitignore', action='store_true',
+                            help='also scan files ignored by .gitignore')
+        parser.add_argument('--baseline', metavar='FILE',
+                            help='only report issues not recorded in this baseline file')
+        parser.add_argument('--write-baseline', metavar='FILE',
+                            help='record every issue found in this run as the accepted baseline')
+        parser.add_argument('--format', choices=['text', 'jsonl', 'sarif'], default='text',
+                            help='report format (default: text)')
+        parser.add_argument('-o', '--output', help='write the report to a file instead of stdout')
+        parser.add_argument('--sort', action='store_true',
+                            help='sort jsonl/sarif output by severity (text is always sorted)')
+        parser.add_argument('--profile', action='store_true',
+                            help='time every rule and print a ranked table to stderr '
+                                 '(runs in one process without the cache)')
+        parser.add_argument('--profile-json', metavar='FILE',
+                            help='also write the rule profile as JSON (implies --profile)')
+        parser.add_argument('--watch', action='store_true',
+                            help='after the report, keep polling for changed files and print '
+                                 'new and resolved issues until interrupted (text or jsonl)')
+        parser.add_argument('--watch-interval', type=float, default=POLL_INTERVAL, metavar='SECONDS',
+                            help=f'seconds between polls in --watch mode (default: {POLL_INTERVAL:g})')
+        return parser
+
+    def run(self, args):
+        """Scan ``args.target`` and write the report described by ``args``."""
+        target = args.target
+        if not os.path.exists(target):
+            print(f"Error: {target} is not a valid file or directory")
+            sys.exit(1)
+
+        try:
+            self.add_packs(args.rules, None if args.no_cache else args.cache_dir)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load rule pack: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        jobs = args.jobs
+        profiles = {}
+        if args.profile or args.profile_json:
+            # Worker processes and cache hits would hide rule timings
+            profiles = {label: rule_set.enable_profiling()
+                        for label, rule_set in self.rule_sets.items()}
+            jobs = 1
+            args.no_cache = True
+
+        baseline = None
+        if args.baseline:
+            try:
+                baseline = Baseline.load(args.baseline)
+            except (OSError, ValueError) as e:
+                print(f"Error: cannot read baseline {args.baseline}: {e}", file=sys.stderr)
+                sys.exit(1)
+        new_baseline = Baseline(args.write_baseline) if args.write_baseline else None
+
+        cache = None if args.no_cache else self.open_cache(args.cache_dir)
+        if args.watch:
+            self.run_watch(args, jobs, cache)
+            return
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        reporter = make_reporter(args.format, output, self.name, self.title,
+                                 self.empty_message, self.rules, args.sort)
+
+        try:
+            for file_issues in self.iter_scan(target, jobs, cache, args.since,
+                                              args.exclude, not args.no_gitignore):
+                if new_baseline is not None:
+                    new_baseline.add(file_issues)
+                if baseline is not None:
+                    file_issues = baseline.filter(file_issues)
+                reporter.add(file_issues)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if cache is not None:
+                cache.close()
+
+        reporter.close()
+        if args.output:
+            output.close()
+
+        if baseline is not None:
+            print(f"{baseline.suppressed} known issue(s) suppressed by baseline {args.baseline}",
+                  file=sys.stderr)
+        if new_baseline is not None:
+            new_baseline.save()
+            print(f"Wrote {sum(new_baseline.counts.values())} issue fingerprint(s) to {args.write_baseline}",
+                  file=sys.stderr)
+
+        if profiles:
+            rows = [row for label, profile in profiles.items() for row in profile.rows(label)]
+            print("\nRULE PROFILE", file=sys.stderr)
+            print(format_profile(rows), file=sys.stderr)
+            for label, rule_set in self.rule_sets.items():
+                for name, warning in rule_set.warnings:
+                    print(f"Guarded rule {name} ({label}): {warning}", file=sys.stderr)
+            if args.profile_json:
+                with open(args.profile_json, 'w', encoding='utf-8') as f:
+                    json.dump(rows, f, indent=2)
+
+    def run_watch(self, args, jobs, cache):
+        """Report every issue under ``args.target``, then watch it for changes."""
+        unsupported = [option for option, value in (
+            ('--since', args.since), ('--baseline', args.baseline),
+            ('--write-baseline', args.write_baseline), ('--output', args.output),
+            ('--profile', args.profile or args.profile_json),
+            ('--format sarif', args.format == 'sarif'),
+        ) if value]
+        if unsupported:
+            print(f"Error: --watch cannot be combined with {', '.join(unsupported)}", file=sys.stderr)
+            sys.exit(1)
+
+        watcher = Watcher(self, args.target, jobs, cache, args.exclude, not args.no_gitignore)
+        try:
+            reporter = make_reporter(args.format, sys.stdout, self.name, self.title,
+                                     self.empty_message, self.rules, args.sort)
+            reporter.add(watcher.start())
+            reporter.close()
+            watch(watcher, args.format, args.watch_interval)
+        finally:
+            watcher.close()
+            if cache is not None:
+                cache.close()
+
+    def main(self, description):
+        self.run(self.build_parser(description).parse_args())
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Repository-wide index of leak-prone fields and their cleanup calls.
+
+Whether a ``ThreadLocal`` is ever ``remove()``d or an ``ExecutorService``
+ever shut down is rarely visible on the line that declares it: cleanup
+happens in a ``finally`` block, a ``@PreDestroy`` method or another class.
+The index records, for every Java file of the repository:
+
+- declarations of the types in CLEANUP_METHODS: name, type, declaring
+  class, and for local variables the method they are declared in
+- call sites of the cleanup methods (``x.remove()``, ``Holder.POOL.shutdown()``)
+  with their receiver, qualifier and enclosing class
+
+Files are indexed in parallel from the masked view (so comments and string
+literals never count) and stored in SQLite under ``.code-review-cache/``.
+``update`` only reindexes files whose size or mtime changed, so leak rules
+can ask "is this field ever cleaned up" with a lookup instead of
+rescanning the repository.
+
+``CleanupFilter`` consults the index lazily: nothing is read until a leak
+rule reports a hit, the hit's own file is indexed first, and the rest of
+the repository only when a field has no cleanup call in its own file.
+"""
+
+import os
+import re
+import sqlite3
+from bisect import bisect_left
+
+from file_walker import FileWalker
+from java_lexer import iter_windows
+from method_index import IndexBuilder
+from parallel_scan import map_files
+from scan_cache import CACHE_DIR, ensure_cache_dir, rules_fingerprint
+
+INDEX_FILE = 'symbols.sqlite'
+
+# Tracked types and the calls that release them
+CLEANUP_METHODS = {
+    'ThreadLocal': ('remove',),
+    'InheritableThreadLocal': ('remove',),
+    'ExecutorService': ('shutdown', 'shutdownNow', 'close'),
+    'ScheduledExecutorService': ('shutdown', 'shutdownNow', 'close'),
+}
+
+# ``Type<...> name =`` or ``Type name;`` (generic arguments up to three deep)
+DECLARATION = re.compile(r'''
+    \b({types})\b \s*
+    (?:<(?:[^<>;{{}}]|<(?:[^<>;{{}}]|<[^<>;{{}}]*>)*>)*>)? \s+
+    (\w+) \s* (?=[=;])
+'''.format(types='|'.join(sorted(CLEANUP_METHODS, key=len, reverse=True))), re.VERBOSE)
+TRY_RESOURCE = re.compile(r'\btry\s*\(\s*(?:final\s+)?$')
+# ``[qualifier.]receiver.method()`` for the cleanup methods
+CLEANUP_CALL = re.compile(r'''
+    (?:\b(\w+)\s*\.\s*)? \b(\w+) \s*\.\s*
+    ({methods}) \s*\(\s*\)
+'''.format(methods='|'.join(sorted({m for ms in CLEANUP_METHODS.values() for m in ms}))),
+    re.VERBOSE)
+# Files without a match have nothing to index and are not lexed
+PREFILTER = re.compile(rb'ThreadLocal|ExecutorService|\.\s*(?:remove|shutdown|close)\w*\s*\(\s*\)')
+
+
+def index_root(target):
+    """The directory to index for a scan target: its git work tree, else the target."""
+    directory = os.path.abspath(target if os.path.isdir(target) else os.path.dirname(target) or '.')
+    current = directory
+    while not os.path.exists(os.path.join(current, '.git')):
+        parent = os.path.dirname(current)
+        if parent == current:
+            return directory
+        current = parent
+    return current
+
+
+def _innermost(scopes, line):
+    best = None
+    for scope in scopes:
+        if scope.start_line <= line <= scope.end_line and (
+                best is None or scope.start_line >= best.start_line):
+            best = scope
+    return best
+
+
+def _find_symbols(masked, first_line, line_offsets):
+    """Declarations and cleanup calls in one window of the masked view."""
+    declarations = []
+    calls = []
+
+    def line_of(offset):
+        return first_line + bisect_left(line_offsets, offset)
+
+    for match in DECLARATION.finditer(masked):
+        line_start = masked.rfind('\n', 0, match.start()) + 1
+        auto_closed = bool(TRY_RESOURCE.search(masked, line_start, match.start()))
+        declarations.append((line_of(match.start()), match.group(1), match.group(2), auto_closed))
+    for match in CLEANUP_CALL.finditer(masked):
+        calls.append((line_of(match.start()), match.group(1), match.group(2), match.group(3)))
+    return declarations, calls
+
+
+def index_file(filepath):
+    """Return ``(path, size, mtime_ns, symbols, calls)`` rows for one file.
+
+    Must stay a module-level function so ``map_files`` can run it in
+    worker processes.
+    """
+    path = os.path.abspath(filepath)
+    try:
+        stat = os.stat(path)
+        declarations = []
+        calls = []
+        builder = IndexBuilder()
+        for first_line, source, final in iter_windows(path):
+            whole_file = first_line == 1 and final
+            if whole_file and not PREFILTER.search(source.data):
+                break
+            masked = source.view_text('masked')
+            line_offsets = [m.start() for m in re.finditer('\n', masked)]
+            found_declarations, found_calls = _find_symbols(masked, first_line, line_offsets)
+            declarations.extend(found_declarations)
+            calls.extend(found_calls)
+            # The structure of a window is only needed to place what was
+            # found, but a streamed file's builder must see every window
+            if not whole_file or found_declarations or found_calls:
+                builder.feed(masked if final else masked + '\n')
+        index = builder.finish()
+    except (OSError, ValueError):
+        return path, None, None, [], []
+
+    symbols = []
+    for line, type_name, name, auto_closed in declarations:
+        owner = _innermost(index.classes, line)
+        method = (_innermost([m for m in index.methods if m.kind == 'method'], line)
+                  or _innermost(index.methods, line))
+        symbols.append((path, line, owner.name if owner else None, name, type_name,
+                        method.start_line if method else None,
+                        method.end_line if method else None, int(auto_closed)))
+    call_rows = []
+    for line, qualifier, receiver, method_name in calls:
+        owner = _innermost(index.classes, line)
+        call_rows.append((path, line, owner.name if owner else None, qualifier, receiver, method_name))
+    return path, stat.st_size, stat.st_mtime_ns, symbols, call_rows
+
+
+class SymbolIndex:
+    """Persistent symbol index of one or more source trees.
+
+    ``cache_dir`` None keeps the index in memory for a single run. The whole
+    index is dropped when the scanner code changes, like the scan cache.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        if cache_dir is None:
+            self.db = sqlite3.connect(':memory:')
+        else:
+            ensure_cache_dir(cache_dir)
+            self.db = sqlite3.connect(os.path.join(cache_dir, INDEX_FILE))
+        self.db.executescript(
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);'
+            'CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);'
+            'CREATE TABLE IF NOT EXISTS symbols (path TEXT, line INTEGER, class TEXT, name TEXT, '
+            'type TEXT, scope_start INTEGER, scope_end INTEGER, auto_closed INTEGER);'
+            'CREATE TABLE IF NOT EXISTS calls (path TEXT, line INTEGER, class TEXT, '
+            'qualifier TEXT, receiver TEXT, method TEXT);'
+            'CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path, line);'
+            'CREATE INDEX IF NOT EXISTS calls_path ON calls (path);'
+            'CREATE INDEX IF NOT EXISTS calls_receiver ON calls (receiver);'
+        )
+        fingerprint = rules_fingerprint('symbol_index', CLEANUP_METHODS)
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            for table in ('files', 'symbols', 'calls'):
+                self.db.execute(f'DELETE FROM {table}')
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                            (fingerprint,))
+            self.db.commit()
+        self.indexed = 0
+
+    def _forget(self, path):
+        for table in ('files', 'symbols', 'calls'):
+            self.db.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+
+    def _store(self, row):
+        """Replace a file's rows with an ``index_file`` result; return 1 if it was stored."""
+        path, size, mtime_ns, symbols, calls = row
+        self._forget(path)
+        if size is None:
+            return 0
+        self.db.execute('INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)',
+                        (path, size, mtime_ns))
+        self.db.executemany('INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)', symbols)
+        self.db.executemany('INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?)', calls)
+        return 1
+
+    def update(self, root, jobs=None, excludes=(), gitignore=True):
+        """Bring the index of the Java files under ``root`` up to date.
+
+        Unchanged files (same size and mtime) are skipped without being
+        read; changed ones are reindexed by ``jobs`` worker processes and
+        files that disappeared are dropped. Returns the number reindexed.
+        """
+        # Every path under root sorts between "root/" and "root0"
+        prefix = os.path.join(os.path.abspath(root), '')
+        stored = {
+            path: (size, mtime_ns) for path, size, mtime_ns in self.db.execute(
+                'SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?',
+                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+        }
+        seen = set()
+
+        def changed():
+            for filepath in FileWalker(root, excludes, gitignore):
+                path = os.path.abspath(filepath)
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stored.get(path) != (stat.st_size, stat.st_mtime_ns):
+                    yield path
+
+        count = 0
+        for row in map_files(index_file, changed(), jobs):
+            count += self._store(row)
+        for path in stored.keys() - seen:
+            self._forget(path)
+        self.db.commit()
+        self.indexed += count
+        return count
+
+    def update_file(self, filepath):
+        """Reindex a single file if its size or mtime changed; return whether it was."""
+        path = os.path.abspath(filepath)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        row = self.db.execute('SELECT size, mtime_ns FROM files WHERE path = ?', (path,)).fetchone()
+        if row == (stat.st_size, stat.st_mtime_ns):
+            return False
+        self._store(index_file(path))
+        self.db.commit()
+        self.indexed += 1
+        return True
+
+    def declarations(self, filepath, line, types):
+        """Declarations of any of ``types`` on a line of a file."""
+        placeholders = ','.join('?' * len(types))
+        return self.db.execute(
+            'SELECT path, class, name, type, scope_start, scope_end, auto_closed FROM symbols '
+            f'WHERE path = ? AND line = ? AND type IN ({placeholders})',
+            (os.path.abspath(filepath), line, *types),
+        ).fetchall()
+
+    def is_cleaned_up(self, declaration, other_files=True):
+        """Whether a declaration row has a matching cleanup call anywhere.
+
+        A local variable must be cleaned up inside its method. A field
+        counts as cleaned up by a call on its name in the same file or in
+        its class, or qualified by its class name from any file; with
+        ``other_files`` false only calls in its own file are looked up.
+        """
+        path, owner, name, type_name, scope_start, scope_end, auto_closed = declaration
+        if auto_closed:
+            return True
+        methods = CLEANUP_METHODS[type_name]
+        placeholders = ','.join('?' * len(methods))
+        if scope_start is not None:
+            row = self.db.execute(
+                f'SELECT 1 FROM calls WHERE receiver = ? AND method IN ({placeholders}) '
+                'AND path = ? AND line BETWEEN ? AND ? LIMIT 1',
+                (name, *methods, path, scope_start, scope_end),
+            ).fetchone()
+        elif not other_files:
+            row = self.db.execute(
+                f'SELECT 1 FROM calls WHERE receiver = ? AND method IN ({placeholders}) '
+                'AND path = ? LIMIT 1',
+                (name, *methods, path),
+            ).fetchone()
+        else:
+            row = self.db.execute(
+                f'SELECT 1 FROM calls WHERE receiver = ? AND method IN ({placeholders}) '
+                'AND (path = ? OR class = ? OR qualifier = ?) LIMIT 1',
+                (name, *methods, path, owner, owner),
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        self.db.close()
+
+
+class CleanupFilter:
+    """Drops cleanup-rule hits whose declared symbol is cleaned up.
+
+    ``rule_types`` maps a rule name to the declared types its hits refer
+    to. The index (see SymbolIndex for ``cache_dir``) is only opened once
+    such a hit turns up, and the hit's file is indexed on its own. That
+    settles local variables, and fields cleaned up in their own file; only
+    a field without such a call brings the index of the repository at
+    ``root`` up to date, once until ``invalidate`` is called. Without
+    ``cache_dir`` that index is built in memory, so what is reported never
+    depends on whether a cache is kept.
+    """
+
+    def __init__(self, rule_types, root, cache_dir=CACHE_DIR, jobs=None, excludes=(),
+                 gitignore=True):
+        self.rule_types = rule_types
+        self.root = root
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.excludes = excludes
+        self.gitignore = gitignore
+        self.index = None
+        self.current = False
+
+    def invalidate(self):
+        """Have the next cross-file lookup bring the repository index up to date again."""
+        self.current = False
+
+    def _cleaned_up(self, declaration):
+        if self.index.is_cleaned_up(declaration, other_files=False):
+            return True
+        if declaration[4] is not None:
+            return False  # A local variable is only cleaned up in its method
+        if not self.current:
+            self.index.update(self.root, self.jobs, self.excludes, self.gitignore)
+            self.current = True
+        return self.index.is_cleaned_up(declaration)
+
+    def filter(self, issues):
+        """Return ``issues`` without the hits whose symbol is cleaned up.
+
+        Hits of other rules, and hits on lines without a tracked
+        declaration, are kept.
+        """
+        kept = []
+        for issue in issues:
+            types = self.rule_types.get(issue['name'])
+            if types:
+                if self.index is None:
+                    self.index = SymbolIndex(self.cache_dir)
+                self.index.update_file(issue['file'])
+                cleaned = False
+                for declaration in self.index.declarations(issue['file'], issue['line'], types):
+                    cleaned = self._cleaned_up(declaration)
+                    if not cleaned:
+                        break
+                if cleaned:
+                    continue
+            kept.append(issue)
+        return kept
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
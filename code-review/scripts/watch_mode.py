@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Watch mode for the code-review scanners.
+
+After one full scan the issues of every file stay in memory. The tree is
+then polled with ``FileWalker.stats``, whose size and mtime come from the
+``os.scandir`` entries; only files whose stat data changed are rescanned,
+and the difference is printed as new (``+``) and resolved (``-``) issues.
+Issues of a file are compared by rule and code line rather than line
+number, as baselines do, so editing the top of a file does not report
+everything below it as resolved and new again.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from file_walker import FileWalker
+from parallel_scan import map_files
+from scan_cache import ScanFailed, scan_with_cache
+from symbol_index import CleanupFilter, index_root
+
+# Seconds between two polls of the tree
+POLL_INTERVAL = 1.0
+
+
+def _issue_key(issue):
+    return issue['name'], ' '.join(issue['code'].split())
+
+
+def _unmatched(issues, others):
+    """The issues of ``issues`` left over after pairing them with ``others``."""
+    remaining = Counter(_issue_key(issue) for issue in others)
+    unmatched = []
+    for issue in issues:
+        key = _issue_key(issue)
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            unmatched.append(issue)
+    return unmatched
+
+
+def diff_issues(old, new):
+    """Return ``(added, resolved)`` between two issue lists of one file."""
+    if old == new:
+        return [], []
+    return _unmatched(new, old), _unmatched(old, new)
+
+
+class Watcher:
+    """In-memory issue map of a tree, kept current by polling.
+
+    ``tool`` is a ScanTool. ``raw`` holds each file's issues as scanned and
+    ``issues`` what is reported after the symbol index filter; a change to
+    one file can resolve (or reopen) cleanup-rule hits in others.
+    """
+
+    def __init__(self, tool, target, jobs=None, cache=None, excludes=(), gitignore=True):
+        self.tool = tool
+        self.target = target
+        self.jobs = jobs
+        self.cache = cache
+        self.excludes = excludes
+        self.gitignore = gitignore
+        self.walker = FileWalker(target, excludes, gitignore)
+        self.stats = {}
+        self.raw = {}
+        self.issues = {}
+        self.cleanup = None
+        if tool.cleanup_rules:
+            self.cleanup = CleanupFilter(tool.cleanup_rules, index_root(target),
+                                         cache.cache_dir if cache is not None else None,
+                                         jobs, excludes, gitignore)
+
+    def _poll(self):
+        return {path: (size, mtime_ns) for path, size, mtime_ns in self.walker.stats()}
+
+    def _scan(self, paths):
+        """Scan ``paths`` into ``raw``; return those that could not be read.
+
+        A file deleted or renamed since the poll, or one that cannot be
+        read, is dropped from the watch state. It is scanned again once it
+        reappears or its stat data changes.
+        """
+        def scan_many(files):
+            return map_files(self.tool.scan_file, files, self.jobs)
+
+        results = scan_with_cache(iter(paths), scan_many, self.cache)
+        failed = []
+        for path, file_issues in zip(paths, results):
+            if isinstance(file_issues, ScanFailed):
+                failed.append(path)
+                self.raw.pop(path, None)
+                if not os.path.exists(path):
+                    self.stats.pop(path, None)
+            else:
+                self.raw[path] = file_issues
+        if self.cache is not None:
+            self.cache.commit()
+        return failed
+
+    def _filter(self, paths):
+        if self.cleanup is None:
+            return {path: self.raw[path] for path in paths}
+        # Cleanup-rule hits anywhere may depend on the changed files, so the
+        # repository index is brought up to date again if a hit needs it
+        self.cleanup.invalidate()
+        rules = set(self.tool.cleanup_rules)
+        paths = set(paths) | {path for path, file_issues in self.raw.items()
+                              if any(issue['name'] in rules for issue in file_issues)}
+        return {path: self.cleanup.filter(self.raw[path]) for path in paths}
+
+    def start(self):
+        """Scan every file and return the issues, in path order."""
+        self.stats = self._poll()
+        paths = list(self.stats)
+        failed = set(self._scan(paths))
+        paths = [path for path in paths if path not in failed]
+        self.issues = self._filter(paths)
+        return [issue for path in paths for issue in self.issues[path]]
+
+    def refresh(self):
+        """Rescan changed files; return ``(changed paths, added, resolved)``."""
+        stats = self._poll()
+        changed = [path for path, stat in stats.items() if self.stats.get(path) != stat]
+        removed = [path for path in self.stats if path not in stats]
+        self.stats = stats
+        if not changed and not removed:
+            return [], [], []
+
+        for path in removed:
+            self.raw.pop(path, None)
+        failed = self._scan(changed)
+        if failed:
+            changed = [path for path in changed if path not in failed]
+            removed += failed
+        updated = self._filter(changed)
+        added = []
+        resolved = []
+        for path in sorted(set(updated) | set(removed)):
+            new = updated.get(path, [])
+            file_added, file_resolved = diff_issues(self.issues.get(path, []), new)
+            added.extend(file_added)
+            resolved.extend(file_resolved)
+            if path in updated:
+                self.issues[path] = new
+            else:
+                self.issues.pop(path, None)
+        return changed + removed, added, resolved
+
+    def close(self):
+        if self.cleanup is not None:
+            self.cleanup.close()
+
+
+def print_changes(stream, fmt, changed, added, resolved):
+    """Print one poll's new and resolved issues as text or JSON lines."""
+    if fmt == 'jsonl':
+        for event, issues in (('new', added), ('resolved', resolved)):
+            for issue in issues:
+                stream.write(json.dumps({'event': event, **issue}, ensure_ascii=False) + '\n')
+        stream.flush()
+        return
+    print(f"\n[{time.strftime('%H:%M:%S')}] {len(changed)} file(s) changed: "
+          f"{len(added)} new, {len(resolved)} resolved", file=stream)
+    for sign, issues in (('+', added), ('-', resolved)):
+        for issue in issues:
+            print(f"  {sign} [{issue['severity']}] {issue['file']}:{issue['line']} {issue['name']}",
+                  file=stream)
+            if issue.get('code'):
+                print(f"      {issue['code'][:80]}", file=stream)
+    stream.flush()
+
+
+def watch(watcher, fmt, interval=POLL_INTERVAL, stream=sys.stdout):
+    """Poll ``watcher`` every ``interval`` seconds until interrupted."""
+    print(f"Watching {len(watcher.stats)} Java file(s) under {watcher.target} "
+          "(Ctrl+C to stop)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(interval)
+            changed, added, resolved = watcher.refresh()
+            if changed:
+                print_changes(stream, fmt, changed, added, resolved)
+    except KeyboardInterrupt:
+        print("\nStopped watching", file=sys.stderr)
@@ -0,0 +1,69 @@
+"""Java sources shared by the scanner tests."""
+
+import os
+
+# One class exercising every view: block comments and text blocks that
+# span lines, comment markers inside strings, multi-line rule hits and
+# methods the complexity check reports
+CLASS = '''package demo;
+
+import java.util.*;
+
+/*
+ * A block comment spanning lines, with code in it:
+ * try { run(); } catch (Exception e) {}
+ */
+public class Demo {
+    private static final ThreadLocal<String> CONTEXT = new ThreadLocal<>();
+    private String password = "changeit";
+    private ExecutorService pool = Executors.newFixedThreadPool(4);
+
+    String query(String id) {
+        String sql = "SELECT * FROM user WHERE id = " + id;
+        String url = "http://example.com/*not a comment*/";
+        String block = """
+            catch (Exception e) {}
+            // not a comment either
+            """;
+        return sql + url + block;
+    }
+
+
+    void swallow() {
+        try {
+            run();
+        } catch (RuntimeException e) {
+        }
+        try { run(); } catch (Error e) { /* ignored on purpose */ }
+        if (count > 100) { return; }
+        System.out.println("debug " + count);
+    }
+
+    int branches(int a) {
+        if (a == 1) { a++; } else if (a == 2) { a--; }
+        for (int i = 0; i < a; i++) { if (i % 2 == 0) { a += i; } }
+        while (a > 10) { a /= 2; }
+        switch (a) { case 1: a++; break; case 2: a--; break; default: a = 0; }
+        try { run(); } catch (IllegalStateException e) { a = -1; }
+        return a > 0 && a < 5 || a == 7 ? a : -a;
+    }
+}
+'''
+
+
+def java_class(n, padding=0):
+    """CLASS as class ``Demo<n>``, pushed down by ``padding`` blank lines."""
+    return '\n' * padding + CLASS.replace('Demo', f'Demo{n}')
+
+
+def write_tree(root, count):
+    """Write ``count`` sample files under ``root``, in a few packages; return their paths."""
+    paths = []
+    for n in range(count):
+        directory = os.path.join(root, 'src', f'p{n % 3}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'Demo{n}.java')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(java_class(n, padding=n % 5))
+        paths.append(path)
+    return sorted(paths)
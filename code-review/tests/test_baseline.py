@@ -0,0 +1,83 @@
+"""Baselines: which issues count as known, and how they survive edits."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from baseline import Baseline, fingerprint  # noqa: E402
+
+
+def issue(line, code, name='System.out.println', path='src/A.java'):
+    return {'file': path, 'line': line, 'name': name, 'code': code, 'severity': 'MEDIUM'}
+
+
+class BaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'baseline.json')
+        self.cwd = os.getcwd()
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def accepted(self, issues):
+        baseline = Baseline(self.path)
+        baseline.add(issues)
+        baseline.save()
+        return Baseline.load(self.path)
+
+    def test_fingerprint_ignores_line_numbers_and_spacing(self):
+        self.assertEqual(fingerprint(issue(3, 'System.out.println(x);'), self.root),
+                         fingerprint(issue(30, '\t  System.out.println(x);  '), self.root))
+        self.assertEqual(fingerprint(issue(3, 'a  =\tb;'), self.root),
+                         fingerprint(issue(3, 'a = b;'), self.root))
+        self.assertNotEqual(fingerprint(issue(3, 'a = b;'), self.root),
+                            fingerprint(issue(3, 'a = b;', path='src/B.java'), self.root))
+
+    def test_paths_are_relative_to_the_baseline_file(self):
+        absolute = issue(1, 'x();', path=os.path.join(self.root, 'src', 'A.java'))
+        self.assertEqual(fingerprint(absolute, self.root), fingerprint(issue(1, 'x();'), self.root))
+
+    def test_known_issues_are_suppressed(self):
+        known = [issue(1, 'System.out.println(a);'), issue(2, 'System.out.println(b);')]
+        baseline = self.accepted(known)
+        moved = [issue(11, 'System.out.println(a);'), issue(12, 'System.out.println(b);')]
+        new = issue(13, 'System.out.println(c);')
+        self.assertEqual(baseline.filter(moved + [new]), [new])
+        self.assertEqual(baseline.suppressed, 2)
+
+    def test_a_third_identical_issue_is_reported(self):
+        baseline = self.accepted([issue(1, 'log();'), issue(2, 'log();')])
+        issues = [issue(1, 'log();'), issue(2, 'log();'), issue(3, 'log();')]
+        self.assertEqual(baseline.filter(issues), [issues[2]])
+
+    def test_saved_file_is_versioned_json(self):
+        self.accepted([issue(1, 'x();')])
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['version'], 1)
+        self.assertEqual(list(data['fingerprints'].values()), [1])
+
+    def test_malformed_files_are_load_errors(self):
+        cases = ['[]', '{"version": 1}', '{"version": 2, "fingerprints": {}}',
+                 '{"version": 1, "fingerprints": []}', '{"version": 1, "fingerprints": {"a": "1"}}',
+                 '{"version": 1, "fingerprints": {"a": 0}}', '{"version": 1, "fingerprints": {"a": true}}',
+                 'not json']
+        for text in cases:
+            with self.subTest(text=text):
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                with self.assertRaises(ValueError):
+                    Baseline.load(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""--since: only changed files are scanned, and only issues in changed hunks reported."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+from git_diff import changed_lines, filter_issues  # noqa: E402
+from samples import java_class  # noqa: E402
+
+GIT_ENV = {
+    'GIT_AUTHOR_NAME': 'test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+    'GIT_COMMITTER_NAME': 'test', 'GIT_COMMITTER_EMAIL': 'test@example.com',
+}
+
+ADDED_LINE = '        System.out.println("added " + count);'
+
+
+@unittest.skipUnless(shutil.which('git'), 'needs git')
+class SinceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.git('init', '-q')
+        self.paths = {}
+        for name in ('Edited', 'Untouched', 'Shortened'):
+            self.paths[name] = self.write(name, java_class(name))
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'base')
+
+        # Add a flagged line after the one swallow() already has
+        lines = java_class('Edited').split('\n')
+        self.added_line = lines.index('        System.out.println("debug " + count);') + 2
+        lines.insert(self.added_line - 1, ADDED_LINE)
+        self.write('Edited', '\n'.join(lines))
+        # Deleting lines leaves nothing to report
+        self.write('Shortened', java_class('Shortened').replace('import java.util.*;\n', ''))
+        self.paths['Untracked'] = self.write('Untracked', java_class('Untracked'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def git(self, *args):
+        subprocess.run(['git', *args], cwd=self.root, check=True, capture_output=True,
+                       env={**os.environ, **GIT_ENV})
+
+    def write(self, name, text):
+        path = os.path.join(self.root, f'{name}.java')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_changed_lines(self):
+        self.assertEqual(changed_lines('HEAD', self.root), {
+            self.paths['Edited']: [(self.added_line, self.added_line)],
+            self.paths['Untracked']: [(1, None)],
+        })
+
+    def test_since_reports_only_changed_hunks(self):
+        tool = code_review.make_tool()
+        issues = tool.scan_directory(self.root, jobs=1, since='HEAD')
+        edited = [issue for issue in issues if issue['file'] == self.paths['Edited']]
+        self.assertTrue(edited)
+        self.assertEqual({issue['line'] for issue in edited}, {self.added_line})
+        self.assertIn(ADDED_LINE.strip(), {issue['code'] for issue in edited})
+
+        untracked = [issue for issue in issues if issue['file'] == self.paths['Untracked']]
+        self.assertEqual(untracked, tool.scan_directory(self.paths['Untracked'], jobs=1))
+        self.assertEqual({issue['file'] for issue in issues},
+                         {self.paths['Edited'], self.paths['Untracked']})
+
+    def test_filter_issues_keeps_issues_overlapping_a_range(self):
+        issues = [
+            {'line': 5, 'name': 'inside'},
+            {'line': 1, 'end_line': 12, 'name': 'spanning'},
+            {'line': 20, 'name': 'outside'},
+            {'line': 30, 'name': 'open range'},
+        ]
+        kept = filter_issues(issues, [(4, 6), (10, 10), (30, None)])
+        self.assertEqual([issue['name'] for issue in kept], ['inside', 'spanning', 'open range'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""The Java lexer: encodings, line ends and the views built from its tokens."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import java_lexer  # noqa: E402
+from java_lexer import JavaSource, decode, iter_windows, read_source  # noqa: E402
+
+GBK_TEXT = 'class Demo {\n    // 中文注释：用户名\n    String name = "张三";\n}\n'
+
+VIEWS_TEXT = r'''class A {
+    char quote = '"'; char slash = '/';
+    String url = "http://x/*y*/"; // trailing "comment"
+    String block = """
+        text with "quotes" and // no comment
+        """;
+    /* block
+       comment with "quotes" */ int n = 1;
+}
+'''
+
+
+class ViewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.source = JavaSource(VIEWS_TEXT)
+
+    def line(self, view, number):
+        return self.source.view_lines(view)[number - 1]
+
+    def test_views_share_offsets_and_lines(self):
+        for view in ('code', 'masked', 'comments'):
+            with self.subTest(view=view):
+                text = self.source.view_text(view)
+                self.assertEqual(len(text), len(VIEWS_TEXT))
+                self.assertEqual([i for i, c in enumerate(text) if c == '\n'],
+                                 [i for i, c in enumerate(VIEWS_TEXT) if c == '\n'])
+
+    def test_char_literal_quote_does_not_open_a_string(self):
+        self.assertEqual(self.line('masked', 2), "    char quote = ' '; char slash = ' ';")
+        self.assertEqual(self.line('code', 2), self.line('raw', 2))
+
+    def test_comment_markers_inside_strings(self):
+        comment = ' ' * len('// trailing "comment"')
+        self.assertEqual(self.line('code', 3), '    String url = "http://x/*y*/"; ' + comment)
+        self.assertEqual(self.line('masked', 3), '    String url = "' + ' ' * 13 + '"; ' + comment)
+        self.assertEqual(self.line('comments', 3).strip(), '// trailing "comment"')
+
+    def test_text_block_keeps_delimiters_only(self):
+        self.assertEqual(self.line('masked', 4), '    String block = """')
+        self.assertEqual(self.line('masked', 5).strip(), '')
+        self.assertEqual(self.line('masked', 6), '        """;')
+        self.assertEqual(self.line('code', 5), self.line('raw', 5))
+        self.assertEqual(self.line('comments', 5).strip(), '')
+
+    def test_block_comment(self):
+        self.assertEqual(self.line('masked', 8), ' ' * 32 + 'int n = 1;')
+        self.assertEqual(self.line('comments', 7), '    /* block')
+        self.assertEqual(self.line('comments', 8).rstrip(), '       comment with "quotes" */')
+
+    def test_unterminated_tokens(self):
+        source = JavaSource('String s = "open\nint a; /* open\nx')
+        self.assertEqual(source.view_lines('masked'), ['String s = "    ', 'int a; ' + ' ' * len('/* open'), ' '])
+
+
+class EncodingTest(unittest.TestCase):
+
+    def write(self, data):
+        handle, path = tempfile.mkstemp(suffix='.java')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def windowed_text(self, path, chunk_size):
+        return '\n'.join(source.text for _, source, _ in
+                         iter_windows(path, chunk_size=chunk_size, threshold=0))
+
+    def test_utf8_and_gbk_are_told_apart(self):
+        for encoding in ('utf-8', 'gbk'):
+            with self.subTest(encoding=encoding):
+                source = read_source(self.write(GBK_TEXT.encode(encoding)))
+                self.assertEqual(source.encoding, 'utf-8' if encoding == 'utf-8' else 'gb18030')
+                self.assertEqual(source.text, GBK_TEXT)
+
+    def test_ascii_is_read_as_utf8(self):
+        self.assertEqual(decode(b'class A {}\n')[:2], ('utf-8', 'class A {}\n'))
+
+    def test_text_reuses_the_decode_that_found_the_encoding(self):
+        source = read_source(self.write(GBK_TEXT.encode('gbk')))
+        with mock.patch.object(java_lexer, 'decode', wraps=java_lexer.decode) as decode_calls:
+            self.assertEqual(source.encoding, 'gb18030')
+            self.assertEqual(source.text, GBK_TEXT)
+            self.assertEqual(source.view_text('masked').count('\n'), GBK_TEXT.count('\n'))
+        self.assertEqual(decode_calls.call_count, 1)
+
+    def test_crlf_and_cr_line_ends_become_lf(self):
+        source = read_source(self.write(b'class A {\r\n  int a;\r  int b;\r\n}\r\n'))
+        self.assertEqual(source.lines, ['class A {', '  int a;', '  int b;', '}', ''])
+        self.assertNotIn(b'\r', source.data)
+        self.assertEqual(source.line_number(source.text.index('int b')), 3)
+
+    def test_bytes_view_needs_no_decoding(self):
+        source = read_source(self.write(GBK_TEXT.encode('gbk')))
+        self.assertEqual(source.view_lines('bytes')[2], '    String name = "张三";'.encode('gbk'))
+        self.assertIsNone(source._text)
+        self.assertEqual(source.line(3), '    String name = "张三";')
+
+    def test_windows_split_characters_and_crlf_like_the_whole_file(self):
+        text = GBK_TEXT * 50
+        for encoding in ('utf-8', 'gbk'):
+            path = self.write(text.replace('\n', '\r\n').encode(encoding))
+            for chunk_size in (5, 7, 64):
+                with self.subTest(encoding=encoding, chunk_size=chunk_size):
+                    self.assertEqual(self.windowed_text(path, chunk_size), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""The method index: which bodies are methods, their lines and complexity."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from java_lexer import JavaSource  # noqa: E402
+from method_index import IndexBuilder, build_index  # noqa: E402
+
+SOURCE = '''public class Outer<T extends Comparable<? super T>> {
+    private String s = "not { a brace";  // nor } this
+    public Outer() {
+        this.s = "x";
+    }
+
+    public List<? extends T> pick(Map<String, ? super T> input,
+                                  int limit)
+            throws IOException, IllegalStateException {
+        for (T item : items) {
+            if (item != null && limit > 0 || limit < -1) {
+                return limit > 1 ? a : b;
+            }
+        }
+        Runnable r = () -> {
+            while (true) {
+                if (done) break;
+            }
+        };
+        return null;
+    }
+
+    static class Inner {
+        void run() {
+            new Thread(new Runnable() {
+                public void run() {
+                    switch (x) {
+                        case 1: break;
+                        case 2: break;
+                    }
+                }
+            }).start();
+        }
+    }
+}
+'''
+
+
+def summary(scopes):
+    return [(scope.kind, scope.name, scope.start_line, scope.end_line) for scope in scopes]
+
+
+class MethodIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = build_index(JavaSource(SOURCE))
+        self.methods = {(scope.name, scope.start_line): scope for scope in self.index.methods}
+
+    def test_classes(self):
+        self.assertEqual(summary(self.index.classes), [
+            ('class', '<anonymous>', 25, 32),
+            ('class', 'Inner', 23, 34),
+            ('class', 'Outer', 1, 35),
+        ])
+
+    def test_methods_close_in_order(self):
+        self.assertEqual(summary(self.index.methods), [
+            ('method', 'Outer', 3, 5),
+            ('lambda', '<lambda>', 15, 19),
+            ('method', 'pick', 7, 21),
+            ('method', 'run', 26, 31),
+            ('method', 'run', 24, 33),
+        ])
+
+    def test_multiline_header_starts_at_the_name(self):
+        self.assertEqual(self.methods['pick', 7].length, 15)
+
+    def test_decision_points(self):
+        # for, if, &&, || and the ternary; the lambda's while and if are its own
+        self.assertEqual(self.methods['pick', 7].complexity, 6)
+        self.assertEqual(self.methods['<lambda>', 15].complexity, 3)
+        self.assertEqual(self.methods['run', 26].complexity, 3)
+        self.assertEqual(self.methods['Outer', 3].complexity, 1)
+
+    def test_nesting(self):
+        self.assertEqual(self.methods['pick', 7].max_nesting, 2)
+        self.assertEqual(self.methods['<lambda>', 15].max_nesting, 1)
+        self.assertEqual(self.methods['run', 24].max_nesting, 0)
+
+    def test_windowed_feed_matches_one_pass(self):
+        # Windows are cut at line breaks, so a header may span two feeds
+        lines = JavaSource(SOURCE).view_text('masked').splitlines(keepends=True)
+        for size in (1, 2, 5):
+            with self.subTest(lines=size):
+                builder = IndexBuilder()
+                for start in range(0, len(lines), size):
+                    builder.feed(''.join(lines[start:start + size]))
+                index = builder.finish()
+                self.assertEqual(summary(index.methods), summary(self.index.methods))
+                self.assertEqual([m.complexity for m in index.methods],
+                                 [m.complexity for m in self.index.methods])
+
+    def test_unbalanced_input_is_closed(self):
+        index = build_index(JavaSource('class A {\n    void f() {\n        if (x) {\n'))
+        self.assertEqual(summary(index.methods), [('method', 'f', 2, 4)])
+        self.assertEqual(summary(index.classes), [('class', 'A', 1, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
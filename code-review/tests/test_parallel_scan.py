@@ -0,0 +1,41 @@
+"""Results must not depend on the number of worker processes."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+from parallel_scan import CHUNK_SIZE, map_files  # noqa: E402
+from samples import write_tree  # noqa: E402
+
+
+class ParallelScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Enough files for several chunks per worker
+        self.paths = write_tree(self.root, CHUNK_SIZE * 5 + 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_map_files_keeps_input_order(self):
+        self.assertEqual(list(map_files(os.path.getsize, self.paths, jobs=4)),
+                         [os.path.getsize(path) for path in self.paths])
+
+    def test_jobs_do_not_change_results(self):
+        tool = code_review.make_tool()
+        serial = tool.scan_directory(self.root, jobs=1)
+        self.assertTrue(serial)
+        self.assertEqual({issue['file'] for issue in serial}, set(self.paths))
+        for jobs in (2, 4):
+            with self.subTest(jobs=jobs):
+                self.assertEqual(tool.scan_directory(self.root, jobs=jobs), serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
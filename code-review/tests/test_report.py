@@ -0,0 +1,107 @@
+"""SARIF output: a valid log whose results and rules agree."""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+from report import ExternalSorter, SarifReporter, make_reporter  # noqa: E402
+from samples import write_tree  # noqa: E402
+
+RULES = [
+    {'name': 'Hardcoded password', 'severity': 'CRITICAL', 'description': '禁止硬编码密码'},
+    {'name': 'System.out.println', 'severity': 'LOW', 'description': 'Use a logger'},
+]
+
+
+def issue(name, severity, path='src/A.java', line=1):
+    return {'file': path, 'line': line, 'name': name, 'severity': severity,
+            'description': f'{name} found', 'code': 'x();'}
+
+
+def sarif_log(issues, rules=RULES, sort=False):
+    stream = io.StringIO()
+    reporter = SarifReporter(stream, 'code_review', rules, sort)
+    reporter.add(issues)
+    reporter.close()
+    return json.loads(stream.getvalue())
+
+
+class SarifTest(unittest.TestCase):
+
+    def test_empty_log_is_valid(self):
+        log = sarif_log([])
+        self.assertEqual(log['version'], '2.1.0')
+        [run] = log['runs']
+        self.assertEqual(run['results'], [])
+        self.assertEqual([rule['id'] for rule in run['tool']['driver']['rules']],
+                         ['Hardcoded password', 'System.out.println'])
+        self.assertEqual(run['tool']['driver']['rules'][0]['shortDescription']['text'], '禁止硬编码密码')
+
+    def test_results(self):
+        absolute = os.path.abspath(os.path.join('src', 'B.java'))
+        [first, second] = sarif_log([
+            issue('System.out.println', 'LOW', line=7),
+            issue('Hardcoded password', 'CRITICAL', path=absolute),
+        ])['runs'][0]['results']
+        self.assertEqual(first['ruleId'], 'System.out.println')
+        self.assertEqual(first['level'], 'note')
+        self.assertEqual(first['locations'][0]['physicalLocation'],
+                         {'artifactLocation': {'uri': 'src/A.java'}, 'region': {'startLine': 7}})
+        self.assertEqual(first['properties'], {'severity': 'LOW', 'code': 'x();'})
+        self.assertEqual(second['level'], 'error')
+        self.assertTrue(second['locations'][0]['physicalLocation']['artifactLocation']['uri']
+                        .startswith('file://'))
+
+    def test_sorted_results(self):
+        issues = [issue('System.out.println', 'LOW', line=n) for n in range(3)]
+        issues.insert(1, issue('Hardcoded password', 'CRITICAL'))
+        results = sarif_log(issues, sort=True)['runs'][0]['results']
+        self.assertEqual([(r['level'], r['locations'][0]['physicalLocation']['region']['startLine'])
+                          for r in results], [('error', 1), ('note', 0), ('note', 1), ('note', 2)])
+
+    def test_external_sort_is_stable_across_runs(self):
+        sorter = ExternalSorter(run_size=3)
+        issues = [issue('r', severity, line=n)
+                  for n, severity in enumerate(['LOW', 'HIGH', 'LOW', 'CRITICAL', 'HIGH', 'LOW', 'HIGH'])]
+        for item in issues:
+            sorter.add(item)
+        self.assertEqual(len(sorter.runs), 2)
+        self.assertEqual([item['line'] for item in sorter], [3, 1, 4, 6, 0, 2, 5])
+        sorter.close()
+
+
+class ScanSarifTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        write_tree(self.root, 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_every_result_has_a_rule(self):
+        tool = code_review.make_tool()
+        stream = io.StringIO()
+        reporter = make_reporter('sarif', stream, tool.name, tool.title, tool.empty_message, tool.rules)
+        with redirect_stderr(io.StringIO()):
+            for file_issues in tool.iter_scan(self.root, jobs=1):
+                reporter.add(file_issues)
+        reporter.close()
+        [run] = json.loads(stream.getvalue())['runs']
+        rule_ids = [rule['id'] for rule in run['tool']['driver']['rules']]
+        self.assertEqual(len(rule_ids), len(set(rule_ids)))
+        self.assertEqual(len(run['results']), reporter.total)
+        self.assertTrue(run['results'])
+        self.assertLessEqual({result['ruleId'] for result in run['results']}, set(rule_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
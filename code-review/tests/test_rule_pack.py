@@ -0,0 +1,113 @@
+"""Rule packs: loading, validation and the metadata cache."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import rule_pack  # noqa: E402
+from rule_pack import load_pack  # noqa: E402
+
+RULE = {
+    'name': 'Executors factory method',
+    'pattern': r'Executors\.new\w*ThreadPool\(',
+    'view': 'masked',
+    'severity': 'HIGH',
+    'description': 'Create thread pools with ThreadPoolExecutor',
+}
+
+YAML_PACK = r'''name: team
+description: Team rules
+rules:
+  - name: Executors factory method
+    pattern: 'Executors\.new\w*ThreadPool\('
+    view: masked
+    severity: HIGH
+    description: Create thread pools with ThreadPoolExecutor
+'''
+
+SOURCE = '''class A {
+    ExecutorService a = Executors.newFixedThreadPool(2);
+    String s = "Executors.newCachedThreadPool(";
+    ExecutorService b = Executors.newCachedThreadPool(); // NOPMD
+}
+'''
+
+
+class RulePackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.root, '.code-review-cache')
+        self.addCleanup(rule_pack._LOADED.clear)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        return path
+
+    def hits(self, pack):
+        return [(issue['line'], issue['name']) for issue in pack.rules.scan_text('A.java', SOURCE)]
+
+    def test_json_and_yaml_packs_load_alike(self):
+        json_pack = load_pack(self.write('team.json', {'rules': [RULE]}), None)
+        yaml_pack = load_pack(self.write('team.yaml', YAML_PACK), None)
+        self.assertEqual(json_pack.name, 'team')
+        self.assertEqual(yaml_pack.description, 'Team rules')
+        self.assertEqual(json_pack.patterns, yaml_pack.patterns)
+        self.assertEqual(self.hits(json_pack), [(2, RULE['name']), (4, RULE['name'])])
+        self.assertEqual(self.hits(yaml_pack), self.hits(json_pack))
+
+    def test_exclusion_view(self):
+        rule = dict(RULE, exclusion='NOPMD', exclusion_view='comments')
+        pack = load_pack(self.write('team.json', {'rules': [rule]}), None)
+        self.assertEqual(self.hits(pack), [(2, RULE['name'])])
+
+    def test_malformed_packs_are_rejected(self):
+        cases = {
+            'not a mapping': [RULE],
+            'no rules': {'name': 'team'},
+            'rule not a mapping': {'rules': ['x']},
+            'missing key': {'rules': [{k: v for k, v in RULE.items() if k != 'pattern'}]},
+            'unknown key': {'rules': [dict(RULE, flags='i')]},
+            'bad severity': {'rules': [dict(RULE, severity='URGENT')]},
+            'non-string view': {'rules': [dict(RULE, view=1)]},
+            'bad literals': {'rules': [dict(RULE, literals='Executors')]},
+            'invalid regex': {'rules': [dict(RULE, pattern='(')]},
+            'backtracking regex': {'rules': [dict(RULE, pattern=r'(\w+)*;')]},
+        }
+        for label, pack in cases.items():
+            with self.subTest(label):
+                with self.assertRaises(ValueError):
+                    load_pack(self.write(label.replace(' ', '_') + '.json', pack), None)
+        with self.assertRaises(ValueError):
+            load_pack(self.write('broken.yaml', 'rules: [\n'), None)
+        with self.assertRaises(OSError):
+            load_pack(os.path.join(self.root, 'missing.json'), None)
+
+    def test_metadata_cache_is_reused(self):
+        path = self.write('team.json', {'rules': [RULE]})
+        load_pack(path, self.cache_dir)
+        [cache_file] = os.listdir(os.path.join(self.cache_dir, rule_pack.PACK_CACHE_DIR))
+        rule_pack._LOADED.clear()
+        with mock.patch.object(rule_pack, '_write_metadata') as write_metadata:
+            pack = load_pack(path, self.cache_dir)
+        write_metadata.assert_not_called()
+        self.assertEqual(self.hits(pack), [(2, RULE['name']), (4, RULE['name'])])
+
+    def test_no_cache_dir_writes_nothing(self):
+        load_pack(self.write('team.json', {'rules': [RULE]}), None)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Backtracking checks on rule patterns, and the built-in rules they guard."""
+
+import os
+import re
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import check_style  # noqa: E402
+import find_memory_leaks  # noqa: E402
+from rule_engine import RuleSet  # noqa: E402
+from rule_validator import validate_pattern  # noqa: E402
+
+
+class ValidatePatternTest(unittest.TestCase):
+
+    def assertRejected(self, pattern):
+        errors, _warnings = validate_pattern(pattern)
+        self.assertTrue(errors, pattern)
+
+    def assertAccepted(self, pattern, warned=False):
+        errors, warnings = validate_pattern(pattern)
+        self.assertEqual(errors, [], pattern)
+        self.assertEqual(bool(warnings), warned, pattern)
+
+    def test_nested_quantifiers(self):
+        self.assertRejected(r'(a+)+b')
+        self.assertRejected(r'(?:.*x)*y')
+        self.assertAccepted(r'(\w+\.)*\w+', warned=True)
+
+    def test_adjacent_repeats_over_the_same_characters(self):
+        for pattern in (r'(SELECT|UPDATE)\s+[^;]*\+', r'=\s*[^;]*get', r'\w+\d*',
+                        r'x\s+\b\s*y', r'[^"]*\s*\+'):
+            with self.subTest(pattern=pattern):
+                self.assertRejected(pattern)
+
+    def test_adjacent_repeats_over_disjoint_characters(self):
+        for pattern in (r'(SELECT|UPDATE)\s[^;]*\+\s*\w', r'\d+\s+', r'[a-z]+[A-Z]*',
+                        r'catch\s*\([^)]*\)\s*\{', r'a{1,3}a*'):
+            with self.subTest(pattern=pattern):
+                self.assertAccepted(pattern)
+
+    def test_broad_repeats_further_apart_are_a_warning(self):
+        self.assertAccepted(r'.*\{.*', warned=True)
+
+    def test_invalid_pattern_raises(self):
+        with self.assertRaises(re.error):
+            validate_pattern(r'(unclosed')
+
+    def test_rule_set_rejects_an_overlapping_rule(self):
+        rule = {'name': 'Overlap', 'pattern': r'SELECT\s+[^;]*\+', 'severity': 'LOW',
+                'description': 'overlapping repeats'}
+        with self.assertRaisesRegex(ValueError, "Rule 'Overlap'"):
+            RuleSet([rule])
+
+
+class BuiltinRulesTest(unittest.TestCase):
+
+    def test_builtin_rules_pass_the_validator(self):
+        for rule in check_style.PATTERNS + find_memory_leaks.PATTERNS:
+            with self.subTest(rule=rule['name']):
+                self.assertEqual(validate_pattern(rule['pattern'])[0], [])
+
+    def test_sql_rule_is_linear_on_a_long_blank_line(self):
+        rule = next(rule for rule in check_style.PATTERNS
+                    if rule['name'] == 'SQL injection risk (string concat)')
+        line = 'String sql = "SELECT' + ' ' * 19000 + 'x";'
+        regex = re.compile(rule['pattern'])
+        started = time.perf_counter()
+        self.assertIsNone(regex.search(line))
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertTrue(regex.search('String sql = "SELECT * FROM t WHERE id = " + id;'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""The incremental scan cache: what is a hit, what is rescanned."""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+from samples import write_tree  # noqa: E402
+from scan_cache import ScanCache, ScanFailed  # noqa: E402
+
+
+class ScanCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.root, '.code-review-cache')
+        self.paths = write_tree(self.root, 6)
+        self.tool = code_review.make_tool()
+        self.scanned = []
+        scan_file = self.tool.scan_file
+
+        def recording_scan_file(filepath):
+            self.scanned.append(filepath)
+            return scan_file(filepath)
+
+        self.tool.scan_file = recording_scan_file
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def scan(self, cache=None):
+        self.scanned = []
+        own_cache = cache is None
+        cache = cache or self.tool.open_cache(self.cache_dir)
+        try:
+            with redirect_stderr(io.StringIO()) as self.errors:
+                return self.tool.scan_directory(self.root, jobs=1, cache=cache)
+        finally:
+            if own_cache:
+                cache.close()
+
+    def fail_on(self, broken, scan_broken):
+        """Scan ``broken`` with ``scan_broken``; return the previous scan_file."""
+        scan_file = self.tool.scan_file
+
+        def failing_scan_file(filepath):
+            return scan_broken(filepath) if filepath == broken else scan_file(filepath)
+
+        self.tool.scan_file = failing_scan_file
+        return scan_file
+
+    def test_warm_run_rescans_nothing(self):
+        cold = self.scan()
+        self.assertEqual(sorted(self.scanned), self.paths)
+        self.assertEqual(self.scan(), cold)
+        self.assertEqual(self.scanned, [])
+
+    def test_edited_file_is_rescanned(self):
+        cold = self.scan()
+        edited = self.paths[2]
+        with open(edited, 'a', encoding='utf-8') as f:
+            f.write('class Extra { void f() { System.out.println("x"); } }\n')
+        warm = self.scan()
+        self.assertEqual(self.scanned, [edited])
+        self.assertEqual(warm, self.tool.scan_directory(self.root, jobs=1))
+        self.assertNotEqual(warm, cold)
+
+    def test_touched_file_with_same_content_is_a_hit(self):
+        cold = self.scan()
+        stat = os.stat(self.paths[0])
+        os.utime(self.paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.scan(), cold)
+        self.assertEqual(self.scanned, [])
+
+    def test_rule_change_drops_cached_results(self):
+        self.scan()
+        cache = ScanCache(self.tool.name, 'fingerprint of other rules', self.cache_dir)
+        try:
+            self.scan(cache)
+        finally:
+            cache.close()
+        self.assertEqual(sorted(self.scanned), self.paths)
+
+    def test_file_deleted_before_its_scan_is_reported_and_skipped(self):
+        deleted = self.paths[3]
+
+        def delete_then_scan(filepath):
+            os.unlink(filepath)
+            return scan_file(filepath)
+
+        scan_file = self.fail_on(deleted, delete_then_scan)
+        issues = self.scan()
+        self.assertIn(f'Error reading {deleted}', self.errors.getvalue())
+        self.assertEqual(sorted(self.scanned), self.paths)
+        self.assertEqual({issue['file'] for issue in issues}, set(self.paths) - {deleted})
+
+    def test_failed_scan_is_not_cached(self):
+        broken = self.paths[1]
+        scan_file = self.fail_on(broken, lambda filepath: ScanFailed())
+        self.scan()
+        self.tool.scan_file = scan_file
+        self.scan()
+        self.assertEqual(self.scanned, [broken])
+
+    def test_cached_file_that_vanished_is_not_fresh(self):
+        self.scan()
+        os.unlink(self.paths[0])
+        cache = self.tool.open_cache(self.cache_dir)
+        try:
+            self.assertFalse(cache.is_fresh(self.paths[0]))
+        finally:
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""The symbol index and the cleanup filter of the leak rules."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import find_memory_leaks  # noqa: E402
+from symbol_index import SymbolIndex, index_root  # noqa: E402
+
+SOURCES = {
+    'A.java': '''public class A {
+    static final ThreadLocal<String> CROSS = new ThreadLocal<>();
+    static final ThreadLocal<String> OWN = new ThreadLocal<>();
+    static final ThreadLocal<String> NEVER = new ThreadLocal<>();
+    void clear() { OWN.remove(); }
+}
+''',
+    'B.java': '''public class B {
+    void done() { A.CROSS.remove(); }
+    void run() {
+        ExecutorService pool = Executors.newFixedThreadPool(2);
+        pool.shutdown();
+    }
+}
+''',
+    'C.java': '''public class C {
+    void leak() {
+        ExecutorService leaked = Executors.newFixedThreadPool(2);
+        leaked.submit(this::work);
+    }
+    void other() { leaked.shutdown(); }
+    void closed() {
+        try (ExecutorService scoped = Executors.newFixedThreadPool(2)) {
+            scoped.submit(this::work);
+        }
+    }
+}
+''',
+}
+
+
+class SymbolIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, '.git'))
+        self.src = os.path.join(self.root, 'src')
+        os.mkdir(self.src)
+        for name, text in SOURCES.items():
+            with open(os.path.join(self.src, name), 'w', encoding='utf-8') as f:
+                f.write(text)
+        self.cache_dir = os.path.join(self.root, '.code-review-cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def path(self, name):
+        return os.path.join(self.src, name)
+
+    def reported(self, cache=None):
+        issues = find_memory_leaks.scan_directory(self.src, jobs=1, cache=cache)
+        return sorted((os.path.basename(issue['file']), issue['line'], issue['name'])
+                      for issue in issues if issue['name'] in find_memory_leaks.TOOL.cleanup_rules)
+
+    def declaration(self, index, name, line):
+        [declaration] = index.declarations(self.path(name), line, ('ThreadLocal', 'ExecutorService'))
+        return declaration
+
+    def test_index_root_is_the_work_tree(self):
+        self.assertEqual(index_root(self.src), self.root)
+        self.assertEqual(index_root(self.path('A.java')), self.root)
+
+    def test_cleanup_lookups(self):
+        index = SymbolIndex(None)
+        self.addCleanup(index.close)
+        self.assertEqual(index.update(self.root, jobs=1), 3)
+        cases = [
+            ('A.java', 2, False, True),    # cleaned up as A.CROSS in B.java
+            ('A.java', 3, True, True),     # cleaned up in its own file
+            ('A.java', 4, False, False),   # never cleaned up
+            ('B.java', 4, True, True),     # local variable shut down in its method
+            ('C.java', 3, False, False),   # same name shut down in another method
+            ('C.java', 8, True, True),     # try-with-resources
+        ]
+        for name, line, own_file, anywhere in cases:
+            with self.subTest(name=name, line=line):
+                declaration = self.declaration(index, name, line)
+                self.assertEqual(index.is_cleaned_up(declaration, other_files=False), own_file)
+                self.assertEqual(index.is_cleaned_up(declaration), anywhere)
+
+    def test_update_only_reindexes_changed_files(self):
+        index = SymbolIndex(self.cache_dir)
+        self.addCleanup(index.close)
+        index.update(self.root, jobs=1)
+        self.assertEqual(index.update(self.root, jobs=1), 0)
+        with open(self.path('A.java'), 'a', encoding='utf-8') as f:
+            f.write('class D { void f() { A.NEVER.remove(); } }\n')
+        self.assertEqual(index.update(self.root, jobs=1), 1)
+        self.assertTrue(index.is_cleaned_up(self.declaration(index, 'A.java', 4)))
+        os.unlink(self.path('B.java'))
+        index.update(self.root, jobs=1)
+        self.assertFalse(index.is_cleaned_up(self.declaration(index, 'A.java', 2)))
+
+    def test_only_leaks_are_reported(self):
+        self.assertEqual(self.reported(), [
+            ('A.java', 4, 'ThreadLocal without remove'),
+            ('C.java', 3, 'ExecutorService without shutdown'),
+        ])
+
+    def test_findings_do_not_depend_on_the_cache(self):
+        uncached = self.reported()
+        for _run in range(2):
+            cache = find_memory_leaks.open_cache(self.cache_dir)
+            try:
+                self.assertEqual(self.reported(cache), uncached)
+            finally:
+                cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
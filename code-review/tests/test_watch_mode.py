@@ -0,0 +1,88 @@
+"""Watch mode: what each poll reports, and polls racing with file changes."""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+from samples import write_tree  # noqa: E402
+from watch_mode import Watcher, diff_issues  # noqa: E402
+
+
+class WatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.paths = write_tree(self.root, 4)
+        self.tool = code_review.make_tool()
+        self.cache = self.tool.open_cache(os.path.join(self.root, '.code-review-cache'))
+        self.watcher = Watcher(self.tool, self.root, jobs=1, cache=self.cache)
+        self.issues = self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.close()
+        self.cache.close()
+        shutil.rmtree(self.root)
+
+    def touch(self, path, text):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_start_reports_every_file(self):
+        self.assertEqual({issue['file'] for issue in self.issues}, set(self.paths))
+        self.assertEqual(self.watcher.refresh(), ([], [], []))
+
+    def test_edit_reports_only_the_new_issue(self):
+        edited = self.paths[1]
+        self.touch(edited, 'class Extra { void f() { System.err.println("x"); } }\n')
+        changed, added, resolved = self.watcher.refresh()
+        self.assertEqual(changed, [edited])
+        self.assertEqual([issue['name'] for issue in added], ['System.err.println'])
+        self.assertEqual(resolved, [])
+
+    def test_deleted_file_resolves_its_issues(self):
+        deleted = self.paths[0]
+        before = [issue for issue in self.issues if issue['file'] == deleted]
+        os.unlink(deleted)
+        changed, added, resolved = self.watcher.refresh()
+        self.assertEqual(changed, [deleted])
+        self.assertEqual(added, [])
+        self.assertEqual(diff_issues(before, resolved), ([], []))
+
+    def test_file_deleted_between_poll_and_scan(self):
+        deleted = self.paths[2]
+        scan_file = self.tool.scan_file
+
+        def delete_then_scan(filepath):
+            if filepath == deleted:
+                os.unlink(filepath)
+            return scan_file(filepath)
+
+        self.tool.scan_file = delete_then_scan
+        self.touch(deleted, '\n')
+        with redirect_stderr(io.StringIO()) as errors:
+            changed, added, resolved = self.watcher.refresh()
+        self.assertIn(f'Error reading {deleted}', errors.getvalue())
+        self.assertEqual(changed, [deleted])
+        self.assertEqual(added, [])
+        self.assertTrue(resolved)
+        self.assertEqual({issue['file'] for issue in resolved}, {deleted})
+        self.assertNotIn(deleted, self.watcher.stats)
+        self.assertNotIn(deleted, self.watcher.issues)
+        # The loop goes on: other edits are still picked up
+        self.touch(self.paths[3], 'class Extra { void f() { System.err.println("x"); } }\n')
+        changed, added, _resolved = self.watcher.refresh()
+        self.assertEqual(changed, [self.paths[3]])
+        self.assertEqual(len(added), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
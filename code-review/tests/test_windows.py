@@ -0,0 +1,107 @@
+"""Scanning a file in windows must report exactly what a whole-file scan does."""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import code_review  # noqa: E402
+import java_lexer  # noqa: E402
+from samples import java_class  # noqa: E402
+
+
+class WindowedScanTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.java')
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(''.join(java_class(n) for n in range(20)))
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def scan(self, chunk_size=None):
+        if chunk_size is None:
+            return code_review.scan_file(self.path)
+        with mock.patch.object(java_lexer, 'STREAM_THRESHOLD', 0), \
+                mock.patch.object(java_lexer, 'CHUNK_SIZE', chunk_size):
+            return code_review.scan_file(self.path)
+
+    def test_windows_are_cut_where_no_token_spans(self):
+        with open(self.path, encoding='utf-8') as f:
+            text = f.read()
+        windows = list(java_lexer.iter_windows(self.path, chunk_size=97, threshold=0))
+        self.assertGreater(len(windows), 10)
+        self.assertEqual('\n'.join(source.text for _, source, _ in windows), text)
+        for first_line, source, _ in windows:
+            whole_lines = text.split('\n')[first_line - 1:first_line - 1 + source.line_count()]
+            self.assertEqual(source.lines, whole_lines)
+
+    def test_windowed_scan_matches_whole_file(self):
+        whole = self.scan()
+        self.assertTrue(whole)
+        for chunk_size in (97, 500, 1000, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.scan(chunk_size), whole)
+
+
+class LongTokenWindowsTest(unittest.TestCase):
+    """Block comments, text blocks and lines longer than a window."""
+
+    CHUNK_SIZE = 2000
+
+    def windows(self, text):
+        handle, path = tempfile.mkstemp(suffix='.java')
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(text)
+        try:
+            whole = java_lexer.read_source(path)
+            started = time.perf_counter()
+            windows = list(java_lexer.iter_windows(path, chunk_size=self.CHUNK_SIZE, threshold=0))
+            elapsed = time.perf_counter() - started
+        finally:
+            os.unlink(path)
+        first_line = 1
+        for line, source, _final in windows:
+            self.assertEqual(line, first_line)
+            first_line += source.line_count()
+        for view in ('raw', 'code', 'masked', 'comments'):
+            with self.subTest(view=view):
+                self.assertEqual('\n'.join(source.view_text(view) for _, source, _ in windows),
+                                 whole.view_text(view))
+        return windows, elapsed
+
+    def assertBounded(self, windows):
+        self.assertGreater(len(windows), 5)
+        for _line, source, _final in windows:
+            self.assertLess(len(source.text), 3 * self.CHUNK_SIZE)
+
+    def test_block_comment_longer_than_a_window(self):
+        text = ('class A {}\n/* start\n' + 'comment * / "quote" \'\n' * 2000
+                + '*/ class B { String s = "/* not a comment */"; }\n')
+        windows, _elapsed = self.windows(text)
+        self.assertBounded(windows)
+
+    def test_text_block_longer_than_a_window(self):
+        text = ('class A { String s = """\n' + 'text \\" /* x */ \\\n' * 2000
+                + '""" + "tail"; }\nclass B { char c = \'"\'; }\n')
+        windows, _elapsed = self.windows(text)
+        self.assertBounded(windows)
+
+    def test_unterminated_block_comment(self):
+        windows, _elapsed = self.windows('class A {}\n/* start\n' + 'comment line\n' * 3000)
+        self.assertBounded(windows)
+
+    def test_long_single_line_is_lexed_once(self):
+        line = 'class A { ' + 'String s = "x" + y; /* c */ ' * 70000 + '}'
+        windows, elapsed = self.windows(line + '\nclass B {}\n')
+        self.assertEqual(windows[0][1].lines[0], line)
+        self.assertLess(elapsed, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,205 @@
 import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import ssl
+import sys
 import time
 import urllib.request
 import urllib.error
-from concurrent.futures import ThreadPoolExecutor
-from threading import Lock
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import count, islice
+from threading import Event, Lock, Thread
+from urllib.parse import urlsplit
 
 # 默认请求地址
 DEFAULT_URL = "http://10.77.56.50:8080/test/single?start=2025-01-20%2000%3A00%3A00&end=2026-01-20%2000%3A00%3A00&uid=139635618&hbaseType=0"
 
+# 开环模式下等待空闲连接的请求上限，超出的请求直接丢弃
+DEFAULT_MAX_BACKLOG = 10000
+# 开环模式下实际发出时刻晚于计划时刻超过该值（秒）的请求计为落后于计划
+LATE_THRESHOLD = 0.001
+
+class LatencyHistogram:
+    """HDR 风格的对数-线性分桶延迟直方图，内存固定，可廉价合并
+
+    延迟以微秒为单位记录。小于 2^SUB_BUCKET_BITS 微秒的值每微秒一个桶，更大的值
+    每翻一倍分成 2^(SUB_BUCKET_BITS-1) 个等宽桶，相对误差不超过 1/1024（约 0.1%）。
+    超过 MAX_VALUE_US 的值按上限计入。桶数固定（约 2.4 万个计数），与请求数无关。
+    """
+
+    SUB_BUCKET_BITS = 11
+    MAX_VALUE_US = 3600 * 1000 * 1000  # 1 小时
+
+    def __init__(self):
+        self.half = 1 << (self.SUB_BUCKET_BITS - 1)
+        self.counts = array("Q", bytes(8 * (self._index(self.MAX_VALUE_US) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value_us):
+        shift = max(0, value_us.bit_length() - self.SUB_BUCKET_BITS)
+        return shift * self.half + (value_us >> shift)
+
+    def _highest_value(self, index):
+        """桶内最大的微秒值，即该桶记录的值上限"""
+        shift = max(0, index // self.half - 1)
+        return (((index - shift * self.half) + 1) << shift) - 1
+
+    def record(self, seconds):
+        value_us = min(max(int(seconds * 1000000), 0), self.MAX_VALUE_US)
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total += seconds
+        self.total_squares += seconds * seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        """把另一个直方图（如其他 worker 的）合并进来"""
+        counts = self.counts
+        for index, value in enumerate(other.counts):
+            if value:
+                counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def stddev(self):
+        if not self.count:
+            return 0.0
+        mean = self.mean()
+        return math.sqrt(max(self.total_squares / self.count - mean * mean, 0.0))
+
+    def percentiles(self, percents):
+        """返回各百分位的延迟（秒），percents 需升序；结果不超过实际最大值"""
+        results = []
+        if not self.count:
+            return [0.0 for _ in percents]
+        targets = [max(1, math.ceil(percent / 100 * self.count)) for percent in percents]
+        seen = 0
+        position = 0
+        for index, value in enumerate(self.counts):
+            if not value:
+                continue
+            seen += value
+            while position < len(targets) and seen >= targets[position]:
+                results.append(min(self._highest_value(index) / 1000000, self.max))
+                position += 1
+            if position == len(targets):
+                break
+        return results
+
+    def percentile(self, percent):
+        return self.percentiles([percent])[0]
+
+    def distribution(self):
+        """完整的百分位分布：每一行比上一行剩余的请求减半，直到覆盖所有请求
+
+        返回 (百分位, 延迟秒数, 累计请求数) 列表，类似 HdrHistogram 的 percentile distribution 输出。
+        """
+        percents = []
+        remaining = 1.0
+        while self.count and remaining * self.count >= 1:
+            percents.append(100 * (1 - remaining))
+            remaining /= 2
+        percents.append(100.0)
+        return [
+            (percent, value, min(self.count, max(1, math.ceil(percent / 100 * self.count))))
+            for percent, value in zip(percents, self.percentiles(percents))
+        ]
+
+class IntervalReporter:
+    """压测过程中每隔 interval 秒输出一行时间序列（CSV 或 JSONL）
+
+    每行是该区间内完成的请求：QPS、错误率与延迟分位数。区间的延迟记在独立的
+    LatencyHistogram 中，输出后换新，与全程统计互不影响。
+    """
+
+    FIELDS = ("timestamp", "elapsed_s", "requests", "errors", "error_rate",
+              "qps", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+
+    def __init__(self, interval, fmt="csv", stream=None):
+        self.interval = interval
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.lock = Lock()
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.start_time = None
+        self.last_time = None
+        self._stop = Event()
+        self._thread = None
+
+    def record(self, ok, duration):
+        with self.lock:
+            self.histogram.record(duration)
+            if not ok:
+                self.errors += 1
+
+    def start(self, start_time):
+        """从 perf_counter 时刻 start_time 起按固定节拍输出（不随输出耗时漂移）"""
+        self.start_time = self.last_time = start_time
+        if self.fmt == "csv":
+            csv.writer(self.stream).writerow(self.FIELDS)
+            self.stream.flush()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        tick = 1
+        while not self._stop.wait(max(self.start_time + tick * self.interval - time.perf_counter(), 0)):
+            self.flush(self.start_time + tick * self.interval)
+            tick += 1
+
+    def flush(self, now):
+        """输出 last_time 到 now 这一区间的一行"""
+        with self.lock:
+            histogram, self.histogram = self.histogram, LatencyHistogram()
+            errors, self.errors = self.errors, 0
+        span = now - self.last_time
+        self.last_time = now
+        p50, p90, p99 = histogram.percentiles([50, 90, 99])
+        row = (round(time.time(), 3), round(now - self.start_time, 3), histogram.count, errors,
+               round(errors / histogram.count, 4) if histogram.count else 0.0,
+               round(histogram.count / span, 2) if span > 0 else 0.0,
+               round(p50 * 1000, 3), round(p90 * 1000, 3), round(p99 * 1000, 3),
+               round(histogram.max * 1000, 3))
+        if self.fmt == "csv":
+            csv.writer(self.stream).writerow(row)
+        else:
+            self.stream.write(json.dumps(dict(zip(self.FIELDS, row))) + "\n")
+        self.stream.flush()
+
+    def stop(self):
+        """停止定时输出，并输出最后一个不完整的区间"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        now = time.perf_counter()
+        if now > self.last_time:
+            self.flush(now)
+
+def _request_ids(total_requests, deadline=None):
+    """依次生成请求编号，直到 total_requests 个（None 为不限）或到达 perf_counter 时刻 deadline"""
+    for i in range(total_requests) if total_requests is not None else count():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return
+        yield i
+
 def make_request(url, request_id):
     """发送单个请求并记录耗时"""
     start_time = time.time()
@@ -33,71 +225,418 @@ def make_request(url, request_id):
     duration = time.time() - start_time
     return status, code, duration
 
-def run_benchmark(url, concurrency, total_requests):
-    """运行压测"""
+class AsyncConnection:
+    """asyncio 上的 HTTP/1.1 keep-alive 长连接，同一时刻只处理一个请求（不做 pipelining）"""
+
+    def __init__(self, host, port, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _read_response(self):
+        """读取一个完整响应，返回 (状态码, 是否可以复用连接)"""
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        version, code = status_line.split(None, 2)[:2]
+        code = int(code)
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        connection = headers.get(b"connection", b"")
+        keep_alive = connection != b"close" and (version == b"HTTP/1.1" or connection == b"keep-alive")
+        # 读完响应体，连接才能发送下一个请求
+        if code in (204, 304) or 100 <= code < 200:
+            pass
+        elif headers.get(b"transfer-encoding", b"").endswith(b"chunked"):
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # 跳过 trailer，直到空行
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                await self.reader.readexactly(size + 2)
+        elif b"content-length" in headers:
+            await self.reader.readexactly(int(headers[b"content-length"]))
+        else:
+            # 没有长度信息，响应体到连接关闭为止
+            await self.reader.read()
+            keep_alive = False
+        return code, keep_alive
+
+    async def request(self, payload, timeout, start_time=None):
+        """发送一个请求，返回与 make_request 相同的 (status, code, duration)
+
+        start_time 为 perf_counter 时刻，给出时 duration 从该时刻算起（开环模式的计划发送时刻）
+        """
+        if start_time is None:
+            start_time = time.perf_counter()
+        code = 0
+        try:
+            # 复用的连接可能已被服务端因空闲关闭，此时换新连接重试一次
+            for attempt in range(2):
+                reused = self.writer is not None
+                if not reused:
+                    await asyncio.wait_for(self._connect(), timeout)
+                try:
+                    self.writer.write(payload)
+                    code, keep_alive = await asyncio.wait_for(self._read_response(), timeout)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self.close()
+                    if not reused or attempt:
+                        raise
+            if not keep_alive:
+                self.close()
+            status = "SUCCESS" if 200 <= code < 300 else "FAILURE"
+        except Exception as e:
+            self.close()
+            status = f"ERROR: {type(e).__name__}: {e}" if str(e) else f"ERROR: {type(e).__name__}"
+            code = -1
+
+        duration = time.perf_counter() - start_time
+        return status, code, duration
+
+def _request_target(url):
+    """解析 URL，返回 (host, port, ssl_context, 请求报文)"""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported URL scheme: {parts.scheme!r}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    ssl_context = ssl.create_default_context() if parts.scheme == "https" else None
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+    payload = (f"GET {target} HTTP/1.1\r\nHost: {host_header}\r\n"
+               "User-Agent: benchmark_api\r\nAccept: */*\r\nConnection: keep-alive\r\n\r\n").encode("latin-1")
+    return parts.hostname, port, ssl_context, payload
+
+async def run_async_requests(url, concurrency, connections, total_requests, on_result,
+                             deadline=None, timeout=10):
+    """用 asyncio 长连接发送请求，每个完成的结果回调 on_result(status, code, duration)
+
+    发满 total_requests 个（None 为不限）或到达 perf_counter 时刻 deadline 后不再发新请求
+    """
+    host, port, ssl_context, payload = _request_target(url)
+
+    # 连接池：连接在第一次使用时才建立，之后一直复用
+    pool = asyncio.Queue()
+    for _ in range(connections):
+        pool.put_nowait(AsyncConnection(host, port, ssl_context))
+    request_ids = _request_ids(total_requests, deadline)
+    workers = concurrency if total_requests is None else min(concurrency, total_requests)
+
+    async def worker():
+        for _ in request_ids:
+            connection = await pool.get()
+            try:
+                result = await connection.request(payload, timeout)
+            finally:
+                pool.put_nowait(connection)
+            on_result(*result)
+
+    # 并发数 = 同时在途的请求数，超过连接数的部分在连接池上排队
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        while not pool.empty():
+            pool.get_nowait().close()
+
+async def run_open_loop_requests(url, rate, connections, total_requests, on_result,
+                                 poisson=False, max_backlog=DEFAULT_MAX_BACKLOG, deadline=None, timeout=10):
+    """开环压测：按计划时刻发出请求，不等上一个响应返回，返回 (dropped, unsent, cancelled, late, max_lag)
+
+    第 i 个请求的计划时刻为 i/rate，poisson 为 True 时请求间隔服从指数分布（泊松到达）。
+    服务变慢时闭环压测会跟着少发请求，慢的那段时间几乎没有样本（coordinated omission）；
+    这里延迟从计划时刻算起，排队等连接的时间也计入延迟。没有空闲连接时请求在 backlog
+    中排队，backlog 满了（max_backlog 个，0 为不限）就丢弃并计入 dropped，丢弃的请求
+    不计入延迟统计。late 为实际发出时刻晚于计划超过 LATE_THRESHOLD 的请求数，
+    max_lag 为最大落后时间（秒）。计划时刻到达 deadline 后停止发送；到达 deadline 时
+    仍在 backlog 中的请求不再发出（unsent），在途的请求被取消（cancelled），两者都不计入
+    延迟统计，压测在 deadline 准时结束。
+    """
+    host, port, ssl_context, payload = _request_target(url)
+    # 不设容量，由下面按 max_backlog 丢弃，结束标记总能放进去
+    backlog = asyncio.Queue()
+    late = 0
+    max_lag = 0.0
+    in_flight = 0
+
+    async def worker():
+        nonlocal late, max_lag, in_flight
+        connection = AsyncConnection(host, port, ssl_context)
+        try:
+            while True:
+                intended = await backlog.get()
+                if intended is None:
+                    return
+                lag = time.perf_counter() - intended
+                if lag > LATE_THRESHOLD:
+                    late += 1
+                max_lag = max(max_lag, lag)
+                in_flight += 1
+                result = await connection.request(payload, timeout, intended)
+                in_flight -= 1
+                on_result(*result)
+        finally:
+            connection.close()
+
+    # 每个连接一个 worker，在途请求数不超过连接数
+    workers = [asyncio.create_task(worker()) for _ in range(connections)]
+    dropped = unsent = cancelled = 0
+    start = time.perf_counter()
+    offset = 0.0
+    try:
+        for i in range(total_requests) if total_requests is not None else count():
+            if poisson:
+                offset += random.expovariate(rate)
+            else:
+                offset = i / rate
+            intended = start + offset
+            if deadline is not None and intended >= deadline:
+                break
+            delay = intended - time.perf_counter()
+            # 落后于计划时也要让出事件循环，否则 worker 无法取走请求
+            await asyncio.sleep(max(delay, 0))
+            if max_backlog and backlog.qsize() >= max_backlog:
+                dropped += 1
+            else:
+                backlog.put_nowait(intended)
+        for _ in workers:
+            backlog.put_nowait(None)
+        remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+        done, running = await asyncio.wait(workers, timeout=remaining)
+        for task in done:
+            task.result()
+        if running:
+            # 到达 deadline：排队的请求不再发出，在途的请求取消
+            while not backlog.empty():
+                if backlog.get_nowait() is not None:
+                    unsent += 1
+            cancelled = in_flight
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return dropped, unsent, cancelled, late, max_lag
+
+def run_thread_requests(url, concurrency, total_requests, on_result, deadline=None):
+    """用线程池 + urllib 发送请求，结果按完成顺序回调 on_result(status, code, duration)
+
+    请求按需提交：已提交未处理的 future 不超过 2 倍并发数（线程空闲时队列里总有下一个请求），
+    内存与请求总数无关。停止条件同 run_async_requests。
+    """
+    request_ids = _request_ids(total_requests, deadline)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {executor.submit(make_request, url, i) for i in islice(request_ids, 2 * concurrency)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_result(*future.result())
+            for i in islice(request_ids, len(done)):
+                pending.add(executor.submit(make_request, url, i))
+
+def run_benchmark(url, concurrency, total_requests, engine="thread", connections=None,
+                  rate=None, poisson=False, max_backlog=DEFAULT_MAX_BACKLOG,
+                  duration=None, warmup=0, report_interval=None, report_format="csv", report_stream=None):
+    """运行压测，engine 为 thread（线程池 + urllib，每个请求新建连接，默认）或 async（asyncio 长连接）
+
+    给出 rate（请求/秒）时以开环模式运行（仅 async 引擎），见 run_open_loop_requests。
+    total_requests 为 None 时按 duration 秒运行；两者都给出时先到者为准。前 warmup 秒内
+    完成的请求不计入统计（duration 从预热结束算起）。给出 report_interval 时每隔该秒数
+    向 report_stream 输出一行时间序列，见 IntervalReporter。
+    """
+    connections = connections or concurrency
+    if rate is not None and engine != "async":
+        raise ValueError("Open-loop mode (rate) requires the async engine")
+    if total_requests is None and duration is None:
+        raise ValueError("Either total_requests or duration is required")
     print(f"Starting benchmark...")
     print(f"Target URL:     {url}")
-    print(f"Concurrency:    {concurrency}")
-    print(f"Total Requests: {total_requests}")
+    print(f"Engine:         {engine}")
+    if rate is not None:
+        print(f"Mode:           open-loop, {rate:g} req/s ({'poisson' if poisson else 'constant'} arrivals)")
+        print(f"Max Backlog:    {max_backlog or 'unlimited'}")
+    else:
+        print(f"Concurrency:    {concurrency}")
+    if engine == "async":
+        print(f"Connections:    {connections}")
+    if total_requests is not None:
+        print(f"Total Requests: {total_requests}")
+    if duration is not None:
+        print(f"Duration:       {duration:g} s")
+    if warmup:
+        print(f"Warm-up:        {warmup:g} s")
     print("-" * 60)
 
     success_count = 0
     failure_count = 0
-    latencies = []
+    warmup_count = 0
+    histogram = LatencyHistogram()
     lock = Lock()
-    
-    start_time = time.time()
+    completed = 0
+    reporter = IntervalReporter(report_interval, report_format, report_stream) if report_interval else None
+    # 时间序列输出到 stdout 时不打印进度，以免混在一起
+    show_progress = total_requests is not None and total_requests >= 10 and (
+        reporter is None or reporter.stream is not sys.stdout)
 
-    # 使用线程池并发执行
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        futures = [executor.submit(make_request, url, i) for i in range(total_requests)]
-        
-        for i, future in enumerate(futures):
-            status, code, duration = future.result()
-            with lock:
+    start_time = time.perf_counter()
+    measure_start = start_time + warmup
+    deadline = measure_start + duration if duration is not None else None
+
+    def record(status, code, duration):
+        nonlocal success_count, failure_count, completed, warmup_count
+        with lock:
+            completed += 1
+            if warmup and time.perf_counter() < measure_start:
+                # 预热期间的样本直接丢弃
+                warmup_count += 1
+            else:
                 if status == "SUCCESS":
                     success_count += 1
                 else:
                     failure_count += 1
                     # 如果失败，打印第一个错误信息以便排查
                     if failure_count == 1:
-                        print(f"\n[First Failure Info] Code: {code}, Status: {status}")
+                        print(f"\n[First Failure Info] Code: {code}, Status: {status}", file=sys.stderr)
+
+                histogram.record(duration)
+                if reporter is not None:
+                    reporter.record(status == "SUCCESS", duration)
+
+        # 每完成 10% 打印一次进度
+        if show_progress and completed % (total_requests // 10) == 0:
+            print(f"Progress: {completed}/{total_requests} requests completed...", end='\r')
 
-                latencies.append(duration)
-                
-            # 每完成 10% 打印一次进度
-            if total_requests >= 10 and (i + 1) % (total_requests // 10) == 0:
-                print(f"Progress: {i + 1}/{total_requests} requests completed...", end='\r')
+    if reporter is not None:
+        reporter.start(measure_start)
+    dropped = None
 
-    total_time = time.time() - start_time
+    try:
+        if rate is not None:
+            dropped, unsent, cancelled, late, max_lag = asyncio.run(run_open_loop_requests(
+                url, rate, connections, total_requests, record, poisson, max_backlog, deadline))
+        elif engine == "async":
+            asyncio.run(run_async_requests(url, concurrency, connections, total_requests, record, deadline))
+        else:
+            run_thread_requests(url, concurrency, total_requests, record, deadline)
+    finally:
+        if reporter is not None:
+            reporter.stop()
+
+    # 只统计预热结束之后的时间；开环模式在 deadline 时取消剩余请求，不计取消本身的耗时
+    end_time = time.perf_counter()
+    if rate is not None and deadline is not None:
+        end_time = min(end_time, deadline)
+    total_time = max(end_time - measure_start, 0)
     print("\n" + "-" * 60)
     
     # 计算统计指标
-    avg_latency = sum(latencies) / len(latencies) if latencies else 0
-    max_latency = max(latencies) if latencies else 0
-    min_latency = min(latencies) if latencies else 0
     # QPS = 成功请求数 / 总耗时 (或者 总请求数 / 总耗时，通常压测看有效QPS)
     qps = success_count / total_time if total_time > 0 else 0
+    p50, p90, p99, p999 = histogram.percentiles([50, 90, 99, 99.9])
 
     print("Benchmark Results:")
     print(f"Total Time:     {total_time:.2f} s")
-    print(f"Total Requests: {total_requests}")
+    print(f"Total Requests: {success_count + failure_count}")
+    if warmup:
+        print(f"Warm-up:        {warmup_count} requests discarded")
     print(f"Successful:     {success_count}")
     print(f"Failed:         {failure_count}")
+    if dropped is not None:
+        # 开环模式：延迟从计划发送时刻算起，包含等待空闲连接的时间
+        print(f"Dropped:        {dropped} (backlog full, not in latency stats)")
+        if unsent or cancelled:
+            print(f"Unsent:         {unsent} queued, {cancelled} in flight at the deadline (cancelled, not in latency stats)")
+        print(f"Sent Late:      {late} (> {LATE_THRESHOLD*1000:g} ms behind schedule, max {max_lag*1000:.2f} ms)")
     print(f"QPS (Success):  {qps:.2f} req/s")
-    print(f"Avg Latency:    {avg_latency*1000:.2f} ms")
-    print(f"Min Latency:    {min_latency*1000:.2f} ms")
-    print(f"Max Latency:    {max_latency*1000:.2f} ms")
+    print(f"Avg Latency:    {histogram.mean()*1000:.2f} ms")
+    print(f"Stddev:         {histogram.stddev()*1000:.2f} ms")
+    print(f"Min Latency:    {(histogram.min if histogram.count else 0)*1000:.2f} ms")
+    print(f"P50 Latency:    {p50*1000:.2f} ms")
+    print(f"P90 Latency:    {p90*1000:.2f} ms")
+    print(f"P99 Latency:    {p99*1000:.2f} ms")
+    print(f"P99.9 Latency:  {p999*1000:.2f} ms")
+    print(f"Max Latency:    {histogram.max*1000:.2f} ms")
+    print("-" * 60)
+    print("Latency Distribution:")
+    print(f"{'Percentile':>12} {'Latency (ms)':>14} {'Count':>10}")
+    for percent, value, count in histogram.distribution():
+        print(f"{percent:>11.4f}% {value*1000:>14.3f} {count:>10}")
     print("-" * 60)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="API Concurrent Benchmark Tool")
     
     # 定义命令行参数
-    parser.add_argument("-c", "--concurrency", type=int, default=10, help="并发线程数 (默认: 10)")
-    parser.add_argument("-n", "--number", type=int, default=100, help="总请求数 (默认: 100)")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="并发数，即同时在途的请求数 (默认: 10)")
+    parser.add_argument("-n", "--number", type=int, default=None,
+                        help="总请求数，与 --duration 同时给出时先到者为准 (默认: 未给出 --duration 时为 100)")
     parser.add_argument("-u", "--url", type=str, default=DEFAULT_URL, help="目标 URL")
+    parser.add_argument("-e", "--engine", choices=["async", "thread"], default=None,
+                        help="压测引擎: thread 为线程池 + urllib 短连接, async 为 asyncio + HTTP/1.1 长连接 "
+                             "(默认: thread，给出 --rate 时为 async)")
+    parser.add_argument("--connections", type=int, default=None,
+                        help="async 引擎的长连接数，在途请求数不超过连接数 (默认: 与并发数相同)")
+    parser.add_argument("-r", "--rate", type=float, default=None,
+                        help="开环模式：按固定速率（请求/秒）发出请求，不等响应返回，延迟从计划发送时刻算起")
+    parser.add_argument("--poisson", action="store_true",
+                        help="开环模式下请求按泊松过程到达（指数分布间隔），而不是等间隔")
+    parser.add_argument("--max-backlog", type=int, default=DEFAULT_MAX_BACKLOG,
+                        help=f"开环模式下等待空闲连接的请求上限，超出的请求丢弃，0 为不限 (默认: {DEFAULT_MAX_BACKLOG})")
+    parser.add_argument("-d", "--duration", type=float, default=None,
+                        help="压测时长（秒），从预热结束算起")
+    parser.add_argument("--warmup", type=float, default=0,
+                        help="预热时长（秒），期间完成的请求不计入统计 (默认: 0)")
+    parser.add_argument("--report-interval", type=float, default=None,
+                        help="每隔多少秒输出一行时间序列（QPS、错误率、延迟分位数）")
+    parser.add_argument("--report-format", choices=["csv", "jsonl"], default="csv",
+                        help="时间序列的格式 (默认: csv)")
+    parser.add_argument("--report-file", type=str, default=None,
+                        help="时间序列写入的文件 (默认: 标准输出，此时不打印进度)")
     
     args = parser.parse_args()
+    if args.number is None and args.duration is None:
+        args.number = 100
+    for name in ("duration", "report_interval"):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            parser.error(f"--{name.replace('_', '-')} must be positive")
+    if args.warmup < 0:
+        parser.error("--warmup must not be negative")
+    if args.engine is None:
+        args.engine = "async" if args.rate is not None else "thread"
+    if args.rate is not None:
+        if args.rate <= 0:
+            parser.error("--rate must be positive")
+        if args.engine != "async":
+            parser.error("--rate requires the async engine")
     
-    run_benchmark(args.url, args.concurrency, args.number)
+    report_stream = open(args.report_file, "w", newline="") if args.report_file else None
+    try:
+        run_benchmark(args.url, args.concurrency, args.number, args.engine, args.connections,
+                      args.rate, args.poisson, args.max_backlog, args.duration, args.warmup,
+                      args.report_interval, args.report_format, report_stream)
+    finally:
+        if report_stream is not None:
+            report_stream.close()
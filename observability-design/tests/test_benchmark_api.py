@@ -0,0 +1,90 @@
+"""benchmark_api 的延迟直方图：分位数精度、合并与固定内存"""
+
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from benchmark_api import LatencyHistogram  # noqa: E402
+
+# 直方图的相对误差上限，外加 1 微秒的取整
+RELATIVE_ERROR = 1 / 1024
+
+
+def exact_percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percent / 100 * len(ordered))) - 1]
+
+
+def histogram_of(values):
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        # 对数正态分布，覆盖几十微秒到几秒
+        self.values = [rng.lognormvariate(-5, 1.5) for _ in range(20000)]
+
+    def test_percentiles_are_within_the_relative_error(self):
+        histogram = histogram_of(self.values)
+        percents = [1, 50, 90, 99, 99.9, 100]
+        for percent, value in zip(percents, histogram.percentiles(percents)):
+            with self.subTest(percent=percent):
+                exact = exact_percentile(self.values, percent)
+                self.assertLessEqual(abs(value - exact), exact * RELATIVE_ERROR + 1e-6)
+        self.assertEqual(histogram.percentile(100), max(self.values))
+
+    def test_summary_statistics_are_exact(self):
+        histogram = histogram_of(self.values)
+        mean = sum(self.values) / len(self.values)
+        self.assertEqual(histogram.count, len(self.values))
+        self.assertAlmostEqual(histogram.mean(), mean)
+        self.assertAlmostEqual(histogram.stddev(),
+                               (sum((v - mean) ** 2 for v in self.values) / len(self.values)) ** 0.5)
+        self.assertEqual((histogram.min, histogram.max), (min(self.values), max(self.values)))
+
+    def test_merge_matches_recording_everything_once(self):
+        whole = histogram_of(self.values)
+        merged = histogram_of(self.values[:7000]).merge(histogram_of(self.values[7000:]))
+        self.assertEqual(merged.counts, whole.counts)
+        self.assertEqual((merged.count, merged.min, merged.max), (whole.count, whole.min, whole.max))
+        self.assertEqual(merged.percentiles([50, 99]), whole.percentiles([50, 99]))
+
+    def test_memory_does_not_grow_with_samples(self):
+        histogram = LatencyHistogram()
+        size = len(histogram.counts)
+        for value in self.values + [0, -1, 10 * 3600]:
+            histogram.record(value)
+        self.assertEqual(len(histogram.counts), size)
+        # 超过上限的值按上限计入，但 max 保留实际值
+        self.assertEqual(histogram.max, 10 * 3600)
+        self.assertLessEqual(histogram.percentile(99.99), LatencyHistogram.MAX_VALUE_US / 1000000)
+
+    def test_distribution_halves_the_remaining_requests(self):
+        histogram = histogram_of(self.values)
+        rows = histogram.distribution()
+        self.assertEqual(rows[0][0], 0)
+        self.assertEqual(rows[-1][0], 100)
+        self.assertEqual(rows[-1][2], len(self.values))
+        for (percent, value, count), (next_percent, next_value, next_count) in zip(rows, rows[1:]):
+            self.assertLess(percent, next_percent)
+            self.assertLessEqual(value, next_value)
+            self.assertLessEqual(count, next_count)
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentiles([50, 99]), [0.0, 0.0])
+        self.assertEqual((histogram.mean(), histogram.stddev()), (0.0, 0.0))
+        self.assertEqual(histogram.distribution(), [(100.0, 0.0, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()